@@ -0,0 +1,28 @@
+"""content addressed document versions
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('document_versions', sa.Column('filename', sa.String(), nullable=True))
+    op.add_column('document_versions', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('document_versions', sa.Column('file_size', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_document_versions_content_hash'), 'document_versions', ['content_hash'], unique=False)
+    op.create_index(op.f('ix_document_versions_file_path'), 'document_versions', ['file_path'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_document_versions_file_path'), table_name='document_versions')
+    op.drop_index(op.f('ix_document_versions_content_hash'), table_name='document_versions')
+    op.drop_column('document_versions', 'file_size')
+    op.drop_column('document_versions', 'content_hash')
+    op.drop_column('document_versions', 'filename')
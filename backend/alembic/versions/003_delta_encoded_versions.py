@@ -0,0 +1,29 @@
+"""delta encoded document versions
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('document_versions', sa.Column('delta_base_id', sa.Integer(), nullable=True))
+    op.add_column('document_versions', sa.Column('delta_depth', sa.Integer(), nullable=True))
+    # Batch mode so SQLite, which cannot ALTER constraints, rebuilds the table
+    with op.batch_alter_table('document_versions') as batch_op:
+        batch_op.create_foreign_key(
+            'document_versions_delta_base_id_fkey', 'document_versions', ['delta_base_id'], ['id']
+        )
+
+def downgrade() -> None:
+    with op.batch_alter_table('document_versions') as batch_op:
+        batch_op.drop_constraint('document_versions_delta_base_id_fkey', type_='foreignkey')
+    op.drop_column('document_versions', 'delta_depth')
+    op.drop_column('document_versions', 'delta_base_id')
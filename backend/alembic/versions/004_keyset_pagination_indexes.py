@@ -0,0 +1,77 @@
+"""keyset pagination indexes
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def create_missing_baseline_tables() -> None:
+    # 001 never created the checkout and activity tables or users.username,
+    # although the models always had them; this is the first migration that
+    # needs them, so a database built from migrations alone gets them here
+    inspector = sa.inspect(op.get_bind())
+    if 'username' not in {column['name'] for column in inspector.get_columns('users')}:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('username', sa.String(), nullable=False))
+            batch_op.create_index('ix_users_username', ['username'], unique=True)
+    if not inspector.has_table('document_checkouts'):
+        op.create_table(
+            'document_checkouts',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('document_id', sa.Integer(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('checkout_time', sa.DateTime(), nullable=True),
+            sa.Column('comments', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('document_id')
+        )
+        op.create_index(op.f('ix_document_checkouts_id'), 'document_checkouts', ['id'], unique=False)
+    if not inspector.has_table('document_activities'):
+        op.create_table(
+            'document_activities',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('document_id', sa.Integer(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('activity_type', sa.String(), nullable=True),
+            sa.Column('activity_time', sa.DateTime(), nullable=True),
+            sa.Column('details', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_document_activities_id'), 'document_activities', ['id'], unique=False)
+
+def upgrade() -> None:
+    create_missing_baseline_tables()
+    op.create_index('ix_documents_updated_at_id', 'documents', ['updated_at', 'id'], unique=False)
+    op.create_index(
+        'ix_documents_owner_id_updated_at_id', 'documents', ['owner_id', 'updated_at', 'id'], unique=False
+    )
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_document_activities_document_id_activity_time_id',
+        'document_activities',
+        ['document_id', 'activity_time', 'id'],
+        unique=False
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_document_activities_document_id_activity_time_id', table_name='document_activities')
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_index('ix_documents_owner_id_updated_at_id', table_name='documents')
+    op.drop_index('ix_documents_updated_at_id', table_name='documents')
+    # The baseline tables stay: existing databases had them before 004
@@ -0,0 +1,72 @@
+"""document full-text search index
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# The search index as of this revision, copied from app.services.search so
+# the migration does not change with the app
+SQLITE_FTS_TABLE = "document_search_fts"
+POSTGRES_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'D')"
+)
+
+def upgrade() -> None:
+    op.create_table(
+        'document_search',
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('tags', sa.Text(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('document_id')
+    )
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute(
+            "ALTER TABLE document_search ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS ({POSTGRES_SEARCH_VECTOR}) STORED"
+        )
+        op.execute("CREATE INDEX ix_document_search_vector ON document_search USING gin (search_vector)")
+    elif bind.dialect.name == "sqlite":
+        op.execute(
+            f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} "
+            "USING fts5(title, tags, description, content, tokenize='porter unicode61')"
+        )
+
+    # Backfill metadata for existing documents; file contents are indexed
+    # the next time a version is uploaded
+    tag_names = "string_agg(t.name, ' ')" if bind.dialect.name == "postgresql" else "group_concat(t.name, ' ')"
+    op.execute(f"""
+        INSERT INTO document_search (document_id, title, description, tags, updated_at)
+        SELECT d.id, d.title, d.description,
+               (SELECT {tag_names} FROM document_tags dt JOIN tags t ON t.id = dt.tag_id
+                WHERE dt.document_id = d.id),
+               d.updated_at
+        FROM documents d
+    """)
+    if bind.dialect.name == "sqlite":
+        op.execute(f"""
+            INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, tags, description, content)
+            SELECT document_id, coalesce(title, ''), coalesce(tags, ''), coalesce(description, ''), ''
+            FROM document_search
+        """)
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}")
+    op.drop_table('document_search')
@@ -0,0 +1,91 @@
+"""background text extraction jobs
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+# Types the extraction worker handled as of this revision, copied here so
+# the migration does not change with the app
+EXTRACTABLE_MIME_TYPES = {
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/x-yaml",
+    "application/yaml",
+    "application/sql",
+    "image/svg+xml",
+}
+
+
+def can_extract(mime_type) -> bool:
+    mime_type = (mime_type or "").split(";")[0].strip().lower()
+    return mime_type.startswith("text/") or mime_type in EXTRACTABLE_MIME_TYPES
+
+def upgrade() -> None:
+    op.add_column('document_versions', sa.Column('extracted_text', sa.Text(), nullable=True))
+    op.add_column('document_versions', sa.Column('page_count', sa.Integer(), nullable=True))
+    op.add_column('document_versions', sa.Column('extraction_metadata', sa.Text(), nullable=True))
+
+    jobs = op.create_table(
+        'extraction_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version_id', sa.Integer(), nullable=False),
+        sa.Column('mime_type', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['version_id'], ['document_versions.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('version_id')
+    )
+    op.create_index(op.f('ix_extraction_jobs_id'), 'extraction_jobs', ['id'], unique=False)
+    op.create_index(
+        'ix_extraction_jobs_status_available_at', 'extraction_jobs', ['status', 'available_at'], unique=False
+    )
+
+    # Queue extraction for the current version of every existing document so
+    # their contents become searchable
+    rows = op.get_bind().execute(sa.text("""
+        SELECT v.id, d.mime_type
+        FROM document_versions v
+        JOIN documents d ON d.id = v.document_id AND d.version = v.version_number
+    """))
+    now = datetime.utcnow()
+    op.bulk_insert(jobs, [
+        {
+            'version_id': version_id,
+            'mime_type': mime_type,
+            'status': 'pending',
+            'attempts': 0,
+            'available_at': now,
+            'created_at': now,
+            'updated_at': now,
+        }
+        for version_id, mime_type in rows
+        if can_extract(mime_type)
+    ])
+
+def downgrade() -> None:
+    op.drop_index('ix_extraction_jobs_status_available_at', table_name='extraction_jobs')
+    op.drop_index(op.f('ix_extraction_jobs_id'), table_name='extraction_jobs')
+    op.drop_table('extraction_jobs')
+    op.drop_column('document_versions', 'extraction_metadata')
+    op.drop_column('document_versions', 'page_count')
+    op.drop_column('document_versions', 'extracted_text')
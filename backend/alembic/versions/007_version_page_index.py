@@ -0,0 +1,51 @@
+"""per-page index of PDF versions
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    pages = op.create_table(
+        'document_version_pages',
+        sa.Column('version_id', sa.Integer(), nullable=False),
+        sa.Column('page_number', sa.Integer(), nullable=False),
+        sa.Column('text', sa.Text(), nullable=True),
+        sa.Column('text_offset', sa.Integer(), nullable=True),
+        sa.Column('byte_offset', sa.BigInteger(), nullable=True),
+        sa.Column('byte_length', sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['version_id'], ['document_versions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('version_id', 'page_number')
+    )
+
+    # PDFs that were already extracted have their pages separated by form
+    # feeds; index them from that text. Byte spans are filled in the next
+    # time a version is extracted.
+    rows = op.get_bind().execute(sa.text("""
+        SELECT id, extracted_text
+        FROM document_versions
+        WHERE page_count IS NOT NULL AND extracted_text IS NOT NULL
+    """))
+    for version_id, extracted_text in rows:
+        batch = []
+        offset = 0
+        for number, page_text in enumerate(extracted_text.split('\f'), start=1):
+            batch.append({
+                'version_id': version_id,
+                'page_number': number,
+                'text': page_text,
+                'text_offset': offset,
+            })
+            offset += len(page_text) + 1
+        op.bulk_insert(pages, batch)
+
+def downgrade() -> None:
+    op.drop_table('document_version_pages')
@@ -0,0 +1,53 @@
+"""optimistic row versions and unique version numbers
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column(
+        'documents', sa.Column('row_version', sa.Integer(), nullable=False, server_default='1')
+    )
+
+    # Concurrent check-ins could give two versions the same number; renumber
+    # those documents' versions in upload order so the constraint holds
+    bind = op.get_bind()
+    duplicated = bind.execute(sa.text("""
+        SELECT DISTINCT document_id
+        FROM document_versions
+        GROUP BY document_id, version_number
+        HAVING count(*) > 1
+    """)).scalars().all()
+    for document_id in duplicated:
+        version_ids = bind.execute(
+            sa.text("SELECT id FROM document_versions WHERE document_id = :id ORDER BY version_number, id"),
+            {'id': document_id}
+        ).scalars().all()
+        for number, version_id in enumerate(version_ids, start=1):
+            bind.execute(
+                sa.text("UPDATE document_versions SET version_number = :number WHERE id = :id"),
+                {'number': number, 'id': version_id}
+            )
+        bind.execute(
+            sa.text("UPDATE documents SET version = :number WHERE id = :id"),
+            {'number': len(version_ids), 'id': document_id}
+        )
+
+    with op.batch_alter_table('document_versions') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_document_versions_document_id_version_number', ['document_id', 'version_number']
+        )
+
+def downgrade() -> None:
+    with op.batch_alter_table('document_versions') as batch_op:
+        batch_op.drop_constraint('uq_document_versions_document_id_version_number', type_='unique')
+    op.drop_column('documents', 'row_version')
@@ -0,0 +1,36 @@
+"""checkout lease expiry
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+"""
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+# CHECKOUT_LEASE_MINUTES when this migration was written, frozen so the
+# backfill does not depend on the settings it happens to run with
+LEASE_MINUTES = 480
+
+def upgrade() -> None:
+    op.add_column('document_checkouts', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        op.f('ix_document_checkouts_expires_at'), 'document_checkouts', ['expires_at'], unique=False
+    )
+
+    # Existing checkouts get a full lease from the upgrade rather than
+    # expiring the moment the sweeper first runs
+    op.get_bind().execute(
+        sa.text("UPDATE document_checkouts SET expires_at = :expires_at"),
+        {'expires_at': datetime.utcnow() + timedelta(minutes=LEASE_MINUTES)}
+    )
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_document_checkouts_expires_at'), table_name='document_checkouts')
+    op.drop_column('document_checkouts', 'expires_at')
@@ -2,10 +2,10 @@ from datetime import timedelta
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import get_settings
-from ..core.deps import get_db
+from ..core.deps import get_async_db
 from ..core.security import create_access_token
 from ..schemas.token import Token
 from ..services import user as user_service
@@ -15,16 +15,14 @@ router = APIRouter()
 
 
 @router.post("/login", response_model=Token)
-def login(
-    db: Annotated[Session, Depends(get_db)],
+async def login(
+    db: Annotated[AsyncSession, Depends(get_async_db)],
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ) -> Token:
     """OAuth2 compatible token login, get an access token for future requests."""
-    print(f"Login attempt with username: {form_data.username}")
-    user = user_service.authenticate(
+    user = await user_service.authenticate(
         db, username=form_data.username, password=form_data.password
     )
-    print(f"Authentication result: {'success' if user else 'failed'}")
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -43,5 +41,4 @@ def login(
         ),
         token_type="bearer",
     )
-    print(f"Generated token for user: {user.username}")
     return token
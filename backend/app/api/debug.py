@@ -0,0 +1,43 @@
+from typing import Annotated, Any
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from ..core import profiling
+from ..core.deps import get_current_active_superuser
+from ..schemas.user import UserPrincipal
+
+router = APIRouter()
+
+
+@router.get("/sql-profiles")
+def list_sql_profiles(
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_superuser)],
+    limit: int = 20,
+) -> list[dict[str, Any]]:
+    """Summaries of the most recently profiled requests, newest first."""
+    return [
+        {
+            "id": profile.id,
+            "method": profile.method,
+            "path": profile.path,
+            "route": profile.route,
+            "queries": profile.queries,
+            "time_ms": round(profile.total_time * 1000, 3),
+            "repeated": len(profile.repeated()),
+        }
+        for profile in profiling.recent_profiles()[:limit]
+    ]
+
+
+@router.get("/sql-profiles/{profile_id}")
+def get_sql_profile(
+    profile_id: str,
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_superuser)],
+) -> dict[str, Any]:
+    """Every statement shape one request ran, named by its X-SQL-Profile-Id header."""
+    profile = profiling.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found",
+        )
+    return profile.to_dict()
@@ -1,24 +1,63 @@
+import io
+import json
+import logging
 import os
+from collections import Counter
+from datetime import datetime
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, UploadFile, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from ..core.config import get_settings
-from ..core.deps import get_current_active_user, get_db
-from ..models.models import User
-from ..schemas.document import Document, DocumentCreate, DocumentUpdate, DocumentVersion
+from ..core.database import BUSY_ERRORS
+from ..core.deps import get_async_db, get_current_active_user, get_db, get_page_cursor
+from ..core.http import (
+    accepts_encoding,
+    content_disposition,
+    http_date,
+    is_not_modified,
+    ranged_response,
+)
+from ..core.pagination import NEXT_CURSOR_HEADER, encode_cursor, next_cursor
+from ..schemas.document import (
+    BatchDownloadRequest,
+    BulkUploadItem,
+    BulkUploadResult,
+    Document,
+    DocumentCheckout,
+    DocumentCreate,
+    DocumentSearchResult,
+    DocumentUpdate,
+    DocumentVersion,
+    ExtractionStatus,
+    VersionDiff,
+    VersionPages,
+)
+from ..schemas.user import UserPrincipal
+from ..services import activity_log
+from ..services import archive as archive_service
+from ..services import bulk as bulk_service
+from ..services import delta as delta_service
+from ..services import diff as diff_service
 from ..services import document as document_service
+from ..services import extraction as extraction_service
+from ..services import pages as page_service
+from ..services import renditions as rendition_service
+from ..services import storage
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 @router.post("", response_model=Document)
 async def create_document(
     *,
-    db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
     file: UploadFile = File(...),
     title: str = Form(...),
     description: str | None = Form(None),
@@ -31,39 +70,122 @@ async def create_document(
         description=description,
         tags=tag_list
     )
-    upload_dir = os.path.join(settings.UPLOAD_DIR, str(current_user.id))
     document = await document_service.create_document(
         db=db,
         document_in=document_in,
         file=file,
-        owner_id=current_user.id,
-        upload_dir=upload_dir
+        owner_id=current_user.id
     )
     return document
 
 
+@router.post("/bulk", response_model=BulkUploadResult)
+async def bulk_upload_documents(
+    *,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    files: list[UploadFile] = File([]),
+    archive: Optional[UploadFile] = File(None),
+    manifest: Optional[str] = Form(None)
+) -> BulkUploadResult:
+    """Create many documents from a multipart batch or a zip/tar archive.
+
+    ``manifest`` is a JSON list of {filename, title, description, tags,
+    mime_type}; an archive may carry it as manifest.json instead. Without a
+    manifest every file becomes a document titled after its filename; with
+    one, files it does not list are reported as skipped. Files
+    are stored in parallel and all documents are inserted in one transaction;
+    the response reports the outcome of every file. Multipart batches are
+    limited to 1000 files by the form parser, so send larger sets as an
+    archive.
+    """
+    if bool(files) == bool(archive):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Send either files or an archive",
+        )
+    try:
+        if archive:
+            items = await bulk_service.ingest_archive(db, archive, manifest, current_user.id)
+        else:
+            items = await bulk_service.ingest_uploads(db, files, manifest, current_user.id)
+    except bulk_service.BulkUploadError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    results = [
+        BulkUploadItem(
+            filename=item.filename,
+            status="skipped" if item.skipped else "failed" if item.error else "created",
+            document_id=item.document_id,
+            error=item.error
+        )
+        for item in items
+    ]
+    counts = Counter(result.status for result in results)
+    return BulkUploadResult(
+        created=counts["created"], failed=counts["failed"], skipped=counts["skipped"], items=results
+    )
+
+
 @router.get("", response_model=list[Document])
 def read_documents(
     db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    response: Response,
+    after: Annotated[Optional[tuple], Depends(get_page_cursor)],
     skip: int = 0,
     limit: int = 100,
 ) -> list[Document]:
-    """Retrieve documents."""
+    """Retrieve documents, newest first.
+
+    Pass the X-Next-Cursor response header back as ``cursor`` to fetch the
+    next page.
+    """
     if current_user.is_superuser:
-        documents = document_service.get_documents(db, skip=skip, limit=limit)
+        documents = document_service.get_documents(db, skip=skip, limit=limit, after=after)
     else:
         documents = document_service.get_documents(
-            db, skip=skip, limit=limit, owner_id=current_user.id
+            db, skip=skip, limit=limit, owner_id=current_user.id, after=after
         )
+    cursor = next_cursor(documents, limit, "updated_at")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     return documents
 
 
+@router.get("/search", response_model=list[DocumentSearchResult])
+def search_documents(
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+) -> list[DocumentSearchResult]:
+    """Ranked full-text search over titles, descriptions, tags and file contents.
+
+    PDF results list the pages that contain every search term.
+    """
+    results = document_service.search_documents(
+        db,
+        q,
+        owner_id=None if current_user.is_superuser else current_user.id,
+        limit=min(limit, 100),
+        offset=offset
+    )
+    return [
+        DocumentSearchResult(document=document, score=score, snippet=snippet, pages=pages)
+        for document, score, snippet, pages in results
+    ]
+
+
 @router.get("/{document_id}", response_model=Document)
 def read_document(
     *,
     db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
     document_id: int,
 ) -> Document:
     """Get document by ID."""
@@ -84,16 +206,21 @@ def read_document(
 @router.put("/{document_id}", response_model=Document)
 async def update_document(
     *,
-    db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
     document_id: int,
     title: Optional[str] = None,
     description: Optional[str] = None,
     tags: Optional[list[str]] = None,
-    file: Optional[UploadFile] = None
+    file: Optional[UploadFile] = None,
+    if_match: Annotated[Optional[str], Header()] = None
 ) -> Document:
-    """Update document."""
-    document = document_service.get_document(db, document_id=document_id)
+    """Update document.
+
+    Send the document's ``row_version`` in If-Match to have the update
+    refused (412) if the document changed since it was read.
+    """
+    document = await document_service.get_document_async(db, document_id=document_id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -104,6 +231,11 @@ async def update_document(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Not enough permissions",
         )
+    if if_match is not None and if_match.strip().strip('"') != str(document.row_version):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="The document has changed since it was read",
+        )
     
     document_in = DocumentUpdate(
         title=title or document.title,
@@ -111,17 +243,18 @@ async def update_document(
         tags=tags if tags is not None else [tag.name for tag in document.tags]
     )
     
-    upload_dir = None
-    if file:
-        upload_dir = os.path.join(settings.UPLOAD_DIR, str(current_user.id))
-    
-    document = await document_service.update_document(
-        db=db,
-        document=document,
-        document_in=document_in,
-        file=file,
-        upload_dir=upload_dir
-    )
+    try:
+        document = await document_service.update_document(
+            db=db,
+            document=document,
+            document_in=document_in,
+            file=file
+        )
+    except document_service.DocumentConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     return document
 
 
@@ -129,7 +262,7 @@ async def update_document(
 def delete_document(
     *,
     db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
     document_id: int,
 ) -> dict[str, str]:
     """Delete document."""
@@ -152,14 +285,27 @@ def delete_document(
 @router.get("/{document_id}/download")
 async def download_document(
     *,
-    db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
     document_id: int,
-    version: Optional[int] = None
-) -> FileResponse:
-    """Download document file."""
+    version: Optional[int] = None,
+    accept_encoding: Annotated[Optional[str], Header()] = None,
+    range_header: Annotated[Optional[str], Header(alias="Range")] = None,
+    if_range: Annotated[Optional[str], Header()] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    if_modified_since: Annotated[Optional[str], Header()] = None
+) -> Response:
+    """Download document file.
+
+    Supports byte ranges (including multipart/byteranges), version-stable
+    strong ETags and 304 responses. Compressed blobs are sent as-is with a
+    Content-Encoding header when the client accepts that encoding, and
+    decompressed on the fly otherwise.
+    """
     try:
-        document = document_service.get_document(db, document_id=document_id)
+        document = await document_service.get_document_async(
+            db, document_id=document_id, with_relations=False
+        )
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -171,30 +317,82 @@ async def download_document(
                 detail="Not enough permissions",
             )
         
-        if version:
-            doc_version = document_service.get_document_version(
-                db, document_id=document_id, version_number=version
+        doc_version = await document_service.get_document_version_async(
+            db, document_id=document_id, version_number=version or document.version
+        )
+        if version and not doc_version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Version {version} not found",
             )
-            if not doc_version:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Version {version} not found",
-                )
-            file_path = doc_version.file_path
-        else:
-            file_path = document.file_path
+        file_path = doc_version.file_path if doc_version else document.file_path
+        filename = (doc_version and doc_version.filename) or os.path.basename(file_path)
         
         if not os.path.exists(file_path):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="File not found on server",
             )
+        # Whole downloads only; viewers fetch ranges of the same file
+        if settings.ACTIVITY_LOG_VIEWS and range_header is None:
+            activity_log.record(
+                document.id, current_user.id, "download", f"Version {version or document.version}"
+            )
+        
+        is_delta = doc_version is not None and doc_version.delta_base_id is not None
+        stored_encoding = None if is_delta else storage.blob_encoding(file_path)
+        send_encoded = stored_encoding is not None and accepts_encoding(accept_encoding, stored_encoding)
+        
+        # The ETag identifies the version's content and, when sent compressed,
+        # the encoding; explicit ?version= URLs never change and can be cached
+        if doc_version and doc_version.content_hash:
+            tag = doc_version.content_hash
+        else:
+            stat = os.stat(file_path)
+            tag = f"{document.id}-{int(stat.st_mtime)}-{stat.st_size}"
+        etag = f'"{tag}.{stored_encoding}"' if send_encoded else f'"{tag}"'
+        last_modified = doc_version.created_at if doc_version else document.updated_at
+        headers = {
+            "Content-Disposition": content_disposition(filename),
+            "Cache-Control": "private, max-age=31536000, immutable" if version else "private, no-cache",
+        }
+        if stored_encoding:
+            headers["Vary"] = "Accept-Encoding"
+        
+        if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+            headers = {key: value for key, value in headers.items() if key != "Content-Disposition"}
+            headers["ETag"] = etag
+            headers["Last-Modified"] = http_date(last_modified)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        if is_delta:
+            chain = await db.run_sync(delta_service.version_chain, doc_version)
+            content = await run_in_threadpool(delta_service.read_chain_content, chain)
+            opener = lambda: io.BytesIO(content)
+            size = len(content)
+        elif send_encoded:
+            headers["Content-Encoding"] = stored_encoding
+            opener = lambda: open(file_path, "rb")
+            size = os.path.getsize(file_path)
+        elif stored_encoding:
+            opener = lambda: storage.open_blob(file_path)
+            size = doc_version.file_size if doc_version else None
+        else:
+            opener = lambda: open(file_path, "rb")
+            size = os.path.getsize(file_path)
         
-        return FileResponse(
-            file_path,
+        return ranged_response(
+            opener,
+            size,
             media_type=document.mime_type,
-            filename=os.path.basename(file_path)
+            etag=etag,
+            last_modified=last_modified,
+            range_header=range_header,
+            if_range=if_range,
+            headers=headers
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -202,15 +400,84 @@ async def download_document(
         )
 
 
+@router.post("/batch-download")
+async def batch_download_documents(
+    *,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    request: BatchDownloadRequest
+) -> StreamingResponse:
+    """Download several documents, or specific versions, as one zip archive.
+
+    The archive is built while it is sent: files are read from storage in
+    chunks and nothing is buffered or written to disk. Already-compressed
+    formats are stored rather than deflated; ``store_only`` stores everything.
+    """
+    if not request.documents:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No documents requested",
+        )
+    if len(request.documents) > settings.BATCH_DOWNLOAD_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_DOWNLOAD_MAX_ITEMS} documents per archive",
+        )
+
+    requested = [(item.document_id, item.version) for item in request.documents]
+    resolved = await db.run_sync(document_service.get_versions_for_download, requested)
+    # Everything is checked up front; errors cannot be reported mid-stream
+    for (document_id, version), (document, doc_version) in zip(requested, resolved):
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Document {document_id} not found",
+            )
+        if not current_user.is_superuser and document.owner_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Not enough permissions",
+            )
+        if version and not doc_version:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Version {version} of document {document_id} not found",
+            )
+
+    if settings.ACTIVITY_LOG_VIEWS:
+        for document, doc_version in resolved:
+            number = doc_version.version_number if doc_version else document.version
+            activity_log.record(document.id, current_user.id, "download", f"Version {number} (archive)")
+    entries = await db.run_sync(archive_service.download_entries, resolved, request.store_only)
+    filename = f"documents-{datetime.utcnow():%Y%m%d-%H%M%S}.zip"
+    return StreamingResponse(
+        archive_service.iter_zip(entries),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": content_disposition(filename),
+            "Cache-Control": "private, no-store",
+        }
+    )
+
+
 @router.get("/{document_id}/activities")
 def get_document_activities(
     *,
     db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    response: Response,
+    after: Annotated[Optional[tuple], Depends(get_page_cursor)],
     document_id: int,
+    limit: int = 100,
 ) -> list[dict]:
-    """Get document activities."""
-    document = document_service.get_document(db, document_id=document_id)
+    """Get document activities, newest first, paginated with ``cursor``.
+
+    Activities are written in batches, so a new one can take up to
+    ACTIVITY_FLUSH_INTERVAL seconds to appear.
+    """
+    document = document_service.get_document(
+        db, document_id=document_id, with_relations=False
+    )
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -222,21 +489,434 @@ def get_document_activities(
             detail="Not enough permissions",
         )
     
-    activities = document_service.get_document_activities(db, document_id=document_id)
+    activities = document_service.get_document_activities(
+        db, document_id=document_id, limit=limit, after=after
+    )
+    if limit > 0 and len(activities) == limit:
+        last = activities[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            datetime.fromisoformat(last["activity_time"]), last["id"]
+        )
     return activities
 
 
+@router.get(
+    "/{document_id}/versions/{version_number}/extraction",
+    response_model=ExtractionStatus
+)
+def get_extraction_status(
+    *,
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    document_id: int,
+    version_number: int
+) -> ExtractionStatus:
+    """Get the state of a version's background text extraction."""
+    document = document_service.get_document(
+        db, document_id=document_id, with_relations=False
+    )
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found",
+        )
+    if not current_user.is_superuser and document.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not enough permissions",
+        )
+    
+    doc_version = document_service.get_document_version(
+        db, document_id=document_id, version_number=version_number
+    )
+    job = doc_version and extraction_service.get_job(db, doc_version.id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No extraction job for version {version_number}",
+        )
+    text = doc_version.extracted_text
+    return ExtractionStatus(
+        version_number=version_number,
+        status=job.status,
+        attempts=job.attempts,
+        last_error=job.last_error,
+        available_at=job.available_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        page_count=doc_version.page_count,
+        text_length=len(text) if text is not None else None,
+        metadata=json.loads(doc_version.extraction_metadata or "{}"),
+    )
+
+
+@router.get(
+    "/{document_id}/versions/{version_a}/diff/{version_b}",
+    response_model=VersionDiff
+)
+def diff_versions(
+    *,
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    response: Response,
+    document_id: int,
+    version_a: int,
+    version_b: int,
+    mode: str = "line",
+    context: int = 3,
+    offset: int = 0,
+    limit: int = 50,
+    page: Optional[int] = None,
+) -> VersionDiff:
+    """Diff two versions on the server, one page of hunks at a time.
+
+    ``mode`` is ``line``, ``word`` or ``structured`` (lines with word-level
+    changes). PDFs and Office files are compared by their extracted text;
+    ``page`` compares a single PDF page using the versions' page indexes.
+    """
+    document = document_service.get_document(
+        db, document_id=document_id, with_relations=False
+    )
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found",
+        )
+    if not current_user.is_superuser and document.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not enough permissions",
+        )
+    
+    versions = {}
+    for number in (version_a, version_b):
+        versions[number] = document_service.get_document_version(
+            db, document_id=document_id, version_number=number
+        )
+        if not versions[number]:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Version {number} not found",
+            )
+    old, new = versions[version_a], versions[version_b]
+    offset = max(offset, 0)
+    
+    try:
+        summary, hunks = diff_service.get_diff(
+            old.content_hash,
+            new.content_hash,
+            lambda: diff_service.version_text(db, document, old, page),
+            lambda: diff_service.version_text(db, document, new, page),
+            mode=mode,
+            context=max(0, min(context, 20)),
+            offset=offset,
+            limit=max(1, min(limit, 500)),
+            page=page
+        )
+    except diff_service.TextUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Versions never change, so neither does their diff
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return VersionDiff(
+        version_a=version_a,
+        version_b=version_b,
+        mode=mode,
+        offset=offset,
+        page=page,
+        hunks=hunks,
+        **summary
+    )
+
+
+async def _rendition_response(
+    db: AsyncSession,
+    current_user: UserPrincipal,
+    document_id: int,
+    version_number: int,
+    kind: str,
+    page: int,
+    if_none_match: Optional[str]
+) -> Response:
+    document = await document_service.get_document_async(
+        db, document_id=document_id, with_relations=False
+    )
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found",
+        )
+    if not current_user.is_superuser and document.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not enough permissions",
+        )
+    doc_version = await document_service.get_document_version_async(
+        db, document_id=document_id, version_number=version_number
+    )
+    if not doc_version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Version {version_number} not found",
+        )
+    mime_type = document_service.version_mime_type(document, doc_version)
+    if not rendition_service.can_render(mime_type):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Previews are not available for this file type",
+        )
+    # The viewer opens a document at its first page
+    if settings.ACTIVITY_LOG_VIEWS and kind == rendition_service.PREVIEW and page == 1:
+        activity_log.record(document.id, current_user.id, "view", f"Version {version_number}")
+    
+    # Versions never change, so neither do their renditions
+    headers = {"Cache-Control": "private, max-age=31536000, immutable"}
+    if doc_version.content_hash:
+        headers["ETag"] = f'"{doc_version.content_hash}-{kind}-{page}"'
+        if is_not_modified(if_none_match, None, headers["ETag"], None):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if doc_version.page_count:
+        headers[rendition_service.PAGE_COUNT_HEADER] = str(doc_version.page_count)
+    
+    chain = await db.run_sync(delta_service.version_chain, doc_version)
+    paths = [version.file_path for version in chain]
+    try:
+        data = await rendition_service.get_rendition(
+            doc_version.content_hash,
+            mime_type,
+            kind,
+            page,
+            paths
+        )
+    except rendition_service.PageOutOfRange as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+            headers={rendition_service.PAGE_COUNT_HEADER: str(e.page_count)}
+        )
+    except Exception as e:
+        logger.warning(
+            "Rendering failed",
+            extra={"document_id": document_id, "version": version_number, "error": str(e)}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="The file could not be rendered",
+        )
+    return Response(content=data, media_type=rendition_service.MEDIA_TYPE, headers=headers)
+
+
+@router.get("/{document_id}/versions/{version_number}/preview/{page}")
+async def get_version_preview(
+    *,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    document_id: int,
+    version_number: int,
+    page: int,
+    if_none_match: Annotated[Optional[str], Header()] = None
+) -> Response:
+    """A low-resolution JPEG of one page (1-based) of a PDF or image version.
+
+    Rendered on first request and then served from a disk cache keyed by
+    the version's content hash.
+    """
+    return await _rendition_response(
+        db, current_user, document_id, version_number, rendition_service.PREVIEW, page, if_none_match
+    )
+
+
+@router.get("/{document_id}/versions/{version_number}/thumbnail")
+async def get_version_thumbnail(
+    *,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    document_id: int,
+    version_number: int,
+    if_none_match: Annotated[Optional[str], Header()] = None
+) -> Response:
+    """A small JPEG of the first page of a PDF or image version."""
+    return await _rendition_response(
+        db, current_user, document_id, version_number, rendition_service.THUMBNAIL, 1, if_none_match
+    )
+
+
+@router.get("/{document_id}/versions/{version_number}/pages", response_model=VersionPages)
+def get_version_pages(
+    *,
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    response: Response,
+    document_id: int,
+    version_number: int,
+    start: int = 1,
+    end: Optional[int] = None,
+    include_text: bool = False,
+) -> VersionPages:
+    """The page index of a PDF version: byte spans and, optionally, text per page.
+
+    Without text the whole index is returned by default; with text at most
+    PAGE_RANGE_MAX_PAGES pages are returned per request.
+    """
+    document = document_service.get_document(
+        db, document_id=document_id, with_relations=False
+    )
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found",
+        )
+    if not current_user.is_superuser and document.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not enough permissions",
+        )
+    
+    doc_version = document_service.get_document_version(
+        db, document_id=document_id, version_number=version_number
+    )
+    if not doc_version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Version {version_number} not found",
+        )
+    if document_service.version_mime_type(document, doc_version) != page_service.MEDIA_TYPE:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Page indexes are only kept for PDFs",
+        )
+    if doc_version.page_count is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Pages of version {version_number} have not been indexed yet",
+        )
+    
+    start = max(start, 1)
+    end = min(end or doc_version.page_count, doc_version.page_count)
+    if include_text:
+        end = min(end, start + settings.PAGE_RANGE_MAX_PAGES - 1)
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return VersionPages(
+        version_number=version_number,
+        page_count=doc_version.page_count,
+        pages=page_service.get_pages(db, doc_version.id, start, end, with_text=include_text),
+    )
+
+
+@router.get("/{document_id}/versions/{version_number}/pages/pdf")
+async def get_version_page_range(
+    *,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    document_id: int,
+    version_number: int,
+    start: int = 1,
+    end: Optional[int] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None
+) -> Response:
+    """Pages ``start`` to ``end`` (1-based, inclusive) of a PDF version as a PDF of their own.
+
+    Lets a viewer open a large PDF without downloading all of it. Ranges
+    are cut once and then served from a disk cache.
+    """
+    document = await document_service.get_document_async(
+        db, document_id=document_id, with_relations=False
+    )
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found",
+        )
+    if not current_user.is_superuser and document.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not enough permissions",
+        )
+    doc_version = await document_service.get_document_version_async(
+        db, document_id=document_id, version_number=version_number
+    )
+    if not doc_version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Version {version_number} not found",
+        )
+    mime_type = document_service.version_mime_type(document, doc_version)
+    if mime_type != page_service.MEDIA_TYPE or not page_service.can_split():
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Page ranges are only available for PDFs",
+        )
+    end = end or start
+    if start < 1 or end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid page range",
+        )
+    if end - start + 1 > settings.PAGE_RANGE_MAX_PAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.PAGE_RANGE_MAX_PAGES} pages per request",
+        )
+    
+    stem = os.path.splitext(doc_version.filename or "document")[0]
+    headers = {
+        # Versions never change, so neither do their pages
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Content-Disposition": content_disposition(f"{stem}-pages-{start}-{end}.pdf"),
+    }
+    if doc_version.content_hash:
+        headers["ETag"] = f'"{doc_version.content_hash}-pages-{start}-{end}"'
+        if is_not_modified(if_none_match, None, headers["ETag"], None):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if doc_version.page_count:
+        headers[rendition_service.PAGE_COUNT_HEADER] = str(doc_version.page_count)
+    
+    chain = await db.run_sync(delta_service.version_chain, doc_version)
+    try:
+        data = await run_in_threadpool(
+            page_service.page_range_pdf,
+            doc_version.content_hash,
+            [version.file_path for version in chain],
+            start,
+            end
+        )
+    except rendition_service.PageOutOfRange as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+            headers={rendition_service.PAGE_COUNT_HEADER: str(e.page_count)}
+        )
+    except Exception as e:
+        logger.warning(
+            "Page range failed",
+            extra={"document_id": document_id, "version": version_number, "error": str(e)}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="The file could not be split into pages",
+        )
+    return Response(content=data, media_type=page_service.MEDIA_TYPE, headers=headers)
+
+
 @router.post("/{document_id}/checkout")
 async def checkout_document(
     *,
-    db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
     document_id: int,
     comments: str = Form(...)
 ) -> Document:
     """Check out a document for editing."""
     try:
-        document = document_service.get_document(db, document_id=document_id)
+        document = await document_service.get_document_async(db, document_id=document_id)
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -248,12 +928,19 @@ async def checkout_document(
                 detail="Not enough permissions",
             )
         
-        return document_service.checkout_document(
+        return await document_service.checkout_document_async(
             db=db,
             document=document,
             user_id=current_user.id,
             comments=comments
         )
+    except (HTTPException, *BUSY_ERRORS):
+        raise
+    except document_service.DocumentConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -266,18 +953,55 @@ async def checkout_document(
         )
 
 
+@router.post("/{document_id}/checkout/heartbeat")
+def renew_checkout(
+    *,
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
+    document_id: int
+) -> DocumentCheckout:
+    """Renew the current user's checkout lease.
+
+    Clients call this while the document is being edited; a checkout that is
+    neither renewed nor checked in is released once its lease runs out.
+    """
+    document = document_service.get_document(db, document_id=document_id, with_relations=False)
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found",
+        )
+    if not current_user.is_superuser and document.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    try:
+        return document_service.renew_checkout(db, document, current_user.id)
+    except document_service.DocumentConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.post("/{document_id}/checkin")
 async def checkin_document(
     *,
-    db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
     document_id: int,
     comments: str = Form(...),
     new_version: Optional[UploadFile] = File(None)
 ) -> Document:
     """Check in a document after editing."""
     try:
-        document = document_service.get_document(db, document_id=document_id)
+        document = await document_service.get_document_async(db, document_id=document_id)
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -289,17 +1013,19 @@ async def checkin_document(
                 detail="Not enough permissions",
             )
         
-        upload_dir = None
-        if new_version:
-            upload_dir = os.path.join(settings.UPLOAD_DIR, str(current_user.id))
-        
         return await document_service.checkin_document(
             db=db,
             document=document,
             user_id=current_user.id,
             comments=comments,
-            file=new_version,
-            upload_dir=upload_dir
+            file=new_version
+        )
+    except (HTTPException, *BUSY_ERRORS):
+        raise
+    except document_service.DocumentConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
         )
     except ValueError as e:
         raise HTTPException(
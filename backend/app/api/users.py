@@ -1,32 +1,44 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
-from ..core.deps import get_current_active_superuser, get_current_active_user, get_db
+from ..core.deps import get_current_active_superuser, get_current_active_user, get_db, get_page_cursor
+from ..core.pagination import NEXT_CURSOR_HEADER, next_cursor
 from ..models.models import User
-from ..schemas.user import User as UserSchema, UserCreate, UserUpdate
+from ..schemas.user import User as UserSchema, UserCreate, UserPrincipal, UserUpdate
 from ..services import user as user_service
 
 router = APIRouter()
 
 
+def _load_user(db: Session, principal: UserPrincipal) -> User:
+    user = user_service.get_user(db, user_id=principal.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    return user
+
+
 @router.get("/me", response_model=UserSchema)
 def read_user_me(
-    current_user: Annotated[User, Depends(get_current_active_user)]
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)]
 ) -> User:
     """Get current user."""
-    return current_user
+    return _load_user(db, current_user)
 
 
 @router.put("/me", response_model=UserSchema)
 def update_user_me(
     *,
     db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
     user_in: UserUpdate,
 ) -> User:
     """Update current user."""
-    user = user_service.update_user(db, db_user=current_user, user_in=user_in)
+    user = user_service.update_user(db, db_user=_load_user(db, current_user), user_in=user_in)
     return user
 
 
@@ -35,7 +47,7 @@ def create_user(
     *,
     db: Annotated[Session, Depends(get_db)],
     user_in: UserCreate,
-    current_user: Annotated[User, Depends(get_current_active_superuser)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_superuser)],
 ) -> User:
     """Create new user. Only superusers can create new users."""
     user = user_service.get_user_by_email(db, email=user_in.email)
@@ -51,24 +63,29 @@ def create_user(
 @router.get("", response_model=list[UserSchema])
 def read_users(
     db: Annotated[Session, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_active_superuser)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_superuser)],
+    response: Response,
+    after: Annotated[Optional[tuple], Depends(get_page_cursor)],
     skip: int = 0,
     limit: int = 100,
 ) -> list[User]:
     """Retrieve users. Only superusers can retrieve all users."""
-    users = user_service.get_users(db, skip=skip, limit=limit)
+    users = user_service.get_users(db, skip=skip, limit=limit, after=after)
+    cursor = next_cursor(users, limit, "created_at")
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     return users
 
 
 @router.get("/{user_id}", response_model=UserSchema)
 def read_user_by_id(
     user_id: int,
-    current_user: Annotated[User, Depends(get_current_active_user)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_active_user)],
     db: Annotated[Session, Depends(get_db)],
 ) -> User:
     """Get a specific user by id."""
     user = user_service.get_user(db, user_id=user_id)
-    if user == current_user:
+    if user_id == current_user.id:
         return user
     if not user_service.is_superuser(current_user):
         raise HTTPException(
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TextIO, TypeVar
+from .metrics import registry
+
+V = TypeVar("V")
+
+registry.describe("cache_requests_total", "Cache lookups by cache name and result (hit or miss).")
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                registry.inc("cache_requests_total", cache=self.name, result="hit")
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+        registry.inc("cache_requests_total", cache=self.name, result="miss")
+        return None
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskLRUCache:
+    """Size-bounded directory of cached files, evicting the least recently used.
+
+    Recency is each file's mtime, bumped on every hit, so several processes
+    can share one directory. Bytes written by this process are tallied and a
+    full scan only runs once the tally passes ``max_bytes``; eviction then
+    goes down to ``low_water`` of the limit so scans stay rare.
+    """
+
+    def __init__(self, name: str, directory: str, max_bytes: int, low_water: float = 0.8):
+        self.name = name
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+
+    def get(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as cached:
+                data = cached.read()
+            os.utime(path)
+        except FileNotFoundError:
+            registry.inc("cache_requests_total", cache=self.name, result="miss")
+            return None
+        registry.inc("cache_requests_total", cache=self.name, result="hit")
+        return data
+
+    def open_text(self, path: str) -> Optional[TextIO]:
+        """Like get(), but returns the open file so a caller can read part of it."""
+        try:
+            cached = open(path, encoding="utf-8")
+        except FileNotFoundError:
+            registry.inc("cache_requests_total", cache=self.name, result="miss")
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # Evicted since it was opened; the open file still reads
+        registry.inc("cache_requests_total", cache=self.name, result="hit")
+        return cached
+
+    def put(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._scan())
+            else:
+                self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * self.low_water
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total = total
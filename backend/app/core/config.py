@@ -21,16 +21,155 @@ class Settings(BaseSettings):
             return self.DATABASE_URL
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
 
+    @property
+    def async_database_url(self) -> str:
+        url = self.sync_database_url
+        for sync_prefix, async_prefix in (
+            ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+            ("postgresql://", "postgresql+asyncpg://"),
+            ("postgres://", "postgresql+asyncpg://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if url.startswith(sync_prefix):
+                return async_prefix + url[len(sync_prefix):]
+        return url
+
+    # Connection pool (the sync engine only, for SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a pooled connection is replaced
+    SQLITE_BUSY_TIMEOUT: float = 30.0  # Seconds a statement waits for SQLite's write lock
+
     # JWT
     SECRET_KEY: str = "your-secret-key-here"  # Change in production
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Signing keys by key id. To rotate, add a key and make it active; keep
+    # the old one until tokens signed with it have expired. When empty,
+    # SECRET_KEY is used without a key id.
+    JWT_KEYS: dict[str, str] = {}
+    JWT_ACTIVE_KID: str | None = None  # Defaults to the first key in JWT_KEYS
+    # Whether tokens without a key id, signed with SECRET_KEY, are still
+    # accepted once JWT_KEYS is set. Turn off when they have expired, so
+    # SECRET_KEY is retired like any other key.
+    JWT_ACCEPT_LEGACY_TOKENS: bool = True
+    TOKEN_CACHE_SIZE: int = 10_000  # Verified tokens kept until they expire
+
+    # Password hashing; existing hashes are upgraded on the next successful
+    # login whenever BCRYPT_ROUNDS changes
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # Threads reserved for bcrypt
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # Waiting hashes before requests get a 503
+
+    # Authenticated-user cache; entries are dropped on update_user in this
+    # process, other processes see changes once the TTL runs out
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: int = 60  # Seconds
+
+    # Tag name -> id cache used when tagging documents
+    TAG_CACHE_SIZE: int = 10_000
+    TAG_CACHE_TTL: int = 3600  # Seconds
+
+    # Logging ("json" or "text"); DEBUG adds per-request timing lines
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+
+    # SQL profiling. Slow queries are logged whenever SQL_SLOW_QUERY_MS > 0;
+    # the per-request profiler (response headers, /debug/sql-profiles and
+    # N+1 warnings) is for development and only runs when enabled
+    SQL_SLOW_QUERY_MS: int = 500
+    SQL_PROFILING_ENABLED: bool = False
+    SQL_REPEATED_STATEMENT_THRESHOLD: int = 5  # Same statement shape this often in one request
+    SQL_PROFILE_HISTORY: int = 100  # Profiles kept for the debug endpoint
 
     # CORS
     BACKEND_CORS_ORIGINS: list[str] = ["http://localhost:3000"]
 
     # Upload Directory Configuration
     UPLOAD_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads")
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # Bytes read per chunk when streaming uploads to disk
+
+    # Bulk ingest (POST /documents/bulk)
+    BULK_UPLOAD_MAX_ITEMS: int = 5000  # Files per batch
+    BULK_UPLOAD_WORKERS: int = 4  # Files hashed, compressed and stored in parallel
+    # Uncompressed size limits for archive uploads, checked before extraction
+    BULK_ARCHIVE_MAX_FILE_SIZE: int = 1024 * 1024 * 1024
+    BULK_ARCHIVE_MAX_TOTAL_SIZE: int = 10 * 1024 * 1024 * 1024
+
+    # Batch download (POST /documents/batch-download)
+    BATCH_DOWNLOAD_MAX_ITEMS: int = 5000
+    BATCH_DOWNLOAD_COMPRESSLEVEL: int = 6  # Deflate level for compressible files
+
+    # Blob garbage collection. Unreferenced blobs younger than the grace
+    # period are kept, as an upload may be about to reference them; the
+    # collector runs inside the API process
+    BLOB_GC_GRACE_SECONDS: int = 3600
+    BLOB_GC_ENABLED: bool = True
+    BLOB_GC_INTERVAL: float = 3600.0  # Seconds between passes over the blob store
+
+    # Delta storage for text-like document versions
+    DELTA_STORAGE_ENABLED: bool = False
+    DELTA_KEYFRAME_INTERVAL: int = 10  # Store a full copy every N versions
+    DELTA_MAX_FILE_SIZE: int = 16 * 1024 * 1024
+
+    # Checkout leases. A checkout that is neither renewed (POST
+    # /documents/{id}/checkout/heartbeat) nor checked in within the lease is
+    # released by the sweeper, which runs inside the API process
+    CHECKOUT_LEASE_MINUTES: int = 8 * 60  # 0 keeps checkouts until they are checked in
+    CHECKOUT_SWEEPER_ENABLED: bool = True
+    CHECKOUT_SWEEP_INTERVAL: float = 60.0  # Seconds between sweeps
+    CHECKOUT_SWEEP_BATCH_SIZE: int = 500  # Leases expired per transaction
+
+    # Activity log. Events are appended to a journal on local disk and
+    # written to the database in batches by a task in the API process
+    ACTIVITY_FLUSH_SIZE: int = 500  # Buffered events that trigger a flush
+    ACTIVITY_FLUSH_INTERVAL: float = 1.0  # Seconds between flushes
+    ACTIVITY_JOURNAL_DIR: str | None = None  # Defaults to UPLOAD_DIR/activity-journal
+    ACTIVITY_JOURNAL_FSYNC: bool = False  # Sync journal segments to disk at each flush, to survive power loss too
+    ACTIVITY_LOG_VIEWS: bool = False  # Also record "view" (preview) and "download" events
+
+    # Full-text search
+    SEARCH_MAX_CONTENT_BYTES: int = 1024 * 1024  # Extracted text indexed per document
+
+    # Background text extraction; the worker runs inside the API process
+    # unless disabled here and started with `python -m app.scripts.extraction_worker`
+    EXTRACTION_WORKER_ENABLED: bool = True
+    EXTRACTION_PROCESSES: int = 2
+    EXTRACTION_MAX_IN_FLIGHT: int = 4  # Jobs claimed at once; the rest wait in the queue
+    EXTRACTION_POLL_INTERVAL: float = 2.0  # Seconds between queue polls when idle
+    EXTRACTION_MAX_ATTEMPTS: int = 5
+    EXTRACTION_RETRY_DELAY: int = 30  # Seconds before the first retry, doubled per attempt
+    EXTRACTION_JOB_TIMEOUT: int = 300  # Seconds before a running job is given up on
+    EXTRACTION_MAX_CHARS: int = 2_000_000  # Extracted text kept per version
+
+    # Page previews and thumbnails for PDFs (pypdfium2) and images (Pillow),
+    # rendered on first request or by the extraction worker for new PDFs
+    RENDITION_THUMBNAIL_SIZE: int = 256  # Pixels on the longest edge
+    RENDITION_PREVIEW_SIZE: int = 1024
+    RENDITION_QUALITY: int = 80  # JPEG quality
+    RENDITION_WORKERS: int = 2
+    RENDITION_PREGENERATE: bool = True
+    RENDITION_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+
+    # PDF page ranges
+    PAGE_RANGE_MAX_PAGES: int = 50  # Pages per page-range request
+    PAGE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Version diffs
+    DIFF_MAX_CHARS: int = 10_000_000  # Larger texts are not diffed
+    DIFF_MAX_WORD_CHARS: int = 500_000  # Word diffs are far more expensive
+    DIFF_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Compression for stored files ("none", "gzip" or "zstd"); already-compressed
+    # formats such as PDF, images and Office documents are always stored as-is
+    STORAGE_COMPRESSION: str = "gzip"
+    STORAGE_COMPRESSION_LEVELS: dict[str, int] = {
+        "text/*": 9,
+        "application/json": 9,
+        "application/xml": 9,
+        "*": 6,
+    }
 
     class Config:
         case_sensitive = True
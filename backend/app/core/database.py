@@ -1,12 +1,81 @@
-from sqlalchemy import create_engine
+from typing import Any
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from .config import get_settings
+from .instrumentation import instrument_engine
 
 settings = get_settings()
 
-engine = create_engine(settings.sync_database_url)
+# Postgres lock_not_available (lock_timeout) and deadlock_detected
+_POSTGRES_LOCK_ERRORS = {"55P03", "40P01"}
+
+
+class DatabaseBusy(Exception):
+    """A statement gave up waiting for a lock; the request can be retried."""
+
+
+# Waits that ran out, on a lock or for a pooled connection; both are
+# answered with a 503 and nothing was written
+BUSY_ERRORS = (DatabaseBusy, PoolTimeout)
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.split("?")[0].endswith("://") or ":memory:" in url or "mode=memory" in url
+
+
+def engine_options(url: str) -> dict[str, Any]:
+    options: dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.startswith("sqlite"):
+        # SQLite has one write lock for the whole file; wait for it rather
+        # than failing as soon as another writer holds it
+        options["connect_args"] = {"timeout": settings.SQLITE_BUSY_TIMEOUT}
+        if _is_memory_sqlite(url) or url.startswith("sqlite+aiosqlite"):
+            # In-memory databases keep one connection; aiosqlite opens a
+            # new one per session and has no pool to size
+            return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+engine = create_engine(settings.sync_database_url, **engine_options(settings.sync_database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the async request handlers, so their queries do not
+# block the event loop
+async_engine = create_async_engine(
+    settings.async_database_url, **engine_options(settings.async_database_url)
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+def _is_lock_error(error: BaseException) -> bool:
+    code = getattr(error, "pgcode", None) or getattr(error, "sqlstate", None)
+    return code in _POSTGRES_LOCK_ERRORS or "database is locked" in str(error)
+
+
+def _raise_busy(context) -> None:
+    if _is_lock_error(context.original_exception):
+        raise DatabaseBusy() from context.sqlalchemy_exception
+
+
+def translate_lock_errors(engine: Engine) -> None:
+    """Raise DatabaseBusy, answered with a 503, when a statement on ``engine`` times out on a lock."""
+    event.listen(engine, "handle_error", _raise_busy)
+
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+translate_lock_errors(engine)
+translate_lock_errors(async_engine.sync_engine)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,14 +1,18 @@
-from typing import Annotated, Generator
+from datetime import datetime
+from typing import Annotated, AsyncGenerator, Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..core.config import get_settings
-from ..core.database import SessionLocal
-from ..models.models import User
+from ..core.database import AsyncSessionLocal, SessionLocal
+from ..core.pagination import decode_cursor
+from ..core.security import decode_access_token
 from ..schemas.token import TokenPayload
+from ..schemas.user import UserPrincipal
 from ..services import user as user_service
 
 settings = get_settings()
@@ -26,14 +30,18 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session for ``async def`` endpoints; queries await instead of blocking."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def get_current_user(
     db: Annotated[Session, Depends(get_db)],
     token: Annotated[str, Depends(reusable_oauth2)]
-) -> User:
+) -> UserPrincipal:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_access_token(token)
         token_data = TokenPayload(**payload)
     except (JWTError, ValidationError):
         raise HTTPException(
@@ -41,7 +49,7 @@ def get_current_user(
             detail="Could not validate credentials",
         )
     
-    user = user_service.get_user(db, user_id=int(token_data.sub))
+    user = user_service.get_user_principal(db, user_id=int(token_data.sub))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -51,8 +59,8 @@ def get_current_user(
 
 
 def get_current_active_user(
-    current_user: Annotated[User, Depends(get_current_user)]
-) -> User:
+    current_user: Annotated[UserPrincipal, Depends(get_current_user)]
+) -> UserPrincipal:
     if not user_service.is_active(current_user):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -62,11 +70,24 @@ def get_current_active_user(
 
 
 def get_current_active_superuser(
-    current_user: Annotated[User, Depends(get_current_user)]
-) -> User:
+    current_user: Annotated[UserPrincipal, Depends(get_current_user)]
+) -> UserPrincipal:
     if not user_service.is_superuser(current_user):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The user doesn't have enough privileges",
         )
     return current_user
+
+
+def get_page_cursor(cursor: Optional[str] = None) -> Optional[tuple[datetime, int]]:
+    """Decode the opaque ``cursor`` query parameter of keyset-paginated listings."""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
@@ -0,0 +1,286 @@
+import calendar
+import io
+import secrets
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import BinaryIO, Callable, Iterator, Optional
+from urllib.parse import quote
+from starlette.responses import Response, StreamingResponse
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+# Larger multi-range requests are answered with the full representation
+MAX_RANGES = 32
+
+
+def content_disposition(filename: str) -> str:
+    """Attachment Content-Disposition value, RFC 5987-encoded when needed."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows the given content coding."""
+    if not accept_encoding:
+        return False
+
+    wildcard = False
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding == encoding:
+            return quality > 0
+        if coding == "*":
+            wildcard = quality > 0
+    return wildcard
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC datetime as an HTTP date."""
+    return formatdate(calendar.timegm(value.utctimetuple()), usegmt=True)
+
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _parse_etags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(header: Optional[str], etag: str, strong: bool = False) -> bool:
+    """Compare an If-Match/If-None-Match/If-Range value against an ETag."""
+    if not header:
+        return False
+    for tag in _parse_etags(header):
+        if tag == "*":
+            return True
+        if strong:
+            if not tag.startswith("W/") and tag == etag:
+                return True
+        elif tag.removeprefix("W/") == etag.removeprefix("W/"):
+            return True
+    return False
+
+
+def is_not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: Optional[datetime]
+) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since for a GET."""
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    since = parse_http_date(if_modified_since)
+    if since and last_modified:
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def if_range_allows(
+    if_range: Optional[str],
+    etag: str,
+    last_modified: Optional[datetime]
+) -> bool:
+    """Whether a Range header should be honoured given If-Range."""
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return etag_matches(if_range, etag, strong=True)
+    since = parse_http_date(if_range)
+    return bool(since and last_modified and last_modified.replace(microsecond=0) == since)
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[list[tuple[int, int]]]:
+    """Parse a bytes Range header into inclusive (start, end) pairs.
+
+    Returns None when the header is absent, malformed or asks for too many
+    ranges (the whole representation is then served); raises
+    RangeNotSatisfiable when no requested range overlaps the content.
+    Overlapping and adjacent ranges are coalesced, in ascending order, so
+    repeated ranges cannot multiply the bytes sent.
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    specs = [item.strip() for item in spec.split(",") if item.strip()]
+    if not specs or len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for item in specs:
+        first, sep, last = item.partition("-")
+        if not sep:
+            return None
+        try:
+            if not first:
+                suffix = int(last)
+                if suffix <= 0:
+                    continue
+                start, end = max(size - suffix, 0), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and end < start:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size and start <= end:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _seek(stream: BinaryIO, offset: int, chunk_size: int) -> None:
+    try:
+        stream.seek(offset)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        # Forward-only streams (e.g. decompressors): read and discard
+        while offset > 0:
+            skipped = stream.read(min(chunk_size, offset))
+            if not skipped:
+                break
+            offset -= len(skipped)
+
+
+def _iter_range(
+    opener: Callable[[], BinaryIO],
+    start: int,
+    end: Optional[int],
+    chunk_size: int
+) -> Iterator[bytes]:
+    with opener() as stream:
+        if start:
+            _seek(stream, start, chunk_size)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = stream.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def _iter_multipart(
+    opener: Callable[[], BinaryIO],
+    parts: list[tuple[bytes, int, int]],
+    boundary: str,
+    chunk_size: int
+) -> Iterator[bytes]:
+    for part_header, start, end in parts:
+        yield part_header
+        yield from _iter_range(opener, start, end, chunk_size)
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode()
+
+
+def ranged_response(
+    opener: Callable[[], BinaryIO],
+    size: Optional[int],
+    *,
+    media_type: str,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    range_header: Optional[str] = None,
+    if_range: Optional[str] = None,
+    headers: Optional[dict[str, str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Response:
+    """Stream a representation, honouring single and multi-range requests.
+
+    ``opener`` returns a fresh binary stream positioned at the start of the
+    representation; ``size`` is its length, or None when unknown (ranges
+    are then not offered).
+    """
+    headers = dict(headers or {})
+    headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+
+    if size is None:
+        headers["Accept-Ranges"] = "none"
+        return StreamingResponse(
+            _iter_range(opener, 0, None, chunk_size), media_type=media_type, headers=headers
+        )
+
+    headers["Accept-Ranges"] = "bytes"
+    ranges = None
+    if if_range_allows(if_range, etag, last_modified):
+        try:
+            ranges = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+    if ranges is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            _iter_range(opener, 0, size - 1, chunk_size), media_type=media_type, headers=headers
+        )
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            _iter_range(opener, start, end, chunk_size),
+            status_code=206,
+            media_type=media_type,
+            headers=headers
+        )
+
+    boundary = secrets.token_hex(16)
+    parts = []
+    length = 0
+    for start, end in ranges:
+        part_header = (
+            f"--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        parts.append((part_header, start, end))
+        length += len(part_header) + (end - start + 1) + 2
+    length += len(f"--{boundary}--\r\n")
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_multipart(opener, parts, boundary, chunk_size),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers
+    )
@@ -0,0 +1,178 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import get_settings
+from .metrics import registry
+from .profiling import PROFILE_ID_HEADER, PROFILE_SUMMARY_HEADER, QueryProfile, finish_profile
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+registry.describe("http_requests_total", "Requests by method, route template and status code.")
+registry.describe("http_request_duration_seconds", "Time from request start to the last response byte.")
+registry.describe("http_request_db_queries", "Database statements executed per request.")
+registry.describe("http_request_db_seconds", "Time spent in database statements per request.")
+registry.describe("http_request_bytes_total", "Request body bytes received.")
+registry.describe("http_response_bytes_total", "Response body bytes sent.")
+
+
+@dataclass
+class RequestStats:
+    scope: Optional[Scope] = None
+    db_queries: int = 0
+    db_time: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    profile: Optional[QueryProfile] = None  # Only when SQL_PROFILING_ENABLED
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Counters for the request being handled, or None outside a request."""
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Kept on the statement's own execution context: a statement that fails
+    # never reaches after_cursor_execute, and on a per-connection stack its
+    # start time would stay behind for the life of the pooled connection
+    if context is not None:
+        context.query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    start = getattr(context, "query_start_time", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_time += elapsed
+        if stats.profile is not None:
+            stats.profile.record(statement, elapsed)
+
+    if settings.SQL_SLOW_QUERY_MS and elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        scope = stats.scope if stats is not None else None
+        logger.warning(
+            "Slow query",
+            extra={
+                "route": route_template(scope) if scope else None,
+                "method": scope["method"] if scope else None,
+                "duration_ms": round(elapsed * 1000, 2),
+                "statement": statement[:2000],
+            }
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attribute every statement run on ``engine`` to the current request."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+_route_paths: dict[Any, dict[Any, str]] = {}
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route's path template, or "unmatched" before/without routing.
+
+    Metrics are labelled by template ("/documents/{document_id}"), never by
+    raw path, to keep the number of series bounded.
+    """
+    app = scope.get("app")
+    paths = _route_paths.get(app)
+    if paths is None:
+        paths = _route_paths[app] = {
+            route.endpoint: route.path
+            for route in getattr(app, "routes", [])
+            if hasattr(route, "endpoint")
+        }
+    return paths.get(scope.get("endpoint"), "unmatched")
+
+
+class InstrumentationMiddleware:
+    """Per-route latency, DB usage and body size metrics for every request.
+
+    A plain ASGI middleware, so streamed responses are timed to their last
+    byte without being buffered. With SQL_PROFILING_ENABLED it also keeps a
+    per-statement profile of each request and names it in response headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope=scope)
+        if settings.SQL_PROFILING_ENABLED:
+            stats.profile = QueryProfile(scope["method"], scope["path"])
+        token = _request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def counting_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                stats.bytes_in += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if stats.profile is not None:
+                    headers = MutableHeaders(scope=message)
+                    headers.append(PROFILE_ID_HEADER, stats.profile.id)
+                    headers.append(PROFILE_SUMMARY_HEADER, stats.profile.summary())
+            elif message["type"] == "http.response.body":
+                stats.bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            duration = time.perf_counter() - start
+            _request_stats.reset(token)
+            method = scope["method"]
+            route = route_template(scope)
+
+            registry.inc("http_requests_total", method=method, route=route, status=str(status_code))
+            registry.observe("http_request_duration_seconds", duration, method=method, route=route)
+            registry.observe(
+                "http_request_db_queries", stats.db_queries, QUERY_COUNT_BUCKETS, method=method, route=route
+            )
+            registry.observe("http_request_db_seconds", stats.db_time, method=method, route=route)
+            registry.inc("http_request_bytes_total", stats.bytes_in, method=method, route=route)
+            registry.inc("http_response_bytes_total", stats.bytes_out, method=method, route=route)
+            if stats.profile is not None:
+                stats.profile.route = route
+                finish_profile(stats.profile)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Request completed",
+                    extra={
+                        "method": method,
+                        "route": route,
+                        "status": status_code,
+                        "duration_ms": round(duration * 1000, 2),
+                        "db_queries": stats.db_queries,
+                        "db_ms": round(stats.db_time * 1000, 2),
+                        "bytes_in": stats.bytes_in,
+                        "bytes_out": stats.bytes_out,
+                    }
+                )
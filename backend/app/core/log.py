@@ -0,0 +1,61 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from .config import get_settings
+
+settings = get_settings()
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with ``extra`` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """Send application logs through a queue to a background writer thread.
+
+    Request handlers only enqueue records; formatting and the stdout write
+    happen on the listener thread. Records below LOG_LEVEL are dropped by
+    a level check before any formatting.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(settings.LOG_LEVEL.upper())
+    app_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    app_logger.propagate = False
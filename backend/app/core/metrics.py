@@ -0,0 +1,99 @@
+import bisect
+import threading
+from collections import defaultdict
+
+LabelSet = tuple[tuple[str, str], ...]
+
+# Upper bounds in seconds, tuned for API latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """In-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[LabelSet, float]] = defaultdict(dict)
+        self._histograms: dict[str, dict[LabelSet, _Histogram]] = defaultdict(dict)
+        self._buckets: dict[str, tuple[float, ...]] = {}
+        self._help: dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        **labels: str
+    ) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            buckets = self._buckets.setdefault(name, buckets)
+            histogram = self._histograms[name].get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = _Histogram(len(buckets))
+            index = bisect.bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(self._buckets[name], histogram.counts):
+                        cumulative += count
+                        bucket_labels = labels + (("le", f"{bound:g}"),)
+                        lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                    inf_labels = labels + (("le", "+Inf"),)
+                    lines.append(f"{name}_bucket{_format_labels(inf_labels)} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque token for the position just after a (timestamp, id) row."""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def keyset_page(query, timestamp_column, id_column, after: Optional[tuple[datetime, int]], limit: int):
+    """Order newest first and start strictly after the cursor position."""
+    if after is not None:
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(*after))
+    return query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit)
+
+
+def next_cursor(rows: list[Any], limit: int, timestamp_attr: str) -> Optional[str]:
+    if limit <= 0 or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, timestamp_attr), last.id)
@@ -0,0 +1,135 @@
+import logging
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+from .config import get_settings
+from .metrics import registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PROFILE_ID_HEADER = "X-SQL-Profile-Id"
+PROFILE_SUMMARY_HEADER = "X-SQL-Profile"
+
+# Bind parameters of every DBAPI style we run on: ?, %(name)s, %s, $1, :name
+_PARAM_RE = re.compile(r"\?|%\(\w+\)s|%s|\$\d+|(?<!:):\w+")
+# Expanded IN lists vary in length between otherwise identical statements
+_PARAM_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+registry.describe("sql_repeated_statements_total", "Statement shapes repeated past the N+1 threshold in one request.")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so repeats with different parameters compare equal."""
+    shape = _PARAM_RE.sub("?", statement)
+    shape = _PARAM_LIST_RE.sub("(?...)", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+@dataclass
+class StatementStats:
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+
+class QueryProfile:
+    """Every statement one request ran, grouped by statement shape."""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.queries = 0
+        self.total_time = 0.0
+        self.statements: dict[str, StatementStats] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.total_time += elapsed
+        stats = self.statements.setdefault(statement_shape(statement), StatementStats())
+        stats.count += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+
+    def repeated(self) -> list[tuple[str, StatementStats]]:
+        """Shapes run at least SQL_REPEATED_STATEMENT_THRESHOLD times: likely N+1 loads."""
+        return sorted(
+            (
+                (shape, stats)
+                for shape, stats in self.statements.items()
+                if stats.count >= settings.SQL_REPEATED_STATEMENT_THRESHOLD
+            ),
+            key=lambda item: item[1].count,
+            reverse=True
+        )
+
+    def summary(self) -> str:
+        return (
+            f"queries={self.queries}; time_ms={self.total_time * 1000:.2f}; "
+            f"shapes={len(self.statements)}; repeated={len(self.repeated())}"
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        repeated = {shape for shape, _ in self.repeated()}
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "queries": self.queries,
+            "time_ms": round(self.total_time * 1000, 3),
+            "statements": [
+                {
+                    "statement": shape,
+                    "count": stats.count,
+                    "total_ms": round(stats.total_time * 1000, 3),
+                    "max_ms": round(stats.max_time * 1000, 3),
+                    "repeated": shape in repeated,
+                }
+                for shape, stats in sorted(
+                    self.statements.items(), key=lambda item: item[1].total_time, reverse=True
+                )
+            ],
+        }
+
+
+_lock = threading.Lock()
+_recent: OrderedDict[str, QueryProfile] = OrderedDict()
+
+
+def finish_profile(profile: QueryProfile) -> None:
+    """Report likely N+1 patterns and keep the profile for the debug endpoint."""
+    for shape, stats in profile.repeated():
+        registry.inc("sql_repeated_statements_total", route=profile.route or "unmatched")
+        logger.warning(
+            "Repeated SQL statement",
+            extra={
+                "route": profile.route,
+                "method": profile.method,
+                "profile_id": profile.id,
+                "count": stats.count,
+                "total_ms": round(stats.total_time * 1000, 3),
+                "statement": shape[:2000],
+            }
+        )
+
+    with _lock:
+        _recent[profile.id] = profile
+        while len(_recent) > settings.SQL_PROFILE_HISTORY:
+            _recent.popitem(last=False)
+
+
+def get_profile(profile_id: str) -> Optional[QueryProfile]:
+    with _lock:
+        return _recent.get(profile_id)
+
+
+def recent_profiles() -> list[QueryProfile]:
+    with _lock:
+        return list(reversed(_recent.values()))
@@ -1,11 +1,54 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any
-from jose import jwt
+from typing import Any, Callable
+from jose import JWTError, jwt
 from passlib.context import CryptContext
+from .cache import TTLCache
 from .config import get_settings
+from .metrics import registry
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt gets its own small pool so a burst of logins cannot take over the
+# threads that serve every other request
+_hash_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hash_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE
+)
+
+registry.describe("password_hash_rejected_total", "Password hashes refused because the queue was full.")
+
+# Verified claims by raw token, each kept until the token's own expiry
+_token_cache: TTLCache[dict[str, Any]] = TTLCache(
+    "access_token", maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
+
+def _active_key() -> tuple[str | None, str]:
+    if not settings.JWT_KEYS:
+        return None, settings.SECRET_KEY
+    kid = settings.JWT_ACTIVE_KID or next(iter(settings.JWT_KEYS))
+    return kid, settings.JWT_KEYS[kid]
+
+
+def _verification_key(kid: str | None) -> str:
+    if kid is None:
+        # Tokens signed with SECRET_KEY, before key ids were introduced
+        if settings.JWT_KEYS and not settings.JWT_ACCEPT_LEGACY_TOKENS:
+            raise JWTError("Token has no key id")
+        return settings.SECRET_KEY
+    try:
+        return settings.JWT_KEYS[kid]
+    except KeyError:
+        raise JWTError(f"Unknown signing key {kid!r}")
 
 
 def create_access_token(subject: str | Any, expires_delta: timedelta | None = None) -> str:
@@ -17,13 +60,69 @@ def create_access_token(subject: str | Any, expires_delta: timedelta | None = No
         )
     
     to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    kid, key = _active_key()
+    headers = {"kid": kid} if kid else None
+    encoded_jwt = jwt.encode(to_encode, key, algorithm=settings.ALGORITHM, headers=headers)
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> dict[str, Any]:
+    """Verify a token and return its claims; raises JWTError when invalid.
+
+    Successful verifications are cached until the token expires, so repeat
+    requests with the same token skip the signature check.
+    """
+    claims = _token_cache.get(token)
+    if claims is not None and claims["exp"] > time.time():
+        return claims
+
+    kid = jwt.get_unverified_header(token).get("kid")
+    claims = jwt.decode(token, _verification_key(kid), algorithms=[settings.ALGORITHM])
+    if "exp" not in claims:
+        raise JWTError("Token has no expiry")
+    _token_cache.set(token, claims, ttl=claims["exp"] - time.time())
+    return claims
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+def _submit_hash(fn: Callable[..., Any], *args: Any) -> Future:
+    if not _hash_slots.acquire(blocking=False):
+        registry.inc("password_hash_rejected_total")
+        raise PasswordHashingBusy()
+    try:
+        future = _hash_pool.submit(fn, *args)
+    except Exception:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit_hash(pwd_context.verify, plain_password, hashed_password).result()
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _submit_hash(pwd_context.hash, password).result()
+
+
+async def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify off the event loop; also returns a new hash when the stored one
+    uses outdated settings (e.g. fewer bcrypt rounds than configured).
+    """
+    return await asyncio.wrap_future(
+        _submit_hash(pwd_context.verify_and_update, plain_password, hashed_password)
+    )
+
+
+async def dummy_verify_password() -> None:
+    """Spend the time of a real verification, so unknown users are not
+    distinguishable by response time.
+    """
+    await asyncio.wrap_future(_submit_hash(pwd_context.dummy_verify))
@@ -1,15 +1,54 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from .core.config import get_settings
-from .api import auth, users, documents
+from .core.database import DatabaseBusy, PoolTimeout
+from .core.instrumentation import InstrumentationMiddleware
+from .core.log import configure_logging
+from .core.metrics import registry
+from .core.pagination import NEXT_CURSOR_HEADER
+from .core.security import PasswordHashingBusy
+from .api import auth, debug, users, documents
+from .services import activity_log
+from .services.blob_collector import BlobCollector
+from .services.checkout_sweeper import CheckoutSweeper
+from .services.extraction_worker import ExtractionWorker
+from .services.renditions import PAGE_COUNT_HEADER
 
 settings = get_settings()
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    activity_log.start()
+    worker = sweeper = collector = None
+    if settings.EXTRACTION_WORKER_ENABLED:
+        worker = ExtractionWorker()
+        worker.start()
+    if settings.CHECKOUT_SWEEPER_ENABLED and settings.CHECKOUT_LEASE_MINUTES > 0:
+        sweeper = CheckoutSweeper()
+        sweeper.start()
+    if settings.BLOB_GC_ENABLED:
+        collector = BlobCollector()
+        collector.start()
+    yield
+    if collector:
+        await collector.stop()
+    if sweeper:
+        await sweeper.stop()
+    if worker:
+        await worker.stop()
+    await activity_log.stop()
+
 
 app = FastAPI(
     title="Document Control System",
     description="A modern document management system API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -19,13 +58,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PAGE_COUNT_HEADER],
 )
+# Outermost, so the timings include CORS handling
+app.add_middleware(InstrumentationMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(users.router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
 app.include_router(documents.router, prefix=f"{settings.API_V1_STR}/documents", tags=["documents"])
+if settings.SQL_PROFILING_ENABLED:
+    app.include_router(debug.router, prefix=f"{settings.API_V1_STR}/debug", tags=["debug"])
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy) -> JSONResponse:
+    # Shed load instead of queueing logins behind each other
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many password checks in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(DatabaseBusy)
+@app.exception_handler(PoolTimeout)
+async def database_busy_handler(request: Request, exc: Exception) -> JSONResponse:
+    # The transaction was rolled back, or never started, so the request is
+    # safe to retry
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The database is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Document Control System API"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """Process metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean, Text, DateTime
+from sqlalchemy import BigInteger, Column, Integer, String, ForeignKey, Index, Table, Boolean, Text, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .base import BaseModel, Base
 from datetime import datetime
@@ -13,6 +13,9 @@ document_tags = Table(
 
 class User(BaseModel):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -26,13 +29,20 @@ class User(BaseModel):
 
 class Document(BaseModel):
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_updated_at_id", "updated_at", "id"),
+        Index("ix_documents_owner_id_updated_at_id", "owner_id", "updated_at", "id"),
+    )
 
     title = Column(String, index=True)
     description = Column(Text)
     file_path = Column(String, nullable=False)
     mime_type = Column(String)
     owner_id = Column(Integer, ForeignKey("users.id"))
-    version = Column(Integer, default=1)
+    version = Column(Integer, default=1)  # Current file version number
+    row_version = Column(Integer, default=1, nullable=False)  # Bumped on every row update
+    
+    __mapper_args__ = {"version_id_col": row_version}
     
     # Relationships
     owner = relationship("User", back_populates="documents")
@@ -43,14 +53,36 @@ class Document(BaseModel):
 
 class DocumentVersion(BaseModel):
     __tablename__ = "document_versions"
+    __table_args__ = (
+        UniqueConstraint("document_id", "version_number", name="uq_document_versions_document_id_version_number"),
+    )
 
     document_id = Column(Integer, ForeignKey("documents.id"))
     version_number = Column(Integer)
-    file_path = Column(String, nullable=False)
+    file_path = Column(String, nullable=False, index=True)  # Blob store path, shared by identical uploads
+    filename = Column(String)  # Original upload filename
+    content_hash = Column(String(64), index=True)  # SHA-256 of the file contents
+    file_size = Column(BigInteger)
+    delta_base_id = Column(Integer, ForeignKey("document_versions.id"))  # Set when stored as a delta
+    delta_depth = Column(Integer, default=0)  # Deltas since the last full keyframe
     changes = Column(Text)
+    extracted_text = Column(Text)  # Filled in by the background extraction worker
+    page_count = Column(Integer)
+    extraction_metadata = Column(Text)  # JSON object, e.g. PDF title and author
     
     # Relationships
     document = relationship("Document", back_populates="versions")
+    extraction_job = relationship("ExtractionJob", back_populates="version", uselist=False)
+
+class DocumentVersionPage(Base):
+    __tablename__ = "document_version_pages"
+
+    version_id = Column(Integer, ForeignKey("document_versions.id", ondelete="CASCADE"), primary_key=True)
+    page_number = Column(Integer, primary_key=True)  # 1-based
+    text = Column(Text)  # Extracted text of this page alone
+    text_offset = Column(Integer)  # Where the page starts in the version's extracted_text
+    byte_offset = Column(BigInteger)  # Span of the page's own objects in the PDF file
+    byte_length = Column(BigInteger)
 
 class Tag(BaseModel):
     __tablename__ = "tags"
@@ -66,6 +98,7 @@ class DocumentCheckout(BaseModel):
     document_id = Column(Integer, ForeignKey("documents.id"), unique=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     checkout_time = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True)  # End of the lease; None holds until check-in
     comments = Column(Text)
     
     # Relationships
@@ -74,13 +107,44 @@ class DocumentCheckout(BaseModel):
 
 class DocumentActivity(BaseModel):
     __tablename__ = "document_activities"
+    __table_args__ = (
+        Index("ix_document_activities_document_id_activity_time_id", "document_id", "activity_time", "id"),
+    )
 
     document_id = Column(Integer, ForeignKey("documents.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
-    activity_type = Column(String)  # e.g., "checkout", "checkin", "view"
+    activity_type = Column(String)  # e.g., "checkout", "checkin", "checkout_expired", "view", "download"
     activity_time = Column(DateTime, default=datetime.utcnow)
     details = Column(Text)
     
     # Relationships
     document = relationship("Document", back_populates="activities")
     user = relationship("User")
+
+class DocumentSearchEntry(Base):
+    __tablename__ = "document_search"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    title = Column(String)
+    description = Column(Text)
+    tags = Column(Text)  # Space-separated tag names
+    content = Column(Text)  # Text extracted from the current file version
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+class ExtractionJob(BaseModel):
+    __tablename__ = "extraction_jobs"
+    __table_args__ = (
+        Index("ix_extraction_jobs_status_available_at", "status", "available_at"),
+    )
+
+    version_id = Column(Integer, ForeignKey("document_versions.id"), unique=True, nullable=False)
+    mime_type = Column(String)
+    status = Column(String, default="pending", nullable=False)  # pending, running, done or failed
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Earliest next attempt
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    # Relationships
+    version = relationship("DocumentVersion", back_populates="extraction_job")
@@ -33,10 +33,22 @@ class DocumentVersion(BaseModel):
     id: int
     version_number: int
     file_path: str
+    filename: Optional[str] = None
+    content_hash: Optional[str] = None
+    file_size: Optional[int] = None
+    page_count: Optional[int] = None
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
 
+class DocumentCheckout(BaseModel):
+    user_id: int
+    checkout_time: datetime
+    expires_at: Optional[datetime] = None  # Renew with the checkout heartbeat before then
+    comments: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True)
+
+
 class Document(DocumentBase):
     id: int
     file_path: str
@@ -45,10 +57,105 @@ class Document(DocumentBase):
     created_at: datetime
     updated_at: datetime
     version: int
+    row_version: int  # Changes on every update; send it in If-Match to update safely
     tags: list[Tag]
     versions: list[DocumentVersion]
+    current_checkout: Optional[DocumentCheckout] = None
     model_config = ConfigDict(from_attributes=True)
 
 
 class DocumentInDB(Document):
     pass
+
+
+class DocumentSearchResult(BaseModel):
+    document: Document
+    score: float
+    snippet: Optional[str] = None
+    pages: list[int] = []  # Matching pages of the current version, PDFs only
+
+
+class BulkUploadItem(BaseModel):
+    filename: str
+    status: str  # "created", "failed" or "skipped" (not listed in the manifest)
+    document_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkUploadResult(BaseModel):
+    created: int
+    failed: int
+    skipped: int = 0
+    items: list[BulkUploadItem]
+
+
+class BatchDownloadItem(BaseModel):
+    document_id: int
+    version: Optional[int] = None  # Current version when omitted
+
+
+class BatchDownloadRequest(BaseModel):
+    documents: list[BatchDownloadItem]
+    store_only: bool = False  # Skip deflate for every file, not just compressed formats
+
+
+class ExtractionStatus(BaseModel):
+    version_number: int
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    available_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    page_count: Optional[int] = None
+    text_length: Optional[int] = None
+    metadata: dict = {}
+
+
+class VersionPage(BaseModel):
+    page_number: int
+    text_offset: Optional[int] = None  # Start of the page in the extracted text
+    byte_offset: Optional[int] = None  # Span of the page's own objects in the file
+    byte_length: Optional[int] = None
+    text: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True)
+
+
+class VersionPages(BaseModel):
+    version_number: int
+    page_count: int
+    pages: list[VersionPage]
+
+
+class DiffSegment(BaseModel):
+    op: str  # equal, delete or insert
+    text: str
+
+
+class DiffLine(BaseModel):
+    op: str
+    text: str
+    old_line: Optional[int] = None
+    new_line: Optional[int] = None
+    segments: Optional[list[DiffSegment]] = None  # Word changes, structured mode only
+
+
+class DiffHunk(BaseModel):
+    old_start: int
+    old_lines: int
+    new_start: int
+    new_lines: int
+    lines: list[DiffLine] = []  # Line and structured modes
+    segments: list[DiffSegment] = []  # Word mode
+
+
+class VersionDiff(BaseModel):
+    version_a: int
+    version_b: int
+    mode: str
+    total_hunks: int
+    added: int
+    removed: int
+    offset: int
+    page: Optional[int] = None
+    hunks: list[DiffHunk]
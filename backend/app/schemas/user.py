@@ -27,3 +27,12 @@ class User(UserInDBBase):
 
 class UserInDB(UserInDBBase):
     hashed_password: str
+
+
+class UserPrincipal(BaseModel):
+    """The authenticated caller, as cached for permission checks."""
+    id: int
+    username: str
+    is_active: bool
+    is_superuser: bool
+    model_config = ConfigDict(from_attributes=True, frozen=True)
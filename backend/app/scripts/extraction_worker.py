@@ -0,0 +1,21 @@
+import asyncio
+import signal
+import sys
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.services.extraction_worker import ExtractionWorker
+
+async def run_worker():
+    worker = ExtractionWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: asyncio.ensure_future(worker.stop()))
+    print(f"Extraction worker started with {worker.processes} processes")
+    await worker.run()
+    print("Extraction worker stopped")
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -8,11 +8,13 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 from sqlalchemy import create_engine
 from app.core.config import get_settings
 from app.models.models import Base
+from app.services.search import ensure_search_schema
 
 def init_db():
     settings = get_settings()
     engine = create_engine(settings.sync_database_url)
     Base.metadata.create_all(bind=engine)
+    ensure_search_schema(engine)
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
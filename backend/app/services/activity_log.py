@@ -0,0 +1,330 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from starlette.concurrency import run_in_threadpool
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from ..models.models import DocumentActivity
+
+try:
+    import fcntl
+except ImportError:  # No journal locking on Windows; run a single process there
+    fcntl = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".jsonl"
+# Events the database refused, one JSON line each with the error; kept in a
+# subdirectory so recovery never picks the file up as a segment
+DEAD_LETTER_PATH = os.path.join("dead-letter", "activities" + JOURNAL_SUFFIX)
+
+
+def journal_dir() -> str:
+    return settings.ACTIVITY_JOURNAL_DIR or os.path.join(settings.UPLOAD_DIR, "activity-journal")
+
+
+class _Segment:
+    """One append-only journal file, locked for as long as its owner has it open.
+
+    A segment whose lock can be taken was left behind by a process that
+    died, and its events are recovered by whichever process claims it.
+    """
+
+    def __init__(self, path: str, file):
+        self.path = path
+        self.file = file
+
+    @classmethod
+    def create(cls, directory: str) -> "_Segment":
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex}{JOURNAL_SUFFIX}")
+        segment = cls(path, open(path, "ab"))
+        if fcntl:
+            fcntl.flock(segment.file.fileno(), fcntl.LOCK_EX)
+        return segment
+
+    @classmethod
+    def claim(cls, path: str) -> Optional["_Segment"]:
+        try:
+            file = open(path, "ab")
+        except FileNotFoundError:
+            return None
+        if fcntl:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                file.close()  # Still in use by a live process
+                return None
+        # The owner may have flushed and removed it before the lock was taken
+        if not os.path.exists(path):
+            file.close()
+            return None
+        return cls(path, file)
+
+    def append(self, line: bytes) -> None:
+        # Handed to the OS so a crashed process loses nothing; syncing to
+        # disk waits for the flush (see sync), off the request's thread
+        self.file.write(line)
+        self.file.flush()
+
+    def sync(self) -> None:
+        os.fsync(self.file.fileno())
+
+    def read(self) -> list[dict]:
+        events = []
+        with open(self.path, "rb") as journal:
+            for line in journal:
+                try:
+                    events.append(_decode(line))
+                except ValueError:
+                    # A write torn by the crash; the lines before it are intact
+                    logger.warning("Skipping unreadable activity journal line", extra={"path": self.path})
+        return events
+
+    def remove(self) -> None:
+        # Deleted while still locked, so no other process can claim it in
+        # between; Windows cannot delete an open file
+        if fcntl is None:
+            self.file.close()
+        os.remove(self.path)
+        self.file.close()
+
+
+def _encode(event: dict) -> bytes:
+    return (json.dumps({**event, "activity_time": event["activity_time"].isoformat()}) + "\n").encode()
+
+
+def _decode(line: bytes) -> dict:
+    event = json.loads(line)
+    event["activity_time"] = datetime.fromisoformat(event["activity_time"])
+    return event
+
+
+def _insert(events: list[dict]) -> None:
+    db = SessionLocal()
+    try:
+        for start in range(0, len(events), settings.ACTIVITY_FLUSH_SIZE):
+            db.execute(insert(DocumentActivity), events[start:start + settings.ACTIVITY_FLUSH_SIZE])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _insert_or_reject(events: list[dict]) -> list[tuple[dict, str]]:
+    """Insert events, bisecting around any the database refuses outright.
+
+    An event for a document deleted before the flush fails its foreign key
+    however often it is retried, so constraint and data errors narrow the
+    batch down to the offending events, which are returned with their error.
+    Anything else (the database being down or busy) is raised for a retry.
+    """
+    try:
+        _insert(events)
+        return []
+    except (IntegrityError, DataError) as e:
+        if len(events) == 1:
+            return [(events[0], str(e.orig))]
+    middle = len(events) // 2
+    return _insert_or_reject(events[:middle]) + _insert_or_reject(events[middle:])
+
+
+class ActivityLog:
+    """Buffers activity events and writes them with multi-row inserts.
+
+    ``record`` appends to an in-memory buffer and a local journal file and
+    never touches the database, so it adds no queries or locks to the
+    request that calls it. A task started in the API's lifespan flushes the
+    buffer every ACTIVITY_FLUSH_INTERVAL seconds, or sooner once
+    ACTIVITY_FLUSH_SIZE events have built up.
+
+    Each flush moves on to a new journal segment and deletes the old one
+    once its events are committed; segments left behind by a crash are
+    replayed on the next start. Delivery is at least once: a crash between
+    a commit and the delete replays that batch. Events the database refuses
+    (e.g. for a deleted document) are moved to a dead-letter file rather
+    than holding up the ones behind them.
+
+    Every journal line reaches the OS before ``record`` returns, so a
+    process crash loses nothing. With ACTIVITY_JOURNAL_FSYNC a segment is
+    synced to disk when a flush takes it, not per event, so power loss can
+    still drop up to one flush interval of events.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or journal_dir()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer: list[dict] = []
+        self._segment: Optional[_Segment] = None
+        # Segments whose events are not in the database yet, oldest first;
+        # None means read the events back from the file
+        self._pending: list[tuple[_Segment, Optional[list[dict]]]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._runner: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        document_id: int,
+        user_id: Optional[int],
+        activity_type: str,
+        details: Optional[str] = None
+    ) -> None:
+        """Queue an activity; safe to call from any thread."""
+        event = {
+            "document_id": document_id,
+            "user_id": user_id,
+            "activity_type": activity_type,
+            "details": details,
+            "activity_time": datetime.utcnow(),
+        }
+        line = _encode(event)
+        with self._lock:
+            if self._segment is None:
+                self._segment = _Segment.create(self.directory)
+            self._segment.append(line)
+            self._buffer.append(event)
+            full = len(self._buffer) >= settings.ACTIVITY_FLUSH_SIZE
+        loop = self._loop
+        if full and loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # The loop closed; the events wait in the journal
+
+    def recover(self) -> int:
+        """Queue the segments of processes that died for the next flush (blocking)."""
+        own = {segment.path for segment, _ in self._pending}
+        if self._segment is not None:
+            own.add(self._segment.path)
+        claimed = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, "*" + JOURNAL_SUFFIX))):
+            if path in own:
+                continue
+            segment = _Segment.claim(path)
+            if segment is not None:
+                self._pending.append((segment, None))
+                claimed += 1
+        return claimed
+
+    def flush(self) -> int:
+        """Write buffered and recovered events to the database (blocking).
+
+        Returns how many were written. On a database error the events stay
+        in their journal segments and are retried on the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rotated = self._segment
+                if rotated is not None:
+                    self._pending.append((rotated, self._buffer))
+                    self._segment, self._buffer = None, []
+            if rotated is not None and settings.ACTIVITY_JOURNAL_FSYNC:
+                # Nothing appends to it any more; it may outlive this flush
+                # if the database is down
+                rotated.sync()
+
+            written = 0
+            while self._pending:
+                segment, events = self._pending[0]
+                if events is None:
+                    events = segment.read()
+                rejected = []
+                if events:
+                    try:
+                        rejected = _insert_or_reject(events)
+                    except Exception:
+                        logger.exception("Error writing activity events", extra={"events": len(events)})
+                        # Read them back from disk on retry instead of
+                        # holding them in memory while the database is down
+                        self._pending = [(segment, None) for segment, _ in self._pending]
+                        break
+                if rejected:
+                    self._dead_letter(rejected)
+                segment.remove()
+                self._pending.pop(0)
+                written += len(events) - len(rejected)
+            return written
+
+    def _dead_letter(self, rejected: list[tuple[dict, str]]) -> None:
+        path = os.path.join(self.directory, DEAD_LETTER_PATH)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as dead_letter:
+            for event, error in rejected:
+                dead_letter.write(_encode({**event, "error": error}))
+            dead_letter.flush()
+            os.fsync(dead_letter.fileno())
+        logger.warning(
+            "Moved refused activity events to the dead-letter file",
+            extra={"events": len(rejected), "path": path, "error": rejected[0][1][:500]}
+        )
+
+    async def run(self) -> None:
+        try:
+            claimed = await run_in_threadpool(self.recover)
+            if claimed:
+                logger.info("Recovering activity journal segments", extra={"segments": claimed})
+        except Exception:
+            logger.exception("Error recovering activity journal segments")
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.ACTIVITY_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                logger.exception("Error flushing activity events")
+            if self._stopping:
+                break
+
+    def start(self) -> None:
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._runner = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Flush what is buffered and stop; later events wait in the journal."""
+        self._stopping = True
+        if self._runner:
+            self._wakeup.set()
+            await self._runner
+            self._runner = None
+        self._loop = None
+
+
+_log = ActivityLog()
+
+
+def record(
+    document_id: int,
+    user_id: Optional[int],
+    activity_type: str,
+    details: Optional[str] = None
+) -> None:
+    """Record a document activity without waiting for the database."""
+    _log.record(document_id, user_id, activity_type, details)
+
+
+def flush() -> int:
+    return _log.flush()
+
+
+def start() -> None:
+    _log.start()
+
+
+async def stop() -> None:
+    await _log.stop()
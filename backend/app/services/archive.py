@@ -0,0 +1,143 @@
+import io
+import os
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from typing import BinaryIO, Callable, Iterator, Optional
+from sqlalchemy.orm import Session
+from ..core.config import get_settings
+from ..models.models import Document, DocumentVersion
+from . import compression, delta, storage
+from . import document as document_service
+
+settings = get_settings()
+
+# Earliest timestamp a zip entry can carry
+ZIP_EPOCH = datetime(1980, 1, 1)
+
+
+@dataclass
+class ArchiveEntry:
+    name: str
+    open: Callable[[], BinaryIO]  # Opens the original (decompressed) contents
+    size: Optional[int] = None
+    modified: Optional[datetime] = None
+    store: bool = False  # Add as-is instead of deflating
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable target that buffers ZipFile output until drained.
+
+    ZipFile falls back to data descriptors when it cannot seek back, so each
+    entry is written exactly once and the archive is never held in memory.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def iter_zip(
+    entries: list[ArchiveEntry],
+    chunk_size: Optional[int] = None,
+    compresslevel: Optional[int] = None
+) -> Iterator[bytes]:
+    """Build a zip archive on the fly, yielding it piece by piece (blocking).
+
+    Entries are read in chunks straight from storage; ``store`` entries are
+    copied without deflating, which keeps CPU cost near zero for formats that
+    are already compressed.
+    """
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    compresslevel = compresslevel if compresslevel is not None else settings.BATCH_DOWNLOAD_COMPRESSLEVEL
+    sink = _ZipSink()
+
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for entry in entries:
+            modified = max(entry.modified or datetime.utcnow(), ZIP_EPOCH)
+            info = zipfile.ZipInfo(entry.name, date_time=modified.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED if entry.store else zipfile.ZIP_DEFLATED
+            # Only ZipFile.open(name) applies a default level; a ZipInfo needs its own
+            info._compresslevel = None if entry.store else compresslevel
+            # The size picks between zip32 and zip64 headers, which are written first
+            info.file_size = entry.size or 0
+
+            with entry.open() as source, archive.open(info, "w", force_zip64=entry.size is None) as target:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _unique_name(filename: str, taken: set[str]) -> str:
+    name = os.path.basename(filename.replace("\\", "/")) or "document"
+    stem, ext = os.path.splitext(name)
+    counter = 1
+    while name in taken:
+        counter += 1
+        name = f"{stem} ({counter}){ext}"
+    taken.add(name)
+    return name
+
+
+def _open_delta_chain(paths: list[str]) -> BinaryIO:
+    # Delta versions are text no larger than DELTA_MAX_FILE_SIZE, so
+    # rebuilding one in memory is bounded
+    return io.BytesIO(delta.read_chain_paths(paths))
+
+
+def download_entries(
+    db: Session,
+    resolved: list[tuple[Document, Optional[DocumentVersion]]],
+    store_only: bool = False
+) -> list[ArchiveEntry]:
+    """Archive entries for resolved (document, version) pairs.
+
+    Files whose format is already compressed are stored as-is; ``store_only``
+    stores everything, trading archive size for CPU.
+    """
+    entries = []
+    taken: set[str] = set()
+    for document, version in resolved:
+        file_path = version.file_path if version else document.file_path
+        filename = (version and version.filename) or os.path.basename(file_path)
+        mime_type = document_service.version_mime_type(document, version)
+
+        if version and version.delta_base_id is not None:
+            chain = delta.version_chain(db, version)
+            opener = partial(_open_delta_chain, [link.file_path for link in chain])
+        else:
+            opener = partial(storage.open_blob, file_path)
+        entries.append(ArchiveEntry(
+            name=_unique_name(filename, taken),
+            open=opener,
+            size=version.file_size if version else None,
+            modified=version.created_at if version else document.updated_at,
+            store=store_only or compression.is_already_compressed(mime_type),
+        ))
+    return entries
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from . import storage
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _collect() -> int:
+    db = SessionLocal()
+    try:
+        return storage.collect_garbage(db)
+    finally:
+        db.close()
+
+
+class BlobCollector:
+    """Deletes unreferenced blobs every ``interval`` seconds.
+
+    Blobs are only deleted once they are older than BLOB_GC_GRACE_SECONDS,
+    and a blob an upload deduplicates against is put back, so every API
+    process can run a collector.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or settings.BLOB_GC_INTERVAL
+        self._stopping = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping.is_set():
+                break
+            try:
+                removed = await run_in_threadpool(_collect)
+                if removed:
+                    logger.info("Deleted unreferenced blobs", extra={"count": removed})
+            except Exception:
+                logger.exception("Error collecting unreferenced blobs")
+
+    def start(self) -> None:
+        self._runner = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop after the pass in progress."""
+        self._stopping.set()
+        if self._runner:
+            await self._runner
@@ -0,0 +1,335 @@
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Optional
+from fastapi import UploadFile
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from ..core.config import get_settings
+from ..schemas.document import DocumentCreate
+from . import document as document_service
+from . import storage
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MAX_MANIFEST_SIZE = 16 * 1024 * 1024
+DEFAULT_MIME_TYPE = "application/octet-stream"
+
+# Shared by all bulk requests, so concurrent batches cannot multiply the
+# number of files being hashed and compressed at once
+_executor = ThreadPoolExecutor(
+    max_workers=settings.BULK_UPLOAD_WORKERS, thread_name_prefix="bulk-upload"
+)
+
+
+class BulkUploadError(ValueError):
+    """The batch as a whole is unusable (bad manifest, archive or size)."""
+
+
+@dataclass
+class BulkItem:
+    filename: str  # Upload filename, or the member path inside an archive
+    open: Optional[Callable[[], BinaryIO]] = None
+    document_in: Optional[DocumentCreate] = None
+    mime_type: Optional[str] = None
+    blob: Optional[storage.StoredBlob] = None
+    document_id: Optional[int] = None
+    error: Optional[str] = None
+    skipped: bool = False  # Sent but not listed in the manifest; error says why
+
+
+def parse_manifest(raw: str | bytes) -> dict[str, dict]:
+    """Index a JSON manifest by filename.
+
+    The manifest is a list (or {"documents": [...]}) of objects with a
+    ``filename`` and optional ``title``, ``description``, ``tags`` (list or
+    comma-separated) and ``mime_type``.
+    """
+    try:
+        entries = json.loads(raw)
+    except ValueError:
+        raise BulkUploadError("Manifest is not valid JSON")
+    if isinstance(entries, dict):
+        entries = entries.get("documents")
+    if not isinstance(entries, list):
+        raise BulkUploadError("Manifest must be a list of documents")
+
+    manifest = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get("filename"), str):
+            raise BulkUploadError("Every manifest entry needs a filename")
+        manifest[entry["filename"]] = entry
+    return manifest
+
+
+def _describe(item: BulkItem, entry: dict, mime_type: Optional[str]) -> None:
+    tags = entry.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    try:
+        item.document_in = DocumentCreate(
+            title=entry.get("title") or os.path.splitext(posixpath.basename(item.filename))[0],
+            description=entry.get("description"),
+            tags=[tag.strip() for tag in tags if isinstance(tag, str) and tag.strip()]
+        )
+    except ValidationError as e:
+        item.error = f"Invalid manifest entry: {e.errors()[0]['msg']}"
+    item.mime_type = entry.get("mime_type") or mime_type or DEFAULT_MIME_TYPE
+
+
+def _build_items(
+    files: dict[str, tuple[Callable[[], BinaryIO], Optional[str]]],
+    manifest: Optional[dict[str, dict]]
+) -> list[BulkItem]:
+    # Without a manifest every file is ingested; with one, only listed files
+    # are. Listed files that were not sent and sent files that are not
+    # listed are both reported per item.
+    names = list(manifest) if manifest is not None else list(files)
+    if max(len(names), len(files)) > settings.BULK_UPLOAD_MAX_ITEMS:
+        raise BulkUploadError(f"At most {settings.BULK_UPLOAD_MAX_ITEMS} files per batch")
+
+    items = []
+    for name in names:
+        item = BulkItem(filename=name)
+        if name not in files:
+            item.error = "File not found in the upload"
+        else:
+            item.open, mime_type = files[name]
+            _describe(item, manifest.get(name, {}) if manifest else {}, mime_type)
+        items.append(item)
+    if manifest is not None:
+        items.extend(
+            BulkItem(filename=name, error="Not listed in the manifest", skipped=True)
+            for name in files
+            if name not in manifest
+        )
+    return items
+
+
+def items_from_uploads(files: list[UploadFile], manifest: Optional[dict[str, dict]]) -> list[BulkItem]:
+    uploads = {}
+    for file in files:
+        if file.filename in uploads:
+            raise BulkUploadError(f"Duplicate filename in batch: {file.filename}")
+        uploads[file.filename] = (_upload_opener(file), file.content_type)
+    return _build_items(uploads, manifest)
+
+
+def _upload_opener(file: UploadFile) -> Callable[[], BinaryIO]:
+    def open_upload() -> BinaryIO:
+        file.file.seek(0)
+        return file.file
+    return open_upload
+
+
+class ArchiveReader:
+    """Random access to the members of a zip or tar file from many threads.
+
+    Neither ZipFile nor TarFile may be shared between threads, so every
+    thread gets its own handle on the archive, opened on first use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._handles: list = []
+        self._lock = threading.Lock()
+
+        if zipfile.is_zipfile(path):
+            self._zip = True
+            with zipfile.ZipFile(path) as archive:
+                self.members = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+        elif tarfile.is_tarfile(path):
+            self._zip = False
+            with tarfile.open(path) as archive:
+                self.members = {info.name: info for info in archive.getmembers() if info.isfile()}
+        else:
+            raise BulkUploadError("Archive must be a zip or tar file")
+
+        self.members = {
+            name: info for name, info in self.members.items()
+            if not name.startswith("__MACOSX/") and not posixpath.basename(name).startswith(".")
+        }
+
+    def _handle(self):
+        handle = getattr(self._local, "handle", None)
+        if handle is None:
+            handle = zipfile.ZipFile(self.path) if self._zip else tarfile.open(self.path)
+            self._local.handle = handle
+            with self._lock:
+                self._handles.append(handle)
+        return handle
+
+    def size(self, name: str) -> int:
+        """A member's uncompressed size, which reading it never exceeds."""
+        info = self.members[name]
+        return info.file_size if self._zip else info.size
+
+    def open(self, name: str) -> BinaryIO:
+        if self._zip:
+            return self._handle().open(self.members[name])
+        return self._handle().extractfile(self.members[name])
+
+    def read(self, name: str) -> bytes:
+        with self.open(name) as member:
+            return member.read()
+
+    def close(self) -> None:
+        with self._lock:
+            for handle in self._handles:
+                handle.close()
+            self._handles.clear()
+
+
+def items_from_archive(reader: ArchiveReader, manifest: Optional[dict[str, dict]]) -> list[BulkItem]:
+    if manifest is None and MANIFEST_NAME in reader.members:
+        if reader.size(MANIFEST_NAME) > MAX_MANIFEST_SIZE:
+            raise BulkUploadError("Manifest is too large")
+        manifest = parse_manifest(reader.read(MANIFEST_NAME))
+    members = {
+        name: (_member_opener(reader, name), mimetypes.guess_type(name)[0])
+        for name in reader.members
+        if name != MANIFEST_NAME
+    }
+    items = _build_items(members, manifest)
+    _check_archive_sizes(reader, items)
+    return items
+
+
+def _check_archive_sizes(reader: ArchiveReader, items: list[BulkItem]) -> None:
+    # Sizes come from the archive's headers before anything is extracted,
+    # so a zip bomb is refused without inflating it
+    total = 0
+    for item in items:
+        if item.error:
+            continue
+        size = reader.size(item.filename)
+        if size > settings.BULK_ARCHIVE_MAX_FILE_SIZE:
+            item.error = f"File is larger than {settings.BULK_ARCHIVE_MAX_FILE_SIZE} bytes"
+        else:
+            total += size
+    if total > settings.BULK_ARCHIVE_MAX_TOTAL_SIZE:
+        raise BulkUploadError(
+            f"Archive contents are larger than {settings.BULK_ARCHIVE_MAX_TOTAL_SIZE} bytes"
+        )
+
+
+def _member_opener(reader: ArchiveReader, name: str) -> Callable[[], BinaryIO]:
+    return lambda: reader.open(name)
+
+
+def _spool_to_disk(file: UploadFile) -> str:
+    tmp_dir = os.path.join(storage.blob_dir(), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=tmp_dir, suffix=".archive")
+    with os.fdopen(fd, "wb") as buffer:
+        file.file.seek(0)
+        shutil.copyfileobj(file.file, buffer, settings.UPLOAD_CHUNK_SIZE)
+    return path
+
+
+def _store_item(item: BulkItem) -> None:
+    try:
+        with item.open() as source:
+            item.blob = storage.store_file(source, item.mime_type)
+    except Exception as e:
+        item.error = f"Error storing file: {e}"
+
+
+async def _store_items(items: list[BulkItem]) -> None:
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(
+        loop.run_in_executor(_executor, _store_item, item)
+        for item in items
+        if not item.error
+    ))
+
+
+def _release_blobs(db, paths: set[str]) -> None:
+    for path in paths:
+        storage.release_blob(db, path)
+
+
+async def ingest(db: AsyncSession, items: list[BulkItem], owner_id: int) -> list[BulkItem]:
+    """Store the files in parallel, then insert every stored one in one transaction.
+
+    Per-file problems are recorded on the item; a database failure fails the
+    whole batch and removes the blobs it stored.
+    """
+    start = time.perf_counter()
+    await _store_items(items)
+
+    stored = [item for item in items if not item.error]
+    new_documents = [
+        document_service.NewDocument(
+            document_in=item.document_in,
+            blob=item.blob,
+            filename=posixpath.basename(item.filename),
+            mime_type=item.mime_type
+        )
+        for item in stored
+    ]
+    try:
+        document_ids = await document_service.bulk_create_documents(db, new_documents, owner_id)
+    except Exception:
+        await db.rollback()
+        await db.run_sync(_release_blobs, {item.blob.path for item in stored})
+        raise
+    for item, document_id in zip(stored, document_ids):
+        item.document_id = document_id
+
+    logger.info(
+        "Bulk upload",
+        extra={
+            "items": len(items),
+            "created": len(stored),
+            "skipped": sum(1 for item in items if item.skipped),
+            "failed": sum(1 for item in items if item.error and not item.skipped),
+            "bytes": sum(item.blob.bytes_written for item in stored),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+    )
+    return items
+
+
+async def ingest_uploads(
+    db: AsyncSession,
+    files: list[UploadFile],
+    manifest: Optional[str],
+    owner_id: int
+) -> list[BulkItem]:
+    items = items_from_uploads(files, parse_manifest(manifest) if manifest else None)
+    return await ingest(db, items, owner_id)
+
+
+async def ingest_archive(
+    db: AsyncSession,
+    archive: UploadFile,
+    manifest: Optional[str],
+    owner_id: int
+) -> list[BulkItem]:
+    # The spooled upload may live in memory; per-thread handles need a real file
+    path = await run_in_threadpool(_spool_to_disk, archive)
+    reader = None
+    try:
+        reader = await run_in_threadpool(ArchiveReader, path)
+        items = items_from_archive(reader, parse_manifest(manifest) if manifest else None)
+        return await ingest(db, items, owner_id)
+    finally:
+        if reader:
+            await run_in_threadpool(reader.close)
+        os.remove(path)
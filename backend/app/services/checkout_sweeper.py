@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from . import document as document_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _expire_batch(batch_size: int) -> int:
+    db = SessionLocal()
+    try:
+        return document_service.expire_checkouts(db, batch_size)
+    finally:
+        db.close()
+
+
+class CheckoutSweeper:
+    """Releases checkouts whose lease ran out, every ``interval`` seconds.
+
+    Each batch of up to ``batch_size`` leases is expired in its own short
+    transaction, so a backlog never holds locks for long. Expiry is a
+    conditional delete, so every API process can run a sweeper.
+    """
+
+    def __init__(self, interval: Optional[float] = None, batch_size: Optional[int] = None):
+        self.interval = interval or settings.CHECKOUT_SWEEP_INTERVAL
+        self.batch_size = batch_size or settings.CHECKOUT_SWEEP_BATCH_SIZE
+        self._stopping = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+    async def sweep(self) -> int:
+        """Expire every lease that has run out; returns how many."""
+        total = 0
+        while not self._stopping.is_set():
+            count = await run_in_threadpool(_expire_batch, self.batch_size)
+            total += count
+            if count < self.batch_size:
+                break
+        if total:
+            logger.info("Expired checkouts", extra={"count": total})
+        return total
+
+    async def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Error expiring checkouts")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        self._runner = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop after the batch in progress."""
+        self._stopping.set()
+        if self._runner:
+            await self._runner
@@ -0,0 +1,129 @@
+import gzip
+import logging
+import zlib
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional, Protocol
+from ..core.config import get_settings
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Formats that are already compressed and gain nothing from another pass
+ALREADY_COMPRESSED_MIME_TYPES = {
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/zstd",
+    "application/epub+zip",
+    "application/java-archive",
+}
+ALREADY_COMPRESSED_PREFIXES = (
+    "image/",
+    "audio/",
+    "video/",
+    "application/vnd.openxmlformats-officedocument.",
+    "application/vnd.oasis.opendocument.",
+    "application/vnd.ms-excel.sheet.macroenabled",
+    "application/vnd.ms-word.document.macroenabled",
+)
+COMPRESSIBLE_IMAGE_TYPES = {"image/svg+xml", "image/bmp", "image/x-ms-bmp", "image/tiff"}
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+    def flush(self) -> bytes: ...
+
+
+class Codec(ABC):
+    name: str
+    suffix: str
+
+    @abstractmethod
+    def compressor(self, level: int) -> Compressor: ...
+
+    @abstractmethod
+    def open(self, path: str) -> BinaryIO: ...
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+    suffix = ".gz"
+
+    def compressor(self, level: int) -> Compressor:
+        return zlib.compressobj(max(1, min(level, 9)), zlib.DEFLATED, 31)
+
+    def open(self, path: str) -> BinaryIO:
+        return gzip.open(path, "rb")
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    suffix = ".zst"
+
+    def compressor(self, level: int) -> Compressor:
+        return zstandard.ZstdCompressor(level=max(1, min(level, 22))).compressobj()
+
+    def open(self, path: str) -> BinaryIO:
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+
+CODECS: dict[str, Codec] = {"gzip": GzipCodec()}
+if zstandard is not None:
+    CODECS["zstd"] = ZstdCodec()
+
+
+def get_codec(name: Optional[str]) -> Optional[Codec]:
+    return CODECS.get(name) if name else None
+
+
+def codec_for_path(path: str) -> Optional[Codec]:
+    for codec in CODECS.values():
+        if path.endswith(codec.suffix):
+            return codec
+    return None
+
+
+def is_already_compressed(mime_type: Optional[str]) -> bool:
+    if not mime_type:
+        return False
+    mime_type = mime_type.split(";")[0].strip().lower()
+    if mime_type in COMPRESSIBLE_IMAGE_TYPES:
+        return False
+    return mime_type in ALREADY_COMPRESSED_MIME_TYPES or mime_type.startswith(ALREADY_COMPRESSED_PREFIXES)
+
+
+def _level_for(mime_type: str) -> int:
+    levels = settings.STORAGE_COMPRESSION_LEVELS
+    if mime_type in levels:
+        return levels[mime_type]
+    family = mime_type.split("/")[0] + "/*"
+    if family in levels:
+        return levels[family]
+    return levels.get("*", 6)
+
+
+def choose_codec(mime_type: Optional[str]) -> tuple[Optional[Codec], int]:
+    """Pick the storage codec and level for an upload of the given MIME type."""
+    if settings.STORAGE_COMPRESSION == "none" or is_already_compressed(mime_type):
+        return None, 0
+
+    codec = get_codec(settings.STORAGE_COMPRESSION)
+    if codec is None:
+        logger.warning(
+            "Compression codec unavailable, using gzip",
+            extra={"codec": settings.STORAGE_COMPRESSION}
+        )
+        codec = CODECS["gzip"]
+
+    mime_type = (mime_type or "application/octet-stream").split(";")[0].strip().lower()
+    return codec, _level_for(mime_type)
@@ -0,0 +1,162 @@
+import difflib
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy.orm import Session
+from ..core.config import get_settings
+from ..models.models import DocumentVersion
+from . import storage
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DELTA_MAGIC = b"DCSDELTA1\n"
+
+# Only keep a delta when it is at most this fraction of the full file
+MAX_DELTA_RATIO = 0.5
+
+TEXT_LIKE_MIME_TYPES = {
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/x-yaml",
+    "application/yaml",
+    "application/sql",
+    "image/svg+xml",
+}
+
+
+@dataclass
+class VersionStorage:
+    file_path: str
+    delta_base_id: Optional[int] = None
+    delta_depth: int = 0
+
+
+def is_text_like(mime_type: Optional[str]) -> bool:
+    if not mime_type:
+        return False
+    mime_type = mime_type.split(";")[0].strip().lower()
+    return mime_type.startswith("text/") or mime_type in TEXT_LIKE_MIME_TYPES
+
+
+def encode_delta(base: bytes, target: bytes) -> bytes:
+    """Encode target as line copies from base plus inserted literal bytes.
+
+    Format: a magic header followed by ``C <start> <count>\\n`` (copy base
+    lines) and ``I <size>\\n<raw bytes>`` (insert) operations.
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines)
+
+    out = [DELTA_MAGIC]
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            out.append(b"C %d %d\n" % (i1, i2 - i1))
+        elif j2 > j1:
+            data = b"".join(target_lines[j1:j2])
+            out.append(b"I %d\n" % len(data))
+            out.append(data)
+    return b"".join(out)
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    if not delta.startswith(DELTA_MAGIC):
+        raise ValueError("Not a delta-encoded version")
+
+    base_lines = base.splitlines(keepends=True)
+    out = []
+    pos = len(DELTA_MAGIC)
+    while pos < len(delta):
+        end = delta.index(b"\n", pos)
+        op, *args = delta[pos:end].split(b" ")
+        pos = end + 1
+        if op == b"C":
+            start, count = int(args[0]), int(args[1])
+            out.extend(base_lines[start:start + count])
+        elif op == b"I":
+            size = int(args[0])
+            out.append(delta[pos:pos + size])
+            pos += size
+        else:
+            raise ValueError(f"Unknown delta operation: {op!r}")
+    return b"".join(out)
+
+
+def version_chain(db: Session, version: DocumentVersion) -> list[DocumentVersion]:
+    """The version followed by its delta bases, ending at the keyframe."""
+    chain = [version]
+    while chain[-1].delta_base_id is not None:
+        chain.append(db.get(DocumentVersion, chain[-1].delta_base_id))
+    return chain
+
+
+def read_chain_paths(paths: list[str]) -> bytes:
+    """Rebuild a version from its chain's blob paths, keyframe last (blocking)."""
+    content = storage.read_blob(paths[-1])
+    for path in reversed(paths[:-1]):
+        content = apply_delta(content, storage.read_blob(path))
+    return content
+
+
+def read_chain_content(chain: list[DocumentVersion]) -> bytes:
+    """Rebuild the first version of a chain from its keyframe (blocking)."""
+    return read_chain_paths([version.file_path for version in chain])
+
+
+def read_version_content(db: Session, version: DocumentVersion) -> bytes:
+    """Rebuild a version's full contents from its nearest keyframe."""
+    return read_chain_content(version_chain(db, version))
+
+
+def is_candidate(
+    blob: storage.StoredBlob,
+    previous: Optional[DocumentVersion],
+    mime_type: Optional[str]
+) -> bool:
+    """Whether a freshly stored upload may be kept as a delta of previous."""
+    if not settings.DELTA_STORAGE_ENABLED or previous is None:
+        return False
+    if not is_text_like(mime_type) or blob.deduplicated:
+        return False
+    if blob.bytes_written > settings.DELTA_MAX_FILE_SIZE:
+        return False
+    return (previous.delta_depth or 0) + 1 < settings.DELTA_KEYFRAME_INTERVAL
+
+
+def encode_version(
+    blob: storage.StoredBlob,
+    base_chain: Optional[list[DocumentVersion]],
+    mime_type: Optional[str]
+) -> VersionStorage:
+    """Decide how a freshly stored upload is kept: as-is or as a delta.
+
+    ``base_chain`` is the previous version's chain from version_chain().
+    Text-like uploads are re-encoded against it when delta storage is
+    enabled, the keyframe interval has not been reached and the delta is
+    meaningfully smaller. When a delta is kept the caller should release
+    the full blob. Blocking; call from the threadpool.
+    """
+    full = VersionStorage(file_path=blob.path)
+    previous = base_chain[0] if base_chain else None
+    if not is_candidate(blob, previous, mime_type):
+        return full
+
+    try:
+        base = read_chain_content(base_chain)
+    except (OSError, ValueError) as e:
+        logger.warning("Storing version as keyframe, base unavailable", extra={"error": str(e)})
+        return full
+
+    target = storage.read_blob(blob.path)
+    delta = encode_delta(base, target)
+    if len(delta) > len(target) * MAX_DELTA_RATIO:
+        return full
+
+    stored = storage.store_bytes(delta, mime_type)
+    return VersionStorage(
+        file_path=stored.path,
+        delta_base_id=previous.id,
+        delta_depth=(previous.delta_depth or 0) + 1
+    )
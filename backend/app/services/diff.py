@@ -0,0 +1,248 @@
+import difflib
+import hashlib
+import itertools
+import json
+import mimetypes
+import os
+import re
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+from ..core.cache import DiskLRUCache
+from ..core.config import get_settings
+from ..models.models import Document, DocumentVersion
+from . import delta, pages
+
+settings = get_settings()
+
+DIFF_MODES = ("line", "word", "structured")
+
+# Bump when the cached hunk format changes so old entries are ignored
+DIFF_CACHE_FORMAT = 1
+
+_cache = DiskLRUCache(
+    "diff",
+    os.path.join(settings.UPLOAD_DIR, "cache", "diffs"),
+    max_bytes=settings.DIFF_CACHE_MAX_BYTES
+)
+
+# Unchanged tokens shown around each change in word mode
+WORD_CONTEXT_TOKENS = 12
+
+_TOKEN_RE = re.compile(r"\s+|\w+|[^\w\s]", re.UNICODE)
+
+
+class TextUnavailable(Exception):
+    """Raised when a version has no text to diff (yet)."""
+
+
+def _is_text_version(document: Document, version: DocumentVersion) -> bool:
+    guessed, _ = mimetypes.guess_type(version.filename or "")
+    return delta.is_text_like(guessed or document.mime_type)
+
+
+def version_text(
+    db: Session,
+    document: Document,
+    version: DocumentVersion,
+    page: Optional[int] = None
+) -> str:
+    """Text for a version: its own contents when text-like, else extracted text.
+
+    ``page`` picks one page of a PDF from the version's page index.
+    """
+    if page is not None:
+        return _page_text(db, version, page)
+    if _is_text_version(document, version):
+        return delta.read_version_content(db, version).decode("utf-8", errors="replace")
+    if version.extracted_text is None:
+        raise TextUnavailable(
+            f"Text for version {version.version_number} has not been extracted yet"
+        )
+    return version.extracted_text
+
+
+def _page_text(db: Session, version: DocumentVersion, page: int) -> str:
+    if version.page_count is not None and not 1 <= page <= version.page_count:
+        raise ValueError(f"Version {version.version_number} has {version.page_count} page(s)")
+    text = pages.page_text(db, version.id, page)
+    if text is None:
+        raise TextUnavailable(
+            f"Pages of version {version.version_number} have not been indexed yet"
+        )
+    return text
+
+
+def _word_segments(old: str, new: str) -> list[dict]:
+    old_tokens = _TOKEN_RE.findall(old)
+    new_tokens = _TOKEN_RE.findall(new)
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    segments = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            segments.append({"op": "equal", "text": "".join(old_tokens[i1:i2])})
+            continue
+        if i2 > i1:
+            segments.append({"op": "delete", "text": "".join(old_tokens[i1:i2])})
+        if j2 > j1:
+            segments.append({"op": "insert", "text": "".join(new_tokens[j1:j2])})
+    return segments
+
+
+def _line_hunks(old: str, new: str, context: int, structured: bool) -> tuple[list[dict], int, int]:
+    old_lines = old.splitlines()
+    new_lines = new.splitlines()
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+    hunks = []
+    added = removed = 0
+    for group in matcher.get_grouped_opcodes(context):
+        first, last = group[0], group[-1]
+        lines = []
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for offset, text in enumerate(old_lines[i1:i2]):
+                    lines.append({
+                        "op": "equal", "text": text, "old_line": i1 + offset + 1, "new_line": j1 + offset + 1
+                    })
+                continue
+
+            removed += i2 - i1
+            added += j2 - j1
+            deleted = [
+                {"op": "delete", "text": old_lines[i], "old_line": i + 1, "new_line": None}
+                for i in range(i1, i2)
+            ]
+            inserted = [
+                {"op": "insert", "text": new_lines[j], "old_line": None, "new_line": j + 1}
+                for j in range(j1, j2)
+            ]
+            if structured and tag == "replace":
+                # Pair replaced lines up so clients can highlight changed words
+                for old_line, new_line in zip(deleted, inserted):
+                    old_line["segments"] = new_line["segments"] = _word_segments(
+                        old_line["text"], new_line["text"]
+                    )
+            lines.extend(deleted)
+            lines.extend(inserted)
+        hunks.append({
+            "old_start": first[1] + 1,
+            "old_lines": last[2] - first[1],
+            "new_start": first[3] + 1,
+            "new_lines": last[4] - first[3],
+            "lines": lines,
+        })
+    return hunks, added, removed
+
+
+def _line_numbers(tokens: list[str]) -> list[int]:
+    numbers = []
+    line = 1
+    for token in tokens:
+        numbers.append(line)
+        line += token.count("\n")
+    numbers.append(line)
+    return numbers
+
+
+def _word_hunks(old: str, new: str) -> tuple[list[dict], int, int]:
+    old_tokens = _TOKEN_RE.findall(old)
+    new_tokens = _TOKEN_RE.findall(new)
+    old_numbers = _line_numbers(old_tokens)
+    new_numbers = _line_numbers(new_tokens)
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens)
+    hunks = []
+    added = removed = 0
+    for group in matcher.get_grouped_opcodes(WORD_CONTEXT_TOKENS):
+        first, last = group[0], group[-1]
+        segments = []
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                segments.append({"op": "equal", "text": "".join(old_tokens[i1:i2])})
+                continue
+            if i2 > i1:
+                removed += sum(1 for token in old_tokens[i1:i2] if not token.isspace())
+                segments.append({"op": "delete", "text": "".join(old_tokens[i1:i2])})
+            if j2 > j1:
+                added += sum(1 for token in new_tokens[j1:j2] if not token.isspace())
+                segments.append({"op": "insert", "text": "".join(new_tokens[j1:j2])})
+        old_start, new_start = old_numbers[first[1]], new_numbers[first[3]]
+        hunks.append({
+            "old_start": old_start,
+            "old_lines": old_numbers[last[2]] - old_start + 1,
+            "new_start": new_start,
+            "new_lines": new_numbers[last[4]] - new_start + 1,
+            "segments": segments,
+        })
+    return hunks, added, removed
+
+
+def compute_diff(old: str, new: str, mode: str = "line", context: int = 3) -> tuple[dict, list[dict]]:
+    """Diff two texts into hunks; returns (summary, hunks). CPU-bound."""
+    if mode not in DIFF_MODES:
+        raise ValueError(f"Unknown diff mode {mode!r}; expected one of {', '.join(DIFF_MODES)}")
+    limit = settings.DIFF_MAX_WORD_CHARS if mode == "word" else settings.DIFF_MAX_CHARS
+    if max(len(old), len(new)) > limit:
+        raise ValueError(f"Versions are too large for a {mode} diff")
+
+    if mode == "word":
+        hunks, added, removed = _word_hunks(old, new)
+    else:
+        hunks, added, removed = _line_hunks(old, new, context, structured=mode == "structured")
+    summary = {"total_hunks": len(hunks), "added": added, "removed": removed}
+    return summary, hunks
+
+
+def _cache_path(hash_a: str, hash_b: str, mode: str, context: int, page: Optional[int]) -> str:
+    key = f"{DIFF_CACHE_FORMAT}:{hash_a}:{hash_b}:{mode}:{context}"
+    if page is not None:
+        key += f":page{page}"
+    key = hashlib.sha256(key.encode()).hexdigest()
+    return os.path.join(_cache.directory, key[:2], key + ".jsonl")
+
+
+def _write_cache(path: str, summary: dict, hunks: list[dict]) -> None:
+    # One JSON line for the summary, then one per hunk, so a page can be
+    # read without loading the whole diff
+    lines = [json.dumps(summary)] + [json.dumps(hunk) for hunk in hunks]
+    _cache.put(path, ("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def _read_cache(path: str, offset: int, limit: int) -> Optional[tuple[dict, list[dict]]]:
+    try:
+        cached = _cache.open_text(path)
+        if cached is None:
+            return None
+        with cached:
+            summary = json.loads(next(cached))
+            hunks = [json.loads(line) for line in itertools.islice(cached, offset, offset + limit)]
+    except (OSError, StopIteration, ValueError):
+        return None
+    return summary, hunks
+
+
+def get_diff(
+    hash_a: Optional[str],
+    hash_b: Optional[str],
+    load_a: Callable[[], str],
+    load_b: Callable[[], str],
+    mode: str = "line",
+    context: int = 3,
+    offset: int = 0,
+    limit: int = 100,
+    page: Optional[int] = None
+) -> tuple[dict, list[dict]]:
+    """One page of hunks for a diff, cached on disk by the two content hashes.
+
+    ``load_a``/``load_b`` are only called on a cache miss. Versions without
+    a content hash are diffed every time. ``page`` keys the cache for
+    loaders that return a single page.
+    """
+    path = _cache_path(hash_a, hash_b, mode, context, page) if hash_a and hash_b else None
+    if path:
+        cached = _read_cache(path, offset, limit)
+        if cached:
+            return cached
+
+    summary, hunks = compute_diff(load_a(), load_b(), mode, context)
+    if path:
+        _write_cache(path, summary, hunks)
+    return summary, hunks[offset:offset + limit]
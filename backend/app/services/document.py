@@ -1,65 +1,310 @@
-import os
-from datetime import datetime
-from typing import Optional
+import logging
+import mimetypes
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
 from fastapi import UploadFile
-from sqlalchemy.orm import Session
-from ..models.models import Document, DocumentVersion, Tag, DocumentCheckout, DocumentActivity
+from sqlalchemy import delete, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer, joinedload, make_transient_to_detached, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
+from ..core.cache import TTLCache
+from ..core.config import get_settings
+from ..core.database import BUSY_ERRORS
+from ..core.pagination import keyset_page
+from ..models.models import (
+    Document,
+    DocumentActivity,
+    DocumentCheckout,
+    DocumentVersion,
+    DocumentVersionPage,
+    ExtractionJob,
+    Tag,
+    document_tags,
+)
 from ..schemas.document import DocumentCreate, DocumentUpdate
+from . import activity_log, delta, extraction, pages, search, storage
 
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
-def get_document(db: Session, document_id: int) -> Optional[Document]:
-    document = db.query(Document).filter(Document.id == document_id).first()
-    print(f"Fetching document {document_id}: {'Found' if document else 'Not found'}")
+
+class DocumentConflict(ValueError):
+    """A concurrent request changed the document first; reloading and retrying may succeed."""
+
+    def __init__(self, message: str = "The document was changed by another request; reload it and try again"):
+        super().__init__(message)
+
+
+# Tag name -> id. Tags are never renamed or deleted, so entries only go
+# stale if that is done by hand in the database
+_tag_cache: TTLCache[int] = TTLCache(
+    "tag_id", maxsize=settings.TAG_CACHE_SIZE, ttl=settings.TAG_CACHE_TTL
+)
+
+
+def _document_query(db: Session):
+    # Tags, versions and the checkout are always serialized with a document,
+    # so load them with one extra query per relationship instead of one per
+    # document
+    return db.query(Document).options(
+        selectinload(Document.tags),
+        selectinload(Document.versions),
+        selectinload(Document.current_checkout)
+    )
+
+
+def get_document(
+    db: Session,
+    document_id: int,
+    with_relations: bool = True
+) -> Optional[Document]:
+    query = _document_query(db) if with_relations else db.query(Document)
+    document = query.filter(Document.id == document_id).first()
+    logger.debug("Fetching document", extra={"document_id": document_id, "found": document is not None})
     return document
 
 
+async def get_document_async(
+    db: AsyncSession,
+    document_id: int,
+    with_relations: bool = True
+) -> Optional[Document]:
+    return await db.run_sync(get_document, document_id, with_relations)
+
+
+def _reload_document(db: Session, document_id: int) -> Document:
+    # Re-read with relationships loaded so the document can be serialized
+    # after the session has committed, including from an AsyncSession
+    return _document_query(db).populate_existing().filter(Document.id == document_id).one()
+
+
 def get_documents(
     db: Session,
     skip: int = 0,
     limit: int = 100,
-    owner_id: Optional[int] = None
+    owner_id: Optional[int] = None,
+    after: Optional[tuple[datetime, int]] = None
 ) -> list[Document]:
-    query = db.query(Document)
+    """List documents newest first, starting after an (updated_at, id) cursor."""
+    query = _document_query(db)
     if owner_id is not None:
         query = query.filter(Document.owner_id == owner_id)
-    return query.offset(skip).limit(limit).all()
+    query = keyset_page(query, Document.updated_at, Document.id, after, limit)
+    if skip:
+        query = query.offset(skip)
+    return query.all()
 
 
-def get_or_create_tag(db: Session, tag_name: str) -> Tag:
-    tag = db.query(Tag).filter(Tag.name == tag_name).first()
-    if not tag:
-        tag = Tag(name=tag_name)
-        db.add(tag)
-        db.commit()
-        db.refresh(tag)
-    return tag
+def search_documents(
+    db: Session,
+    query: str,
+    owner_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> list[tuple[Document, float, Optional[str], list[int]]]:
+    """Full-text search; returns (document, score, snippet, pages), best match first.
 
+    ``pages`` lists the pages of a PDF's current version that contain every
+    term, from the version's page index.
+    """
+    matches = search.search_documents(
+        db, query, owner_id=owner_id, limit=limit, offset=offset
+    )
+    if not matches:
+        return []
+    document_ids = [document_id for document_id, _, _ in matches]
+    documents = {
+        document.id: document
+        for document in _document_query(db).filter(Document.id.in_(document_ids))
+    }
+    matching_pages = pages.matching_pages(db, document_ids, query)
+    return [
+        (documents[document_id], score, snippet, matching_pages.get(document_id, []))
+        for document_id, score, snippet in matches
+        if document_id in documents
+    ]
 
-async def create_document(
+
+def _insert_missing_tags(db: Session, names: list[str]) -> dict[str, int]:
+    """Insert tags in one statement, skipping names another transaction just created.
+
+    Returns the ids of the rows this statement inserted.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql_insert(Tag).on_conflict_do_nothing(index_elements=[Tag.name])
+    elif dialect == "sqlite":
+        statement = sqlite_insert(Tag).on_conflict_do_nothing(index_elements=[Tag.name])
+    else:
+        statement = insert(Tag)
+    now = datetime.utcnow()
+    result = db.execute(
+        statement.returning(Tag.name, Tag.id),
+        [{"name": name, "created_at": now, "updated_at": now} for name in names]
+    )
+    return dict(result.all())
+
+
+def resolve_tags(db: Session, tag_names: Iterable[str]) -> dict[str, int]:
+    """Map tag names to ids, creating the missing tags.
+
+    Known names come from the tag cache; the rest take one SELECT and, for
+    names that do not exist yet, one INSERT ... ON CONFLICT DO NOTHING for all
+    of them. Runs in the caller's transaction and does not commit.
+    """
+    tag_ids = {}
+    missing = []
+    for name in dict.fromkeys(tag_names):
+        tag_id = _tag_cache.get(name)
+        if tag_id is None:
+            missing.append(name)
+        else:
+            tag_ids[name] = tag_id
+    if not missing:
+        return tag_ids
+
+    existing = dict(db.query(Tag.name, Tag.id).filter(Tag.name.in_(missing)).all())
+    for name, tag_id in existing.items():
+        _tag_cache.set(name, tag_id)
+    tag_ids.update(existing)
+
+    new_names = [name for name in missing if name not in existing]
+    if new_names:
+        # Not cached yet: these rows disappear if the caller rolls back
+        tag_ids.update(_insert_missing_tags(db, new_names))
+        raced = [name for name in new_names if name not in tag_ids]
+        if raced:
+            tag_ids.update(db.query(Tag.name, Tag.id).filter(Tag.name.in_(raced)).all())
+    return tag_ids
+
+
+def get_tags(db: Session, tag_names: Iterable[str]) -> list[Tag]:
+    """Tags for the given names, in order, without loading the tag rows.
+
+    The instances are attached to the session by identity only, which is
+    all a relationship assignment needs.
+    """
+    tags = []
+    for name, tag_id in resolve_tags(db, tag_names).items():
+        tag = Tag(id=tag_id, name=name)
+        make_transient_to_detached(tag)
+        tags.append(db.merge(tag, load=False))
+    return tags
+
+
+@dataclass
+class NewDocument:
+    document_in: DocumentCreate
+    blob: storage.StoredBlob
+    filename: str
+    mime_type: Optional[str]
+
+
+def _bulk_insert_documents(
+    db: Session,
+    documents: list[NewDocument],
+    owner_id: int
+) -> list[int]:
+    # One set-based statement per table and a single commit for the batch;
+    # RETURNING ... sort_by_parameter_order keeps ids aligned with the input
+    tag_ids = resolve_tags(db, (name for new in documents for name in new.document_in.tags))
+    now = datetime.utcnow()
+    document_ids = db.execute(
+        insert(Document).returning(Document.id, sort_by_parameter_order=True),
+        [
+            {
+                "title": new.document_in.title,
+                "description": new.document_in.description,
+                "file_path": new.blob.path,
+                "mime_type": new.mime_type,
+                "owner_id": owner_id,
+                "version": 1,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for new in documents
+        ]
+    ).scalars().all()
+    version_ids = db.execute(
+        insert(DocumentVersion).returning(DocumentVersion.id, sort_by_parameter_order=True),
+        [
+            {
+                "document_id": document_id,
+                "version_number": 1,
+                "file_path": new.blob.path,
+                "filename": new.filename,
+                "content_hash": new.blob.digest,
+                "file_size": new.blob.bytes_written,
+                "delta_depth": 0,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for document_id, new in zip(document_ids, documents)
+        ]
+    ).scalars().all()
+
+    tag_links = [
+        {"document_id": document_id, "tag_id": tag_ids[name]}
+        for document_id, new in zip(document_ids, documents)
+        for name in dict.fromkeys(new.document_in.tags)
+    ]
+    if tag_links:
+        db.execute(insert(document_tags), tag_links)
+    jobs = [
+        {"version_id": version_id, "mime_type": new.mime_type}
+        for version_id, new in zip(version_ids, documents)
+        if extraction.can_extract(new.mime_type)
+    ]
+    if jobs:
+        db.execute(insert(ExtractionJob), jobs)
+    search.index_new_documents(db, [
+        {
+            "document_id": document_id,
+            "title": new.document_in.title,
+            "description": new.document_in.description,
+            "tags": list(dict.fromkeys(new.document_in.tags)),
+        }
+        for document_id, new in zip(document_ids, documents)
+    ])
+    db.commit()
+    return list(document_ids)
+
+
+async def bulk_create_documents(
+    db: AsyncSession,
+    documents: list[NewDocument],
+    owner_id: int
+) -> list[int]:
+    """Insert already-stored files as new documents in one transaction."""
+    if not documents:
+        return []
+    return await db.run_sync(_bulk_insert_documents, documents, owner_id)
+
+
+def _insert_document(
     db: Session,
     document_in: DocumentCreate,
-    file: UploadFile,
-    owner_id: int,
-    upload_dir: str
+    blob: storage.StoredBlob,
+    filename: str,
+    mime_type: Optional[str],
+    owner_id: int
 ) -> Document:
-    # Create directory if it doesn't exist
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Save file
-    file_path = os.path.join(upload_dir, file.filename)
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
-    
     # Get or create tags
-    tags = [get_or_create_tag(db, tag_name) for tag_name in document_in.tags]
+    tags = get_tags(db, document_in.tags)
     
     # Create document
     db_document = Document(
         title=document_in.title,
         description=document_in.description,
-        file_path=file_path,
-        mime_type=file.content_type,
+        file_path=blob.path,
+        mime_type=mime_type,
         owner_id=owner_id,
         version=1,
         tags=tags
@@ -72,71 +317,214 @@ async def create_document(
     version = DocumentVersion(
         document_id=db_document.id,
         version_number=1,
-        file_path=file_path,
+        file_path=blob.path,
+        filename=filename,
+        content_hash=blob.digest,
+        file_size=blob.bytes_written,
     )
     db.add(version)
+    extraction.enqueue(version, mime_type)
+    search.index_document(db, db_document)
     db.commit()
     
-    return db_document
+    return _reload_document(db, db_document.id)
 
 
-async def update_document(
+async def create_document(
+    db: AsyncSession,
+    document_in: DocumentCreate,
+    file: UploadFile,
+    owner_id: int
+) -> Document:
+    # Save file
+    blob = await storage.store_upload(file)
+    return await db.run_sync(
+        _insert_document, document_in, blob, file.filename, file.content_type, owner_id
+    )
+
+
+@dataclass
+class NewFileVersion:
+    blob: storage.StoredBlob
+    stored: delta.VersionStorage  # Where the version lives; a delta when it was worth it
+    filename: Optional[str]
+    mime_type: Optional[str]
+
+
+async def _prepare_file_version(
+    db: AsyncSession,
+    document: Document,
+    file: UploadFile
+) -> NewFileVersion:
+    """Store an uploaded file for the document's next version.
+
+    Runs before the version is recorded, so no locks are held while the
+    file is written.
+    """
+    blob = await storage.store_upload(file)
+    previous = await get_document_version_async(db, document.id, document.version)
+    
+    stored = delta.VersionStorage(file_path=blob.path)
+    if delta.is_candidate(blob, previous, file.content_type):
+        base_chain = await db.run_sync(delta.version_chain, previous)
+        stored = await run_in_threadpool(
+            delta.encode_version, blob, base_chain, file.content_type
+        )
+        if stored.file_path != blob.path:
+            await db.run_sync(storage.release_blob, blob.path)
+    return NewFileVersion(blob=blob, stored=stored, filename=file.filename, mime_type=file.content_type)
+
+
+def _discard_file_version(db: Session, stored: delta.VersionStorage) -> None:
+    db.rollback()
+    storage.release_blob(db, stored.file_path)
+
+
+def _insert_file_version(
+    db: Session,
+    document: Document,
+    new_file: NewFileVersion,
+    changes: Optional[str] = None,
+    check_row_version: bool = False
+) -> DocumentVersion:
+    """Record a stored file as the document's next version.
+
+    The version number is taken with an atomic increment, so concurrent
+    uploads get distinct numbers; the row lock it takes is held until the
+    caller commits. With ``check_row_version`` the increment only applies
+    if nobody changed the document since it was loaded. Text extraction for
+    the new version is queued for the background worker.
+    """
+    blob, stored = new_file.blob, new_file.stored
+    statement = update(Document).where(Document.id == document.id)
+    if check_row_version:
+        statement = statement.where(Document.row_version == document.row_version)
+    row = db.execute(
+        statement
+        .values(
+            version=Document.version + 1,
+            row_version=Document.row_version + 1,
+            file_path=stored.file_path,
+            mime_type=new_file.mime_type,
+        )
+        .returning(Document.version, Document.row_version)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        raise DocumentConflict()
+    # Keep the loaded document in step, so a later flush of it passes the
+    # row_version check
+    for key, value in (
+        ("version", row.version),
+        ("row_version", row.row_version),
+        ("file_path", stored.file_path),
+        ("mime_type", new_file.mime_type),
+    ):
+        set_committed_value(document, key, value)
+    
+    version = DocumentVersion(
+        document_id=document.id,
+        version_number=row.version,
+        file_path=stored.file_path,
+        filename=new_file.filename,
+        content_hash=blob.digest,
+        file_size=blob.bytes_written,
+        delta_base_id=stored.delta_base_id,
+        delta_depth=stored.delta_depth,
+        changes=changes
+    )
+    db.add(version)
+    extraction.enqueue(version, new_file.mime_type)
+    return version
+
+
+@contextmanager
+def _document_write(db: Session, new_file: Optional[NewFileVersion] = None) -> Iterator[None]:
+    """Commit the block's changes, or roll back and release the stored file."""
+    try:
+        yield
+        db.commit()
+    except Exception as e:
+        if new_file:
+            _discard_file_version(db, new_file.stored)
+        else:
+            db.rollback()
+        # A stale row_version, at flush or commit, or a version number
+        # another request took first (only possible where the increment does
+        # not lock the row)
+        if isinstance(e, (StaleDataError, IntegrityError)):
+            raise DocumentConflict() from e
+        raise
+
+
+def _apply_document_update(
     db: Session,
     document: Document,
     document_in: DocumentUpdate,
-    file: Optional[UploadFile] = None,
-    upload_dir: Optional[str] = None
+    new_file: Optional[NewFileVersion] = None
 ) -> Document:
-    # Update basic information
-    update_data = document_in.model_dump(exclude_unset=True)
-    
-    if file and upload_dir:
-        # Save new file version
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, file.filename)
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+    with _document_write(db, new_file):
+        if new_file:
+            _insert_file_version(db, document, new_file, check_row_version=True)
         
-        # Update document
-        document.file_path = file_path
-        document.mime_type = file.content_type
-        document.version += 1
+        # Update basic information
+        update_data = document_in.model_dump(exclude_unset=True)
         
-        # Create new version
-        version = DocumentVersion(
-            document_id=document.id,
-            version_number=document.version,
-            file_path=file_path,
-        )
-        db.add(version)
-    
-    # Update tags if provided
-    if "tags" in update_data:
-        tags = [get_or_create_tag(db, tag_name) for tag_name in update_data["tags"]]
-        document.tags = tags
-        del update_data["tags"]
-    
-    # Update other fields
-    for field, value in update_data.items():
-        setattr(document, field, value)
-    
-    document.updated_at = datetime.utcnow()
-    db.add(document)
-    db.commit()
-    db.refresh(document)
-    return document
+        # Update tags if provided
+        if "tags" in update_data:
+            tags = get_tags(db, update_data["tags"])
+            document.tags = tags
+            del update_data["tags"]
+        
+        # Update other fields
+        for field, value in update_data.items():
+            setattr(document, field, value)
+        
+        document.updated_at = datetime.utcnow()
+        db.add(document)
+        search.index_document(db, document)
+    return _reload_document(db, document.id)
+
+
+async def update_document(
+    db: AsyncSession,
+    document: Document,
+    document_in: DocumentUpdate,
+    file: Optional[UploadFile] = None
+) -> Document:
+    """Update a document's details and optionally add a new file version.
+
+    Raises DocumentConflict when another request changed the document after
+    it was loaded.
+    """
+    new_file = await _prepare_file_version(db, document, file) if file else None
+    return await db.run_sync(_apply_document_update, document, document_in, new_file)
 
 
 def delete_document(db: Session, document: Document) -> None:
-    # Delete associated versions
+    blob_paths = {version.file_path for version in document.versions}
+    blob_paths.add(document.file_path)
+    
+    # Delete associated versions, their extraction jobs and page indexes
+    version_ids = db.query(DocumentVersion.id).filter(
+        DocumentVersion.document_id == document.id
+    )
+    for model in (ExtractionJob, DocumentVersionPage):
+        db.query(model).filter(
+            model.version_id.in_(version_ids.scalar_subquery())
+        ).delete(synchronize_session=False)
     db.query(DocumentVersion).filter(
         DocumentVersion.document_id == document.id
     ).delete()
+    search.remove_document(db, document.id)
     
     # Delete document
     db.delete(document)
     db.commit()
+    
+    # Drop blobs that no other version references
+    for path in blob_paths:
+        storage.release_blob(db, path)
 
 
 def get_document_version(
@@ -150,103 +538,291 @@ def get_document_version(
     ).first()
 
 
+def version_mime_type(document: Document, version: Optional[DocumentVersion]) -> Optional[str]:
+    """MIME type of a version; the document only records its current version's."""
+    if version is None or version.version_number == document.version:
+        return document.mime_type
+    return mimetypes.guess_type(version.filename or "")[0] or document.mime_type
+
+
+def get_versions_for_download(
+    db: Session,
+    requested: list[tuple[int, Optional[int]]]
+) -> list[tuple[Optional[Document], Optional[DocumentVersion]]]:
+    """Resolve (document_id, version_number or None for current) pairs in two queries."""
+    documents = {
+        document.id: document
+        for document in db.query(Document).filter(
+            Document.id.in_({document_id for document_id, _ in requested})
+        )
+    }
+    keys = {
+        (document_id, version_number or documents[document_id].version)
+        for document_id, version_number in requested
+        if document_id in documents
+    }
+    versions = {}
+    if keys:
+        query = db.query(DocumentVersion).options(defer(DocumentVersion.extracted_text)).filter(
+            tuple_(DocumentVersion.document_id, DocumentVersion.version_number).in_(keys)
+        )
+        versions = {(version.document_id, version.version_number): version for version in query}
+
+    resolved = []
+    for document_id, version_number in requested:
+        document = documents.get(document_id)
+        key = (document_id, version_number or (document.version if document else None))
+        resolved.append((document, versions.get(key)))
+    return resolved
+
+
+async def get_document_version_async(
+    db: AsyncSession,
+    document_id: int,
+    version_number: int
+) -> Optional[DocumentVersion]:
+    return await db.run_sync(get_document_version, document_id, version_number)
+
+
+def _insert_checkout(db: Session, values: dict) -> bool:
+    """Insert a checkout unless the document already has one; True if inserted."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql_insert(DocumentCheckout).on_conflict_do_nothing(
+            index_elements=[DocumentCheckout.document_id]
+        )
+    elif dialect == "sqlite":
+        statement = sqlite_insert(DocumentCheckout).on_conflict_do_nothing(
+            index_elements=[DocumentCheckout.document_id]
+        )
+    else:
+        try:
+            with db.begin_nested():
+                db.execute(insert(DocumentCheckout), values)
+        except IntegrityError:
+            return False
+        return True
+    return db.execute(statement.returning(DocumentCheckout.id), values).first() is not None
+
+
+def lease_expiry(now: datetime) -> Optional[datetime]:
+    """When a checkout taken or renewed at ``now`` runs out."""
+    if settings.CHECKOUT_LEASE_MINUTES <= 0:
+        return None
+    return now + timedelta(minutes=settings.CHECKOUT_LEASE_MINUTES)
+
+
+def _lease_active(now: datetime):
+    return or_(DocumentCheckout.expires_at.is_(None), DocumentCheckout.expires_at > now)
+
+
+def _expire_leases(
+    db: Session,
+    now: datetime,
+    limit: Optional[int] = None,
+    document_id: Optional[int] = None
+) -> int:
+    """Release checkouts whose lease ran out, recording a checkout_expired
+    activity for each. Runs in the caller's transaction.
+
+    The delete re-checks the expiry and returns the rows it removed, so a
+    lease renewed meanwhile is kept and concurrent sweepers never record
+    the same expiry twice.
+    """
+    expired = select(DocumentCheckout.id).where(DocumentCheckout.expires_at <= now)
+    if document_id is not None:
+        expired = expired.where(DocumentCheckout.document_id == document_id)
+    if limit:
+        expired = expired.order_by(DocumentCheckout.expires_at).limit(limit)
+    released = db.execute(
+        delete(DocumentCheckout)
+        .where(DocumentCheckout.id.in_(expired.scalar_subquery()), DocumentCheckout.expires_at <= now)
+        .returning(DocumentCheckout.document_id, DocumentCheckout.user_id, DocumentCheckout.expires_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if released:
+        db.execute(insert(DocumentActivity), [
+            {
+                "document_id": row.document_id,
+                "user_id": row.user_id,
+                "activity_type": "checkout_expired",
+                "details": f"Checkout lease expired at {row.expires_at.isoformat()}",
+                "activity_time": now,
+            }
+            for row in released
+        ])
+    return len(released)
+
+
+def expire_checkouts(db: Session, limit: int) -> int:
+    """Release up to ``limit`` checkouts whose lease ran out; returns how many."""
+    count = _expire_leases(db, datetime.utcnow(), limit=limit)
+    db.commit()
+    return count
+
+
+def _checkout_holder(db: Session, document_id: int) -> Optional[int]:
+    return db.query(DocumentCheckout.user_id).filter(
+        DocumentCheckout.document_id == document_id,
+        _lease_active(datetime.utcnow())
+    ).scalar()
+
+
+def _renew_lease(db: Session, document_id: int, user_id: int, now: datetime) -> bool:
+    renewed = db.query(DocumentCheckout).filter(
+        DocumentCheckout.document_id == document_id,
+        DocumentCheckout.user_id == user_id,
+        _lease_active(now)
+    ).update({"expires_at": lease_expiry(now), "updated_at": now}, synchronize_session=False)
+    return bool(renewed)
+
+
 def checkout_document(
     db: Session,
     document: Document,
     user_id: int,
     comments: str
 ) -> Document:
-    """Check out a document for editing."""
-    if document.current_checkout:
-        if document.current_checkout.user_id == user_id:
-            return document  # Already checked out by this user
+    """Check out a document for editing.
+
+    The checkout is claimed with a single conditional insert, so of several
+    concurrent requests exactly one wins and the rest see who holds it.
+    It is held for CHECKOUT_LEASE_MINUTES; checking out again, or the
+    heartbeat, renews it.
+    """
+    now = datetime.utcnow()
+    values = {
+        "document_id": document.id,
+        "user_id": user_id,
+        "checkout_time": now,
+        "expires_at": lease_expiry(now),
+        "comments": comments,
+        "created_at": now,
+        "updated_at": now,
+    }
+    inserted = _insert_checkout(db, values)
+    if not inserted and _expire_leases(db, now, document_id=document.id):
+        # The previous lease ran out before the sweeper got to it
+        inserted = _insert_checkout(db, values)
+    if not inserted:
+        if _renew_lease(db, document.id, user_id, now):
+            db.commit()  # Already checked out by this user
+            db.expire(document, ["current_checkout"])
+            return _reload_document(db, document.id)
+        holder = _checkout_holder(db, document.id)
+        db.rollback()
+        if holder is None:
+            raise DocumentConflict("The document was checked in while checking it out; try again")
         raise ValueError("Document is already checked out by another user")
     
-    # Create checkout record
-    document.current_checkout = DocumentCheckout(
-        document_id=document.id,
-        user_id=user_id,
-        checkout_time=datetime.utcnow(),
-        comments=comments
+    db.commit()
+    activity_log.record(document.id, user_id, "checkout", comments)
+    db.expire(document, ["current_checkout"])
+    return _reload_document(db, document.id)
+
+
+async def checkout_document_async(
+    db: AsyncSession,
+    document: Document,
+    user_id: int,
+    comments: str
+) -> Document:
+    return await db.run_sync(checkout_document, document, user_id, comments)
+
+
+def _check_checkout_holder(db: Session, document_id: int, user_id: int) -> None:
+    checkout = db.query(DocumentCheckout.user_id, DocumentCheckout.expires_at).filter(
+        DocumentCheckout.document_id == document_id
+    ).first()
+    expired = (
+        checkout is not None
+        and checkout.expires_at is not None
+        and checkout.expires_at <= datetime.utcnow()
     )
-    
-    # Record checkout activity
-    db.add(DocumentActivity(
-        document_id=document.id,
-        user_id=user_id,
-        activity_type="checkout",
-        details=comments,
-        activity_time=datetime.utcnow()
-    ))
-    
+    if checkout is None or (expired and checkout.user_id != user_id):
+        raise ValueError("Document is not checked out")
+    if checkout.user_id != user_id:
+        raise ValueError("Document is checked out by another user")
+    if expired:
+        raise ValueError("Your checkout has expired; check the document out again")
+
+
+def renew_checkout(db: Session, document: Document, user_id: int) -> DocumentCheckout:
+    """Extend the user's checkout by another lease (the client heartbeat)."""
+    if not _renew_lease(db, document.id, user_id, datetime.utcnow()):
+        db.rollback()
+        _check_checkout_holder(db, document.id, user_id)
+        raise DocumentConflict("The checkout changed while renewing it; reload and try again")
     db.commit()
-    db.refresh(document)
-    return document
+    return db.query(DocumentCheckout).filter(DocumentCheckout.document_id == document.id).one()
 
 
-async def checkin_document(
+def _record_checkin(
     db: Session,
     document: Document,
     user_id: int,
     comments: str,
-    file: Optional[UploadFile] = None,
-    upload_dir: Optional[str] = None
+    new_file: Optional[NewFileVersion] = None
+) -> Document:
+    with _document_write(db, new_file):
+        # Releasing the checkout only if this user still holds it makes the
+        # holder check and the release one step
+        released = db.query(DocumentCheckout).filter(
+            DocumentCheckout.document_id == document.id,
+            DocumentCheckout.user_id == user_id,
+            _lease_active(datetime.utcnow())
+        ).delete(synchronize_session=False)
+        if not released:
+            _check_checkout_holder(db, document.id, user_id)
+            raise DocumentConflict("The checkout changed during check-in; reload and try again")
+        
+        if new_file:
+            _insert_file_version(db, document, new_file, changes=comments)
+    activity_log.record(document.id, user_id, "checkin", comments)
+    db.expire(document, ["current_checkout"])
+    return _reload_document(db, document.id)
+
+
+async def checkin_document(
+    db: AsyncSession,
+    document: Document,
+    user_id: int,
+    comments: str,
+    file: Optional[UploadFile] = None
 ) -> Document:
     """Check in a document after editing."""
-    if not document.current_checkout:
-        raise ValueError("Document is not checked out")
-    if document.current_checkout.user_id != user_id:
-        raise ValueError("Document is checked out by another user")
+    # Fail fast before storing a file; the check is repeated atomically
+    await db.run_sync(_check_checkout_holder, document.id, user_id)
     
+    new_file = None
     # If a new file version is provided
-    if file and upload_dir:
+    if file:
         try:
             # Save new file version
-            os.makedirs(upload_dir, exist_ok=True)
-            file_path = os.path.join(upload_dir, file.filename)
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            # Update document
-            document.file_path = file_path
-            document.mime_type = file.content_type
-            document.version += 1
-            
-            # Create new version record
-            version = DocumentVersion(
-                document_id=document.id,
-                version_number=document.version,
-                file_path=file_path,
-                changes=comments
-            )
-            db.add(version)
+            new_file = await _prepare_file_version(db, document, file)
+        except BUSY_ERRORS:
+            raise
         except Exception as e:
             raise ValueError(f"Error saving file: {str(e)}")
     
-    # Record check-in
-    document.current_checkout = None
-    db.add(DocumentActivity(
-        document_id=document.id,
-        user_id=user_id,
-        activity_type="checkin",
-        details=comments,
-        activity_time=datetime.utcnow()
-    ))
-    
-    db.commit()
-    db.refresh(document)
-    return document
+    return await db.run_sync(_record_checkin, document, user_id, comments, new_file)
 
 
-def get_document_activities(db: Session, document_id: int) -> list[dict]:
-    """Get document activities."""
-    activities = (
+def get_document_activities(
+    db: Session,
+    document_id: int,
+    limit: int = 100,
+    after: Optional[tuple[datetime, int]] = None
+) -> list[dict]:
+    """Get document activities, newest first, after an (activity_time, id) cursor."""
+    query = (
         db.query(DocumentActivity)
+        .options(joinedload(DocumentActivity.user))
         .filter(DocumentActivity.document_id == document_id)
-        .order_by(DocumentActivity.activity_time.desc())
-        .all()
     )
+    activities = keyset_page(
+        query, DocumentActivity.activity_time, DocumentActivity.id, after, limit
+    ).all()
     
     return [
         {
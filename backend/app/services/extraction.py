@@ -0,0 +1,237 @@
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload
+from ..core.config import get_settings
+from ..models.models import DocumentVersion, ExtractionJob
+from . import delta, pages, search
+from .pages import PageEntry
+
+try:
+    from PyPDF2 import PdfReader
+except ImportError:  # PDF extraction is optional
+    PdfReader = None
+
+try:
+    import docx
+except ImportError:  # Word extraction is optional
+    docx = None
+
+settings = get_settings()
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    page_count: Optional[int] = None
+    metadata: dict = field(default_factory=dict)
+    pages: Optional[list[PageEntry]] = None  # PDFs only
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    version_id: int
+    mime_type: Optional[str]
+    paths: list[str]  # Blob chain from version_chain(), keyframe last
+    content_hash: Optional[str] = None
+
+
+def _base_mime_type(mime_type: Optional[str]) -> str:
+    return (mime_type or "").split(";")[0].strip().lower()
+
+
+def can_extract(mime_type: Optional[str]) -> bool:
+    mime_type = _base_mime_type(mime_type)
+    if mime_type == PDF_MIME_TYPE:
+        return PdfReader is not None
+    if mime_type == DOCX_MIME_TYPE:
+        return docx is not None
+    return delta.is_text_like(mime_type)
+
+
+def _extract_pdf(content: bytes) -> ExtractionResult:
+    reader = PdfReader(io.BytesIO(content))
+    page_entries = pages.index_pdf(reader, content)
+    # Pages are separated by form feeds so page text can be recovered later
+    text = "\f".join(entry.text for entry in page_entries)
+    metadata = {}
+    for key, value in (reader.metadata or {}).items():
+        if isinstance(value, (str, int, float)):
+            metadata[key.lstrip("/").lower()] = str(value)
+    return ExtractionResult(
+        text=text, page_count=len(page_entries), metadata=metadata, pages=page_entries
+    )
+
+
+def _extract_docx(content: bytes) -> ExtractionResult:
+    document = docx.Document(io.BytesIO(content))
+    text = "\n".join(paragraph.text for paragraph in document.paragraphs)
+    properties = document.core_properties
+    metadata = {
+        key: str(value)
+        for key, value in (
+            ("title", properties.title),
+            ("author", properties.author),
+            ("created", properties.created),
+            ("modified", properties.modified),
+        )
+        if value
+    }
+    return ExtractionResult(text=text, metadata=metadata)
+
+
+def extract_file(paths: list[str], mime_type: Optional[str], max_chars: int) -> ExtractionResult:
+    """Pull text, page count and metadata out of a stored version.
+
+    Runs in a worker process, so it only takes picklable arguments and
+    never touches the database.
+    """
+    content = delta.read_chain_paths(paths)
+    base_type = _base_mime_type(mime_type)
+    if base_type == PDF_MIME_TYPE:
+        result = _extract_pdf(content)
+    elif base_type == DOCX_MIME_TYPE:
+        result = _extract_docx(content)
+    else:
+        text = content.decode("utf-8", errors="replace")
+        result = ExtractionResult(text=text, metadata={"lines": text.count("\n") + 1})
+
+    result.metadata["characters"] = len(result.text)
+    if len(result.text) > max_chars:
+        result.text = result.text[:max_chars]
+        result.metadata["truncated"] = True
+        # Page text shares the budget; pages past it keep their offsets only
+        for entry in result.pages or []:
+            entry.text = entry.text[:max(max_chars - entry.text_offset, 0)]
+    return result
+
+
+def enqueue(version: DocumentVersion, mime_type: Optional[str]) -> Optional[ExtractionJob]:
+    """Queue text extraction for a new version when its type is supported.
+
+    The job rides along with the version's own insert and commit.
+    """
+    if not can_extract(mime_type):
+        return None
+    version.extraction_job = ExtractionJob(mime_type=mime_type)
+    return version.extraction_job
+
+
+def get_job(db: Session, version_id: int) -> Optional[ExtractionJob]:
+    return db.query(ExtractionJob).filter(ExtractionJob.version_id == version_id).first()
+
+
+def _claimable(now: datetime):
+    stale = now - timedelta(seconds=settings.EXTRACTION_JOB_TIMEOUT)
+    return or_(
+        and_(ExtractionJob.status == JOB_PENDING, ExtractionJob.available_at <= now),
+        # Jobs whose worker died mid-run are picked up again
+        and_(ExtractionJob.status == JOB_RUNNING, ExtractionJob.started_at < stale),
+    )
+
+
+def claim_jobs(db: Session, limit: int) -> list[ClaimedJob]:
+    """Atomically mark up to ``limit`` due jobs as running and return them.
+
+    Each job is claimed with a conditional UPDATE, so several workers can
+    share the queue without handing out the same job twice.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=settings.EXTRACTION_JOB_TIMEOUT)
+    db.query(ExtractionJob).filter(
+        ExtractionJob.status == JOB_RUNNING,
+        ExtractionJob.started_at < stale,
+        ExtractionJob.attempts >= settings.EXTRACTION_MAX_ATTEMPTS,
+    ).update(
+        {"status": JOB_FAILED, "last_error": "Timed out", "finished_at": now},
+        synchronize_session=False
+    )
+
+    candidates = db.query(ExtractionJob.id).filter(_claimable(now)).order_by(
+        ExtractionJob.available_at, ExtractionJob.id
+    ).limit(limit).all()
+
+    claimed_ids = []
+    for (job_id,) in candidates:
+        updated = db.query(ExtractionJob).filter(
+            ExtractionJob.id == job_id, _claimable(now)
+        ).update(
+            {
+                "status": JOB_RUNNING,
+                "started_at": now,
+                "attempts": ExtractionJob.attempts + 1,
+            },
+            synchronize_session=False
+        )
+        if updated:
+            claimed_ids.append(job_id)
+    db.commit()
+
+    if not claimed_ids:
+        return []
+    jobs = db.query(ExtractionJob).options(joinedload(ExtractionJob.version)).filter(
+        ExtractionJob.id.in_(claimed_ids)
+    ).all()
+    return [
+        ClaimedJob(
+            id=job.id,
+            version_id=job.version_id,
+            mime_type=job.mime_type,
+            paths=[version.file_path for version in delta.version_chain(db, job.version)],
+            content_hash=job.version.content_hash
+        )
+        for job in jobs
+    ]
+
+
+def complete_job(db: Session, job_id: int, result: ExtractionResult) -> None:
+    """Store extraction results on the version and refresh the search index."""
+    job = db.get(ExtractionJob, job_id)
+    if job is None or job.status != JOB_RUNNING:
+        return
+
+    version = job.version
+    version.extracted_text = result.text
+    version.page_count = result.page_count
+    version.extraction_metadata = json.dumps(result.metadata)
+    if result.pages is not None:
+        pages.replace_pages(db, version.id, result.pages)
+    job.status = JOB_DONE
+    job.last_error = None
+    job.finished_at = datetime.utcnow()
+
+    document = version.document
+    if document.version == version.version_number:
+        search.index_document(db, document, result.text[:settings.SEARCH_MAX_CONTENT_BYTES])
+    db.commit()
+
+
+def fail_job(db: Session, job_id: int, error: str) -> None:
+    """Record a failed attempt and schedule a retry with exponential backoff."""
+    job = db.get(ExtractionJob, job_id)
+    if job is None or job.status != JOB_RUNNING:
+        return
+
+    now = datetime.utcnow()
+    job.last_error = error[:2000]
+    if job.attempts >= settings.EXTRACTION_MAX_ATTEMPTS:
+        job.status = JOB_FAILED
+        job.finished_at = now
+    else:
+        job.status = JOB_PENDING
+        job.available_at = now + timedelta(
+            seconds=settings.EXTRACTION_RETRY_DELAY * 2 ** (job.attempts - 1)
+        )
+    db.commit()
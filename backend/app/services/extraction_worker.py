@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from . import extraction, renditions
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+class ExtractionWorker:
+    """Drains the extraction_jobs queue into a pool of worker processes.
+
+    At most ``max_in_flight`` jobs are claimed at a time; everything else
+    stays pending in the database, which is the only queue there is. The
+    worker can run inside the API process (see main.py) or on its own via
+    ``python -m app.scripts.extraction_worker``.
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.processes = processes or settings.EXTRACTION_PROCESSES
+        self.max_in_flight = max_in_flight or settings.EXTRACTION_MAX_IN_FLIGHT
+        self.poll_interval = poll_interval or settings.EXTRACTION_POLL_INTERVAL
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Spawned processes do not inherit the parent's database connections
+        return ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    async def _run_job(self, job: extraction.ClaimedJob) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(
+                    self._executor,
+                    extraction.extract_file,
+                    job.paths,
+                    job.mime_type,
+                    settings.EXTRACTION_MAX_CHARS
+                ),
+                timeout=settings.EXTRACTION_JOB_TIMEOUT
+            )
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._executor = self._new_executor()
+            error = f"{type(e).__name__}: {e}"
+            logger.warning(
+                "Extraction failed",
+                extra={"version_id": job.version_id, "error": error}
+            )
+            await run_in_threadpool(_with_session, extraction.fail_job, job.id, error)
+            return
+        await run_in_threadpool(_with_session, extraction.complete_job, job.id, result)
+
+        if settings.RENDITION_PREGENERATE and job.content_hash and renditions.can_render(job.mime_type):
+            try:
+                await loop.run_in_executor(
+                    self._executor, renditions.pregenerate, job.paths, job.mime_type, job.content_hash
+                )
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._executor = self._new_executor()
+                logger.warning(
+                    "Preview pre-generation failed",
+                    extra={"version_id": job.version_id, "error": f"{type(e).__name__}: {e}"}
+                )
+
+    async def run(self) -> None:
+        self._executor = self._new_executor()
+        try:
+            while not self._stopping.is_set():
+                free = self.max_in_flight - len(self._tasks)
+                if free > 0:
+                    try:
+                        jobs = await run_in_threadpool(
+                            _with_session, extraction.claim_jobs, free
+                        )
+                    except Exception:
+                        logger.exception("Error claiming extraction jobs")
+                        jobs = []
+                    for job in jobs:
+                        task = asyncio.create_task(self._run_job(job))
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+
+                # Wake up when a slot frees up, on shutdown, or to poll again
+                stop = asyncio.create_task(self._stopping.wait())
+                await asyncio.wait(
+                    [stop, *self._tasks],
+                    timeout=self.poll_interval,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                stop.cancel()
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._executor.shutdown(cancel_futures=True)
+
+    def start(self) -> None:
+        self._runner = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Finish the jobs in flight and shut the process pool down."""
+        self._stopping.set()
+        if self._runner:
+            await self._runner
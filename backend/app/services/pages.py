@@ -0,0 +1,222 @@
+import io
+import os
+import re
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+from sqlalchemy import and_, insert
+from sqlalchemy.orm import Session
+from ..core.cache import DiskLRUCache
+from ..core.config import get_settings
+from ..models.models import Document, DocumentVersion, DocumentVersionPage
+from . import compression, delta
+from .renditions import PageOutOfRange
+
+try:
+    from PyPDF2 import PdfReader, PdfWriter
+    from PyPDF2.generic import ArrayObject, IndirectObject
+except ImportError:  # Page ranges need PyPDF2, like PDF extraction
+    PdfReader = PdfWriter = None
+
+settings = get_settings()
+
+MEDIA_TYPE = "application/pdf"
+# Bump when page range output changes so old cache entries are ignored
+PAGE_RANGE_FORMAT = 1
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_cache = DiskLRUCache(
+    "page_range",
+    os.path.join(settings.UPLOAD_DIR, "cache", "pages"),
+    max_bytes=settings.PAGE_CACHE_MAX_BYTES
+)
+
+
+@dataclass
+class PageEntry:
+    page_number: int
+    text: str
+    text_offset: int = 0
+    byte_offset: Optional[int] = None
+    byte_length: Optional[int] = None
+
+
+def can_split() -> bool:
+    return PdfReader is not None
+
+
+def _object_spans(reader, content: bytes) -> dict[int, tuple[int, int]]:
+    # An object runs from its xref offset to its last "endobj" before the
+    # next object, which leaves out xref sections and trailers. Objects
+    # packed into an object stream take the span of that stream.
+    offsets = {}
+    for generation in reader.xref.values():
+        offsets.update(generation)
+    starts = sorted(set(offsets.values())) + [len(content)]
+    ends = {}
+    for start, following in zip(starts, starts[1:]):
+        end = content.rfind(b"endobj", start, following)
+        ends[start] = end + len(b"endobj") if end != -1 else following
+    spans = {idnum: (start, ends[start]) for idnum, start in offsets.items() if start in ends}
+    for idnum, (stream_idnum, _) in getattr(reader, "xref_objStm", {}).items():
+        if stream_idnum in spans:
+            spans[idnum] = spans[stream_idnum]
+    return spans
+
+
+def _page_object_ids(page) -> list[int]:
+    ids = []
+    if page.indirect_reference is not None:
+        ids.append(page.indirect_reference.idnum)
+    contents = page.raw_get("/Contents") if "/Contents" in page else None
+    if isinstance(contents, IndirectObject):
+        ids.append(contents.idnum)
+        contents = contents.get_object()
+    if isinstance(contents, ArrayObject):
+        ids.extend(item.idnum for item in contents if isinstance(item, IndirectObject))
+    return ids
+
+
+def index_pdf(reader, content: bytes) -> list[PageEntry]:
+    """Per-page text and byte spans of a parsed PDF (blocking).
+
+    A page's byte span covers the page object and its content streams, not
+    the fonts and images it shares with other pages.
+    """
+    spans = _object_spans(reader, content)
+    entries = []
+    offset = 0
+    for number, page in enumerate(reader.pages, start=1):
+        text = page.extract_text() or ""
+        entry = PageEntry(page_number=number, text=text, text_offset=offset)
+        page_spans = [spans[idnum] for idnum in _page_object_ids(page) if idnum in spans]
+        if page_spans:
+            entry.byte_offset = min(start for start, _ in page_spans)
+            entry.byte_length = max(end for _, end in page_spans) - entry.byte_offset
+        entries.append(entry)
+        # Pages are joined with a form feed in the version's extracted text
+        offset += len(text) + 1
+    return entries
+
+
+def replace_pages(db: Session, version_id: int, entries: list[PageEntry]) -> None:
+    """Store a version's page index. Runs in the caller's transaction."""
+    db.query(DocumentVersionPage).filter(
+        DocumentVersionPage.version_id == version_id
+    ).delete(synchronize_session=False)
+    if entries:
+        db.execute(insert(DocumentVersionPage), [
+            {
+                "version_id": version_id,
+                "page_number": entry.page_number,
+                "text": entry.text,
+                "text_offset": entry.text_offset,
+                "byte_offset": entry.byte_offset,
+                "byte_length": entry.byte_length,
+            }
+            for entry in entries
+        ])
+
+
+def get_pages(
+    db: Session,
+    version_id: int,
+    start: int,
+    end: int,
+    with_text: bool = False
+) -> list[DocumentVersionPage]:
+    columns = [
+        DocumentVersionPage.page_number,
+        DocumentVersionPage.text_offset,
+        DocumentVersionPage.byte_offset,
+        DocumentVersionPage.byte_length,
+    ]
+    if with_text:
+        columns.append(DocumentVersionPage.text)
+    return db.query(*columns).filter(
+        DocumentVersionPage.version_id == version_id,
+        DocumentVersionPage.page_number.between(start, end)
+    ).order_by(DocumentVersionPage.page_number).all()
+
+
+def page_text(db: Session, version_id: int, page_number: int) -> Optional[str]:
+    return db.query(DocumentVersionPage.text).filter(
+        DocumentVersionPage.version_id == version_id,
+        DocumentVersionPage.page_number == page_number
+    ).scalar()
+
+
+def matching_pages(
+    db: Session,
+    document_ids: list[int],
+    query: str,
+    per_document: int = 10
+) -> dict[int, list[int]]:
+    """Pages of each document's current version that contain every query term."""
+    terms = _TOKEN_RE.findall(query)
+    if not terms or not document_ids:
+        return {}
+    # \w includes "_", a LIKE wildcard
+    patterns = [
+        DocumentVersionPage.text.ilike("%" + term.replace("_", "\\_") + "%", escape="\\")
+        for term in terms
+    ]
+    rows = db.query(DocumentVersion.document_id, DocumentVersionPage.page_number).join(
+        DocumentVersion, DocumentVersion.id == DocumentVersionPage.version_id
+    ).join(
+        Document,
+        and_(Document.id == DocumentVersion.document_id, Document.version == DocumentVersion.version_number)
+    ).filter(
+        DocumentVersion.document_id.in_(document_ids), *patterns
+    ).order_by(DocumentVersion.document_id, DocumentVersionPage.page_number)
+
+    pages: dict[int, list[int]] = {}
+    for document_id, page_number in rows:
+        found = pages.setdefault(document_id, [])
+        if len(found) < per_document:
+            found.append(page_number)
+    return pages
+
+
+def _open_pdf(paths: list[str]) -> BinaryIO:
+    # PdfReader seeks around and only parses the objects it needs, so an
+    # uncompressed blob is read in place rather than loaded whole
+    if len(paths) == 1 and compression.codec_for_path(paths[0]) is None:
+        return open(paths[0], "rb")
+    return io.BytesIO(delta.read_chain_paths(paths))
+
+
+def _split(paths: list[str], start: int, end: int) -> bytes:
+    with _open_pdf(paths) as source:
+        reader = PdfReader(source)
+        page_count = len(reader.pages)
+        if not 1 <= start <= end <= page_count:
+            raise PageOutOfRange(page_count)
+        writer = PdfWriter()
+        for index in range(start - 1, end):
+            writer.add_page(reader.pages[index])
+        out = io.BytesIO()
+        writer.write(out)
+    return out.getvalue()
+
+
+def cache_path(content_hash: str, start: int, end: int) -> str:
+    filename = f"{content_hash}-{start}-{end}-v{PAGE_RANGE_FORMAT}.pdf"
+    return os.path.join(_cache.directory, content_hash[:2], filename)
+
+
+def page_range_pdf(content_hash: Optional[str], paths: list[str], start: int, end: int) -> bytes:
+    """A standalone PDF of pages ``start``..``end`` (1-based, inclusive) (blocking).
+
+    Cached on disk by content hash, so each range is cut out of the
+    original file once.
+    """
+    path = cache_path(content_hash, start, end) if content_hash else None
+    if path:
+        cached = _cache.get(path)
+        if cached is not None:
+            return cached
+    data = _split(paths, start, end)
+    if path:
+        _cache.put(path, data)
+    return data
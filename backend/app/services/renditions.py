@@ -0,0 +1,205 @@
+import asyncio
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from ..core.cache import DiskLRUCache
+from ..core.config import get_settings
+from . import compression, delta
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # PDF previews are optional
+    pdfium = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # All previews need Pillow
+    Image = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+THUMBNAIL = "thumbnail"
+PREVIEW = "preview"
+MEDIA_TYPE = "image/jpeg"
+PDF_MIME_TYPE = "application/pdf"
+PAGE_COUNT_HEADER = "X-Page-Count"
+# Bump when rendering changes so old cache entries are ignored
+RENDITION_FORMAT = 1
+
+_cache = DiskLRUCache(
+    "rendition",
+    os.path.join(settings.UPLOAD_DIR, "cache", "renditions"),
+    max_bytes=settings.RENDITION_CACHE_MAX_BYTES
+)
+# Rendering is CPU-bound (pdfium and Pillow release the GIL), so it gets
+# its own small pool instead of competing with request handlers
+_executor = ThreadPoolExecutor(
+    max_workers=settings.RENDITION_WORKERS, thread_name_prefix="rendition"
+)
+_in_flight: dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+
+
+class PageOutOfRange(ValueError):
+    def __init__(self, page_count: int):
+        super().__init__(f"The document has {page_count} page(s)")
+        self.page_count = page_count
+
+
+def _base_mime_type(mime_type: Optional[str]) -> str:
+    return (mime_type or "").split(";")[0].strip().lower()
+
+
+def can_render(mime_type: Optional[str]) -> bool:
+    mime_type = _base_mime_type(mime_type)
+    if Image is None:
+        return False
+    if mime_type == PDF_MIME_TYPE:
+        return pdfium is not None
+    return mime_type.startswith("image/") and mime_type != "image/svg+xml"
+
+
+def _max_size(kind: str) -> int:
+    return settings.RENDITION_THUMBNAIL_SIZE if kind == THUMBNAIL else settings.RENDITION_PREVIEW_SIZE
+
+
+def cache_path(content_hash: str, kind: str, page: int) -> str:
+    filename = f"{content_hash}-{kind}-{_max_size(kind)}-{page}-v{RENDITION_FORMAT}.jpg"
+    return os.path.join(_cache.directory, content_hash[:2], filename)
+
+
+def _source(paths: list[str]) -> str | bytes:
+    # pdfium and Pillow read an uncompressed blob in place, loading only the
+    # parts of it they need; compressed or delta-encoded versions are rebuilt
+    # in memory
+    if len(paths) == 1 and compression.codec_for_path(paths[0]) is None:
+        return paths[0]
+    return delta.read_chain_paths(paths)
+
+
+def _open_pdf_page(source: str | bytes, page: int, size: int):
+    pdf = pdfium.PdfDocument(source)
+    try:
+        if not 1 <= page <= len(pdf):
+            raise PageOutOfRange(len(pdf))
+        pdf_page = pdf[page - 1]
+        width, height = pdf_page.get_size()
+        # Page sizes are in points; render straight at the target size
+        image = pdf_page.render(scale=size / max(width, height, 1)).to_pil()
+        pdf_page.close()
+        return image
+    finally:
+        pdf.close()
+
+
+def _open_image_page(source: str | bytes, page: int, size: int):
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as image:
+        frames = getattr(image, "n_frames", 1)
+        if not 1 <= page <= frames:
+            raise PageOutOfRange(frames)
+        image.seek(page - 1)
+        # Decode at a reduced scale where the format allows it (JPEG)
+        image.draft("RGB", (size, size))
+        # Returns a loaded copy, so the file can be closed
+        return ImageOps.exif_transpose(image)
+
+
+def render(source: str | bytes, mime_type: Optional[str], kind: str, page: int) -> bytes:
+    """Render one page of a PDF or image as a JPEG no larger than the kind's size (blocking).
+
+    ``source`` is the path of an uncompressed file or the file's contents.
+    """
+    size = _max_size(kind)
+    if _base_mime_type(mime_type) == PDF_MIME_TYPE:
+        image = _open_pdf_page(source, page, size)
+    else:
+        image = _open_image_page(source, page, size)
+    image.thumbnail((size, size))
+
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=settings.RENDITION_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def _render_to_cache(
+    path: Optional[str],
+    paths: list[str],
+    mime_type: Optional[str],
+    kind: str,
+    page: int
+) -> bytes:
+    data = render(_source(paths), mime_type, kind, page)
+    if path:
+        _cache.put(path, data)
+    return data
+
+
+def _forget(path: str, future: Future) -> None:
+    with _in_flight_lock:
+        if _in_flight.get(path) is future:
+            del _in_flight[path]
+
+
+async def get_rendition(
+    content_hash: Optional[str],
+    mime_type: Optional[str],
+    kind: str,
+    page: int,
+    paths: list[str]
+) -> bytes:
+    """A page rendition, from the disk cache or rendered on first request.
+
+    ``paths`` is the version's blob chain from version_chain(), keyframe
+    last; it is only read on a miss. Concurrent requests for the same
+    missing rendition share one render. Versions without a content hash are
+    rendered every time.
+    """
+    if not content_hash:
+        return await asyncio.wrap_future(
+            _executor.submit(_render_to_cache, None, paths, mime_type, kind, page)
+        )
+
+    path = cache_path(content_hash, kind, page)
+    cached = await run_in_threadpool(_cache.get, path)
+    if cached is not None:
+        return cached
+
+    with _in_flight_lock:
+        future = _in_flight.get(path)
+        started = future is None
+        if started:
+            future = _executor.submit(_render_to_cache, path, paths, mime_type, kind, page)
+            _in_flight[path] = future
+    if started:
+        # Outside the lock: a render that already finished runs the
+        # callback right here, and _forget takes the lock itself
+        future.add_done_callback(lambda _: _forget(path, future))
+    return await asyncio.wrap_future(future)
+
+
+def pregenerate(paths: list[str], mime_type: Optional[str], content_hash: str) -> None:
+    """Render a version's thumbnail and first preview page into the cache (blocking).
+
+    Called by the extraction worker, in its process pool, for new versions.
+    """
+    source = None
+    for kind in (THUMBNAIL, PREVIEW):
+        path = cache_path(content_hash, kind, 1)
+        if os.path.exists(path):
+            continue
+        if source is None:
+            source = _source(paths)
+        _cache.put(path, render(source, mime_type, kind, 1))
@@ -0,0 +1,187 @@
+import re
+from typing import Optional
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from ..models.models import Document, DocumentSearchEntry
+
+SQLITE_FTS_TABLE = "document_search_fts"
+TEXT_SEARCH_CONFIG = "english"
+
+# Weights for title, tags, description and extracted content
+POSTGRES_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(tags, '')), 'B') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(description, '')), 'C') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(content, '')), 'D')"
+)
+SQLITE_BM25_WEIGHTS = "10.0, 5.0, 3.0, 1.0"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_search_schema(bind: Engine | Connection) -> None:
+    """Create the dialect-specific full-text index next to document_search.
+
+    Postgres gets a generated, weighted tsvector column with a GIN index;
+    SQLite gets an FTS5 table keyed by document id.
+    """
+    if bind.dialect.name == "postgresql":
+        statements = [
+            "ALTER TABLE document_search ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({POSTGRES_SEARCH_VECTOR}) STORED",
+            "CREATE INDEX IF NOT EXISTS ix_document_search_vector "
+            "ON document_search USING gin (search_vector)",
+        ]
+    elif bind.dialect.name == "sqlite":
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+            "USING fts5(title, tags, description, content, tokenize='porter unicode61')",
+        ]
+    else:
+        return
+
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+    else:
+        for statement in statements:
+            bind.execute(text(statement))
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def index_document(db: Session, document: Document, content: Optional[str] = None) -> None:
+    """Refresh a document's search entry; ``content`` None keeps the old text.
+
+    Runs in the caller's transaction and does not commit.
+    """
+    entry = db.get(DocumentSearchEntry, document.id)
+    if entry is None:
+        entry = DocumentSearchEntry(document_id=document.id)
+        db.add(entry)
+    entry.title = document.title
+    entry.description = document.description
+    entry.tags = " ".join(tag.name for tag in document.tags)
+    if content is not None:
+        entry.content = content
+
+    if _dialect(db) == "sqlite":
+        db.flush()
+        db.execute(
+            text(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = :id"), {"id": document.id}
+        )
+        db.execute(
+            text(
+                f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, tags, description, content) "
+                "VALUES (:id, :title, :tags, :description, :content)"
+            ),
+            {
+                "id": document.id,
+                "title": entry.title or "",
+                "tags": entry.tags or "",
+                "description": entry.description or "",
+                "content": entry.content or "",
+            }
+        )
+
+
+def index_new_documents(db: Session, entries: list[dict]) -> None:
+    """Index freshly inserted documents in bulk.
+
+    Each entry has document_id, title, description and tags (a list of
+    names). Runs in the caller's transaction and does not commit.
+    """
+    if not entries:
+        return
+    rows = [
+        {
+            "document_id": entry["document_id"],
+            "title": entry["title"],
+            "description": entry["description"],
+            "tags": " ".join(entry["tags"]),
+        }
+        for entry in entries
+    ]
+    db.execute(insert(DocumentSearchEntry), rows)
+
+    if _dialect(db) == "sqlite":
+        db.execute(
+            text(
+                f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, tags, description, content) "
+                "VALUES (:document_id, :title, :tags, :description, '')"
+            ),
+            [{**row, "title": row["title"] or "", "description": row["description"] or ""} for row in rows]
+        )
+
+
+def remove_document(db: Session, document_id: int) -> None:
+    db.query(DocumentSearchEntry).filter(
+        DocumentSearchEntry.document_id == document_id
+    ).delete()
+    if _dialect(db) == "sqlite":
+        db.execute(
+            text(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = :id"), {"id": document_id}
+        )
+
+
+def _fts5_query(query: str) -> str:
+    # Quote every term so user input can never be parsed as FTS5 syntax;
+    # the last term also matches as a prefix for search-as-you-type
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_documents(
+    db: Session,
+    query: str,
+    owner_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> list[tuple[int, float, Optional[str]]]:
+    """Ranked (document_id, score, snippet) matches, best first."""
+    owner_filter = "AND d.owner_id = :owner_id" if owner_id is not None else ""
+    params = {"owner_id": owner_id, "limit": limit, "offset": offset}
+
+    if _dialect(db) == "postgresql":
+        params["query"] = query
+        sql = f"""
+            SELECT s.document_id,
+                   ts_rank_cd(s.search_vector, q) AS score,
+                   ts_headline('{TEXT_SEARCH_CONFIG}', coalesce(s.content, s.description, ''), q,
+                               'StartSel=<mark>, StopSel=</mark>, MaxFragments=1') AS snippet
+            FROM document_search s
+            JOIN documents d ON d.id = s.document_id,
+                 websearch_to_tsquery('{TEXT_SEARCH_CONFIG}', :query) q
+            WHERE s.search_vector @@ q {owner_filter}
+            ORDER BY score DESC, s.document_id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    elif _dialect(db) == "sqlite":
+        params["query"] = _fts5_query(query)
+        if not params["query"]:
+            return []
+        sql = f"""
+            SELECT f.rowid AS document_id,
+                   -bm25({SQLITE_FTS_TABLE}, {SQLITE_BM25_WEIGHTS}) AS score,
+                   snippet({SQLITE_FTS_TABLE}, -1, '<mark>', '</mark>', '…', 16) AS snippet
+            FROM {SQLITE_FTS_TABLE} f
+            JOIN documents d ON d.id = f.rowid
+            WHERE {SQLITE_FTS_TABLE} MATCH :query {owner_filter}
+            ORDER BY score DESC, f.rowid DESC
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        raise ValueError(f"Full-text search is not supported on {_dialect(db)}")
+
+    return [
+        (row.document_id, float(row.score), row.snippet or None)
+        for row in db.execute(text(sql), params)
+    ]
@@ -0,0 +1,296 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..core.config import get_settings
+from ..models.models import DocumentVersion
+from . import compression
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Suffix of a blob moved aside while it is being deleted
+GC_SUFFIX = ".gc"
+
+
+@dataclass
+class StoredBlob:
+    digest: str
+    path: str
+    bytes_written: int
+    elapsed: float
+    deduplicated: bool = False
+    encoding: Optional[str] = None
+
+    @property
+    def throughput(self) -> float:
+        """Bytes written per second."""
+        if self.elapsed <= 0:
+            return float(self.bytes_written)
+        return self.bytes_written / self.elapsed
+
+
+def blob_dir() -> str:
+    return os.path.join(settings.UPLOAD_DIR, "blobs")
+
+
+def blob_path(digest: str, encoding: Optional[str] = None) -> str:
+    """Location of a blob, fanned out by the first bytes of its digest.
+
+    Compressed blobs carry their codec's suffix, so the stored encoding can
+    always be recovered from the path.
+    """
+    codec = compression.get_codec(encoding)
+    filename = digest + (codec.suffix if codec else "")
+    return os.path.join(blob_dir(), digest[:2], digest[2:4], filename)
+
+
+def blob_encoding(path: str) -> Optional[str]:
+    codec = compression.codec_for_path(path)
+    return codec.name if codec else None
+
+
+def _copy_to_blob_store(
+    source: BinaryIO,
+    chunk_size: int,
+    mime_type: Optional[str] = None
+) -> tuple[str, str, int, bool, Optional[str]]:
+    tmp_dir = os.path.join(blob_dir(), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    codec, level = compression.choose_codec(mime_type)
+    compressor = codec.compressor(level) if codec else None
+    encoding = codec.name if codec else None
+
+    hasher = hashlib.sha256()
+    bytes_written = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                buffer.write(compressor.compress(chunk) if compressor else chunk)
+                bytes_written += len(chunk)
+            if compressor:
+                buffer.write(compressor.flush())
+
+        digest = hasher.hexdigest()
+        path = blob_path(digest, encoding)
+        if _touch(path):
+            os.remove(tmp_path)
+            return digest, path, bytes_written, True, encoding
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return digest, path, bytes_written, False, encoding
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+async def store_upload(file: UploadFile, chunk_size: Optional[int] = None) -> StoredBlob:
+    """Stream an upload into the content-addressed blob store.
+
+    The file is hashed while it is copied in fixed-size chunks off the event
+    loop, and compressed on the way when its MIME type benefits from it; if a
+    blob with the same digest already exists the copy is dropped.
+    """
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    await file.seek(0)
+    start = time.perf_counter()
+    digest, path, bytes_written, deduplicated, encoding = await run_in_threadpool(
+        _copy_to_blob_store, file.file, chunk_size, file.content_type
+    )
+    blob = StoredBlob(
+        digest=digest,
+        path=path,
+        bytes_written=bytes_written,
+        elapsed=time.perf_counter() - start,
+        deduplicated=deduplicated,
+        encoding=encoding
+    )
+    logger.info(
+        "Stored upload",
+        extra={
+            "upload_filename": file.filename,
+            "digest": digest,
+            "bytes": blob.bytes_written,
+            "seconds": round(blob.elapsed, 3),
+            "mib_per_second": round(blob.throughput / 1_048_576, 1),
+            "deduplicated": deduplicated,
+        }
+    )
+    return blob
+
+
+def store_bytes(data: bytes, mime_type: Optional[str] = None) -> StoredBlob:
+    """Store an in-memory payload in the blob store (blocking)."""
+    return store_file(io.BytesIO(data), mime_type)
+
+
+def store_file(source: BinaryIO, mime_type: Optional[str] = None) -> StoredBlob:
+    """Stream a file object into the blob store (blocking)."""
+    start = time.perf_counter()
+    digest, path, bytes_written, deduplicated, encoding = _copy_to_blob_store(
+        source, settings.UPLOAD_CHUNK_SIZE, mime_type
+    )
+    return StoredBlob(
+        digest=digest,
+        path=path,
+        bytes_written=bytes_written,
+        elapsed=time.perf_counter() - start,
+        deduplicated=deduplicated,
+        encoding=encoding
+    )
+
+
+def open_blob(path: str) -> BinaryIO:
+    """Open a blob for reading its original, decompressed contents."""
+    codec = compression.codec_for_path(path)
+    return codec.open(path) if codec else open(path, "rb")
+
+
+def read_blob(path: str) -> bytes:
+    with open_blob(path) as blob:
+        return blob.read()
+
+
+def iter_blob(path: str, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    with open_blob(path) as blob:
+        while True:
+            chunk = blob.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def count_blob_references(db: Session, path: str) -> int:
+    return db.query(DocumentVersion).filter(DocumentVersion.file_path == path).count()
+
+
+def _touch(path: str) -> bool:
+    """Mark an existing blob as just used; False if there is none.
+
+    A deduplicated upload refreshes the blob's age this way, so it is not
+    collected before the upload commits the version that references it.
+    """
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _is_fresh(path: str) -> bool:
+    return time.time() - os.stat(path).st_mtime < settings.BLOB_GC_GRACE_SECONDS
+
+
+def _settle_aside(aside: str, referenced: bool) -> bool:
+    """Delete a blob moved aside for removal, or put it back if it is still in use."""
+    path = aside[:-len(GC_SUFFIX)]
+    try:
+        if referenced or _is_fresh(aside):
+            if os.path.exists(path):
+                os.remove(aside)  # An upload stored a new copy meanwhile
+            else:
+                os.replace(aside, path)
+            return False
+        os.remove(aside)
+    except FileNotFoundError:
+        return False  # Settled by another process
+    return True
+
+
+def _remove_unreferenced(path: str) -> bool:
+    # The blob is moved aside first, so an upload that looks for it from
+    # then on stores its own copy. One that found it before the move has
+    # refreshed its age, which the second check below sees.
+    aside = path + GC_SUFFIX
+    try:
+        os.rename(path, aside)
+    except FileNotFoundError:
+        return False
+    return _settle_aside(aside, referenced=False)
+
+
+def release_blob(db: Session, path: str) -> bool:
+    """Delete a blob once no DocumentVersion row references it any more.
+
+    Blobs younger than BLOB_GC_GRACE_SECONDS are kept, since an upload that
+    stored or deduplicated against one may not have committed its version
+    yet; collect_garbage() removes them later. Returns whether it was deleted.
+    """
+    if not path.startswith(blob_dir() + os.sep):
+        return False
+    if count_blob_references(db, path) > 0:
+        return False
+    try:
+        if _is_fresh(path):
+            return False
+    except FileNotFoundError:
+        return False
+    return _remove_unreferenced(path)
+
+
+def _referenced_paths(db: Session, paths: list[str]) -> set[str]:
+    return {
+        path for (path,) in db.query(DocumentVersion.file_path).filter(
+            DocumentVersion.file_path.in_(paths)
+        ).distinct()
+    }
+
+
+def _collect_batch(db: Session, paths: list[str]) -> int:
+    referenced = _referenced_paths(
+        db, [path[:-len(GC_SUFFIX)] if path.endswith(GC_SUFFIX) else path for path in paths]
+    )
+    removed = 0
+    for path in paths:
+        if path.endswith(GC_SUFFIX):
+            # Left behind by a collector that stopped half way
+            removed += _settle_aside(path, path[:-len(GC_SUFFIX)] in referenced)
+        elif path not in referenced:
+            removed += _remove_unreferenced(path)
+    return removed
+
+
+def collect_garbage(db: Session, batch_size: int = 500) -> int:
+    """Delete every blob older than the grace period that no version references.
+
+    Picks up what release_blob() had to leave: blobs released while fresh,
+    such as full copies replaced by a delta or files from a failed upload.
+    Safe to run in several processes at once. Returns how many were deleted.
+    """
+    removed = 0
+    batch: list[str] = []
+    tmp_dir = os.path.join(blob_dir(), "tmp")
+    for root, dirs, files in os.walk(blob_dir()):
+        if root == blob_dir():
+            dirs[:] = [name for name in dirs if os.path.join(root, name) != tmp_dir]
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if _is_fresh(path):
+                    continue
+            except FileNotFoundError:
+                continue
+            batch.append(path)
+            if len(batch) >= batch_size:
+                removed += _collect_batch(db, batch)
+                batch = []
+    if batch:
+        removed += _collect_batch(db, batch)
+    return removed
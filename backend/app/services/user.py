@@ -1,14 +1,46 @@
+import logging
+from datetime import datetime
 from typing import Any
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..core.security import get_password_hash, verify_password
+from ..core.cache import TTLCache
+from ..core.config import get_settings
+from ..core.pagination import keyset_page
+from ..core.security import dummy_verify_password, get_password_hash, verify_and_update_password
 from ..models.models import User
-from ..schemas.user import UserCreate, UserUpdate
+from ..schemas.user import UserCreate, UserPrincipal, UserUpdate
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_principal_cache: TTLCache[UserPrincipal] = TTLCache(
+    "user_principal", maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL
+)
 
 
 def get_user(db: Session, user_id: int) -> User | None:
     return db.query(User).filter(User.id == user_id).first()
 
 
+def get_user_principal(db: Session, user_id: int) -> UserPrincipal | None:
+    """The fields permission checks need, served from a TTL cache when possible."""
+    principal = _principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    row = db.query(User.id, User.username, User.is_active, User.is_superuser).filter(
+        User.id == user_id
+    ).first()
+    if row is None:
+        return None
+    principal = UserPrincipal.model_validate(row)
+    _principal_cache.set(user_id, principal)
+    return principal
+
+
+def invalidate_user(user_id: int) -> None:
+    _principal_cache.invalidate(user_id)
+
+
 def get_user_by_email(db: Session, email: str) -> User | None:
     return db.query(User).filter(User.email == email).first()
 
@@ -17,8 +49,17 @@ def get_user_by_username(db: Session, username: str) -> User | None:
     return db.query(User).filter(User.username == username).first()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> list[User]:
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: tuple[datetime, int] | None = None
+) -> list[User]:
+    """List users newest first, starting after a (created_at, id) cursor."""
+    query = keyset_page(db.query(User), User.created_at, User.id, after, limit)
+    if skip:
+        query = query.offset(skip)
+    return query.all()
 
 
 def create_user(db: Session, user_in: UserCreate) -> User:
@@ -51,29 +92,43 @@ def update_user(db: Session, db_user: User, user_in: UserUpdate | dict[str, Any]
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    invalidate_user(db_user.id)
     return db_user
 
 
-def authenticate(db: Session, username: str, password: str) -> User | None:
-    print(f"Authenticating user: {username}")
+def _find_login_user(db: Session, username: str) -> User | None:
     user = get_user_by_username(db, username=username)
-    print(f"Found by username: {user is not None}")
     if not user:
         user = get_user_by_email(db, email=username)  # Try email as fallback
-        print(f"Found by email: {user is not None}")
+    return user
+
+
+async def authenticate(db: AsyncSession, username: str, password: str) -> User | None:
+    """Check a login; bcrypt runs in the bounded password-hashing pool.
+
+    Raises PasswordHashingBusy when that pool's queue is full.
+    """
+    user = await db.run_sync(_find_login_user, username)
     if not user:
-        print("User not found")
+        logger.info("Login failed: unknown user", extra={"username": username})
+        await dummy_verify_password()
         return None
-    if not verify_password(password, user.hashed_password):
-        print("Password verification failed")
+    verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not verified:
+        logger.info("Login failed: wrong password", extra={"user_id": user.id})
         return None
-    print(f"Authentication successful for user: {user.username}")
+    if new_hash:
+        # Stored hash predates the current bcrypt settings
+        user.hashed_password = new_hash
+        await db.commit()
+        logger.info("Upgraded password hash", extra={"user_id": user.id})
+    logger.debug("Login succeeded", extra={"user_id": user.id})
     return user
 
 
-def is_active(user: User) -> bool:
+def is_active(user: User | UserPrincipal) -> bool:
     return user.is_active
 
 
-def is_superuser(user: User) -> bool:
+def is_superuser(user: User | UserPrincipal) -> bool:
     return user.is_superuser
@@ -0,0 +1,358 @@
+"""Load test for the document API, with baselines to compare runs against.
+
+Seeds a database (see seed.py), then drives the real FastAPI app in
+process through httpx's ASGI transport: every request goes through the
+middleware, dependencies, database and blob store, just without a socket.
+Each scenario runs a fixed number of operations at the given concurrency
+and reports throughput, p50/p95/p99 latency, errors and peak memory.
+
+    python benchmarks/api_load.py --documents 500 --concurrency 8 --save baseline.json
+    # ...make a change...
+    python benchmarks/api_load.py --documents 500 --concurrency 8 --compare baseline.json
+
+Without --database-url a throwaway SQLite database and upload directory
+are used. Pass a Postgres URL (an empty database) to measure against the
+production dialect. --trace-memory reports the Python heap peak per
+scenario via tracemalloc, at a noticeable cost in latency, so do not mix
+traced and untraced runs in one comparison.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+SCENARIOS = (
+    "list",
+    "detail",
+    "download",
+    "activities",
+    "search",
+    "upload",
+    "checkout_checkin",
+)
+
+
+@dataclass
+class ScenarioResult:
+    operations: int
+    errors: int
+    seconds: float
+    throughput: float  # Operations per second
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_memory_bytes: Optional[int]  # tracemalloc peak, with --trace-memory
+    max_rss_bytes: int  # Process high-water mark after the scenario
+
+
+class Context:
+    """Seeded ids and per-user auth headers shared by the scenarios."""
+
+    def __init__(self, data, tokens: dict[int, str], search_terms: list[str]):
+        self.documents = [
+            (owner_id, document_id)
+            for owner_id, document_ids in data.documents_by_owner.items()
+            for document_id in document_ids
+        ]
+        self.user_ids = data.user_ids
+        self.tokens = tokens
+        self.search_terms = search_terms
+
+    def headers(self, user_id: int) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    def document(self, operation: int) -> tuple[int, int]:
+        return self.documents[operation % len(self.documents)]
+
+    def worker_documents(self, worker: int, concurrency: int) -> list[tuple[int, int]]:
+        # Disjoint per worker, so concurrent checkouts never hit the same document
+        return self.documents[worker::concurrency]
+
+
+def _check(response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path}: {response.status_code}")
+
+
+async def _list(client, ctx: Context, operation: int, worker: int, concurrency: int) -> None:
+    user_id = ctx.user_ids[operation % len(ctx.user_ids)]
+    _check(await client.get("/api/v1/documents", params={"limit": 50}, headers=ctx.headers(user_id)))
+
+
+async def _detail(client, ctx: Context, operation: int, worker: int, concurrency: int) -> None:
+    owner_id, document_id = ctx.document(operation)
+    _check(await client.get(f"/api/v1/documents/{document_id}", headers=ctx.headers(owner_id)))
+
+
+async def _download(client, ctx: Context, operation: int, worker: int, concurrency: int) -> None:
+    owner_id, document_id = ctx.document(operation)
+    _check(await client.get(f"/api/v1/documents/{document_id}/download", headers=ctx.headers(owner_id)))
+
+
+async def _activities(client, ctx: Context, operation: int, worker: int, concurrency: int) -> None:
+    owner_id, document_id = ctx.document(operation)
+    _check(await client.get(f"/api/v1/documents/{document_id}/activities", headers=ctx.headers(owner_id)))
+
+
+async def _search(client, ctx: Context, operation: int, worker: int, concurrency: int) -> None:
+    user_id = ctx.user_ids[operation % len(ctx.user_ids)]
+    terms = ctx.search_terms
+    query = f"{terms[operation % len(terms)]} {terms[(operation * 7) % len(terms)]}"
+    _check(await client.get("/api/v1/documents/search", params={"q": query}, headers=ctx.headers(user_id)))
+
+
+async def _upload(client, ctx: Context, operation: int, worker: int, concurrency: int) -> None:
+    user_id = ctx.user_ids[operation % len(ctx.user_ids)]
+    content = f"benchmark upload {operation}\n".encode() * 512
+    _check(await client.post(
+        "/api/v1/documents",
+        files={"file": (f"upload-{operation}.txt", content, "text/plain")},
+        data={"title": f"Upload {operation}", "tags": f"upload,worker{worker}"},
+        headers=ctx.headers(user_id),
+    ))
+
+
+async def _checkout_checkin(client, ctx: Context, operation: int, worker: int, concurrency: int) -> None:
+    documents = ctx.worker_documents(worker, concurrency)
+    owner_id, document_id = documents[(operation // concurrency) % len(documents)]
+    headers = ctx.headers(owner_id)
+    _check(await client.post(
+        f"/api/v1/documents/{document_id}/checkout", data={"comments": "benchmark"}, headers=headers
+    ))
+    content = f"revision from operation {operation}\n".encode() * 512
+    _check(await client.post(
+        f"/api/v1/documents/{document_id}/checkin",
+        data={"comments": f"operation {operation}"},
+        files={"new_version": ("revision.txt", content, "text/plain")},
+        headers=headers,
+    ))
+
+
+ScenarioFn = Callable[..., Awaitable[None]]
+SCENARIO_FUNCTIONS: dict[str, ScenarioFn] = {
+    "list": _list,
+    "detail": _detail,
+    "download": _download,
+    "activities": _activities,
+    "search": _search,
+    "upload": _upload,
+    "checkout_checkin": _checkout_checkin,
+}
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+async def run_scenario(
+    client, ctx: Context, fn: ScenarioFn, operations: int, concurrency: int, trace_memory: bool
+) -> ScenarioResult:
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker(index: int) -> None:
+        nonlocal errors
+        for operation in range(index, operations, concurrency):
+            start = time.perf_counter()
+            try:
+                await fn(client, ctx, operation, index, concurrency)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    latencies.sort()
+    return ScenarioResult(
+        operations=operations,
+        errors=errors,
+        seconds=round(seconds, 3),
+        throughput=round(operations / seconds, 2),
+        mean_ms=round(statistics.mean(latencies) * 1000, 3),
+        p50_ms=round(_percentile(latencies, 50) * 1000, 3),
+        p95_ms=round(_percentile(latencies, 95) * 1000, 3),
+        p99_ms=round(_percentile(latencies, 99) * 1000, 3),
+        peak_memory_bytes=peak,
+        max_rss_bytes=_max_rss_bytes(),
+    )
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict[str, ScenarioResult]) -> None:
+    print(
+        f"{'scenario':<18} {'ops':>6} {'errors':>6} {'ops/s':>9} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9} {'peak MiB':>9}"
+    )
+    for name, result in results.items():
+        peak = f"{result.peak_memory_bytes / 2**20:.1f}" if result.peak_memory_bytes is not None else "-"
+        print(
+            f"{name:<18} {result.operations:>6} {result.errors:>6} {result.throughput:>9.1f} "
+            f"{result.p50_ms:>9.2f} {result.p95_ms:>9.2f} {result.p99_ms:>9.2f} {peak:>9}"
+        )
+    print(f"max RSS {max(r.max_rss_bytes for r in results.values()) / 2**20:.1f} MiB")
+
+
+def compare(results: dict[str, ScenarioResult], baseline: dict, max_regression: Optional[float]) -> bool:
+    """Print the change against a saved baseline; False if p95 regressed past the limit."""
+    ok = True
+    print(f"\nagainst baseline {baseline['meta'].get('revision') or ''} ({baseline['meta']['created_at']})")
+    print(f"{'scenario':<18} {'ops/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, result in results.items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            print(f"{name:<18} {'(not in baseline)':>9}")
+            continue
+
+        def change(key: str) -> float:
+            return (getattr(result, key) - before[key]) / before[key] * 100 if before[key] else 0.0
+
+        print(
+            f"{name:<18} {change('throughput'):>+8.1f}% {change('p50_ms'):>+8.1f}% "
+            f"{change('p95_ms'):>+8.1f}% {change('p99_ms'):>+8.1f}%"
+        )
+        if max_regression is not None and change("p95_ms") > max_regression:
+            ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite database")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--versions", type=int, default=3, help="versions per document")
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--activities", type=int, default=5, help="activities per document")
+    parser.add_argument("--file-size", type=int, default=16 * 1024, help="bytes per seeded file")
+    parser.add_argument("--operations", type=int, default=200, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--trace-memory", action="store_true", help="report the tracemalloc peak per scenario")
+    parser.add_argument("--save", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="compare against a JSON file written by --save")
+    parser.add_argument(
+        "--max-regression", type=float,
+        help="with --compare, exit non-zero if any p95 got worse by more than this percentage"
+    )
+    args = parser.parse_args()
+
+    # Configure the app before it is imported
+    tmp = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.sqlite"
+    os.environ.setdefault("UPLOAD_DIR", f"{tmp}/uploads")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["EXTRACTION_WORKER_ENABLED"] = "false"
+
+    import httpx
+
+    from app.core.database import SessionLocal, engine
+    from app.core.security import create_access_token
+    from app.main import app
+    from seed import WORDS, create_schema, seed
+
+    create_schema(engine)
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        data = seed(
+            db,
+            users=args.users,
+            documents=args.documents,
+            versions=args.versions,
+            tags=args.tags,
+            activities=args.activities,
+            file_size=args.file_size,
+        )
+        print(f"seeded {args.documents} documents in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+    ctx = Context(
+        data, {user_id: create_access_token(user_id) for user_id in data.user_ids}, list(WORDS)
+    )
+
+    async def run_all() -> dict[str, ScenarioResult]:
+        results = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name in args.scenarios:
+                fn = SCENARIO_FUNCTIONS[name]
+                # Warm up caches and connection pools outside the measurement
+                await run_scenario(client, ctx, fn, args.concurrency, args.concurrency, False)
+                results[name] = await run_scenario(
+                    client, ctx, fn, args.operations, args.concurrency, args.trace_memory
+                )
+        return results
+
+    results = asyncio.run(run_all())
+    print_results(results)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "dialect": engine.dialect.name,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "config": {
+                key: value for key, value in vars(args).items()
+                if key not in ("database_url", "save", "compare", "max_regression")
+            },
+        },
+        "scenarios": {name: asdict(result) for name, result in results.items()},
+    }
+    if args.save:
+        args.save.write_text(json.dumps(report, indent=2, default=str) + "\n")
+        print(f"saved {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline["meta"].get("config") != report["meta"]["config"]:
+            print("warning: baseline was recorded with different settings")
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Per-request authentication overhead, before and after caching.
+
+"before" is what get_current_user used to do on every request: a full
+jwt.decode followed by loading the User row. "after" is the current path:
+decode_access_token (verified-token cache) plus get_user_principal
+(principal cache). Runs against a throwaway SQLite database.
+
+    python benchmarks/auth_overhead.py --iterations 5000
+"""
+import argparse
+import atexit
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+_tmp = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, _tmp, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.sqlite")
+
+from jose import jwt
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal, engine
+from app.core.security import create_access_token, decode_access_token
+from app.models.models import Base, User
+from app.services import user as user_service
+
+settings = get_settings()
+
+
+def before(db, token: str) -> None:
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    user_service.get_user(db, user_id=int(payload["sub"]))
+
+
+def after(db, token: str) -> None:
+    payload = decode_access_token(token)
+    user_service.get_user_principal(db, user_id=int(payload["sub"]))
+
+
+def measure(fn, db, token: str, iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(db, token)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(
+        f"{name:<8} mean {statistics.mean(timings) * 1e6:8.1f}us  "
+        f"p50 {statistics.median(timings) * 1e6:8.1f}us  p99 {p99 * 1e6:8.1f}us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    token = create_access_token(user.id)
+
+    # Warm up both paths (and the caches for "after")
+    measure(before, db, token, 50)
+    measure(after, db, token, 50)
+
+    before_timings = measure(before, db, token, args.iterations)
+    after_timings = measure(after, db, token, args.iterations)
+    report("before", before_timings)
+    report("after", after_timings)
+    print(f"speedup  {statistics.mean(before_timings) / statistics.mean(after_timings):.1f}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
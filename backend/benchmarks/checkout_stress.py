@@ -0,0 +1,354 @@
+"""Concurrency stress test for checkout, check-in and document updates.
+
+Drives the real app in process (like api_load.py) with many clients at
+once, then checks the database for lost updates:
+
+- checkout race: every client tries to check out the same documents at
+  once; exactly one may win per document and nobody may get a 5xx
+- check-in rounds: clients repeatedly check out a random document and
+  check it in with a new file; every successful check-in must produce
+  exactly one version, numbered without gaps or duplicates
+- concurrent uploads: every client uploads a new version of one document
+  at once, with no checkout; same version-number invariants
+- metadata updates: every client renames one document at once; each
+  request either succeeds or gets a 409, and a stale If-Match gets a 412
+
+    python benchmarks/checkout_stress.py --clients 200 --documents 5 --rounds 3
+
+Exits non-zero if any invariant is broken. Pass a Postgres URL (an empty
+database) to exercise row locking at full scale. Without --database-url a
+throwaway SQLite database is used, where every writer queues on one file
+lock for up to SQLITE_BUSY_TIMEOUT seconds. A request that times out gets
+a 503 with Retry-After, which the clients honour a few times before it
+counts as a server error.
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+# Tries per request while the app answers 503 with Retry-After
+ATTEMPTS = 5
+
+
+class Report:
+    def __init__(self):
+        self.statuses: dict[str, Counter] = {}
+        self.failures: list[str] = []
+        self.retries = 0
+
+    def record(self, phase: str, status_code: int) -> None:
+        self.statuses.setdefault(phase, Counter())[status_code] += 1
+
+    def check(self, condition: bool, message: str) -> None:
+        if not condition:
+            self.failures.append(message)
+
+    def server_errors(self, phase: str) -> int:
+        return sum(count for code, count in self.statuses.get(phase, {}).items() if code >= 500)
+
+
+async def _send(client, report: Report, method: str, url: str, **kwargs):
+    # A 503 with Retry-After wrote nothing, so retry it like a real client would
+    for _ in range(ATTEMPTS):
+        response = await client.request(method, url, **kwargs)
+        if response.status_code != 503 or "Retry-After" not in response.headers:
+            break
+        report.retries += 1
+        await asyncio.sleep(float(response.headers["Retry-After"]))
+    return response
+
+
+async def _checkout(client, report: Report, headers, document_id: int, comments: str):
+    return await _send(
+        client, report, "POST", f"/api/v1/documents/{document_id}/checkout",
+        data={"comments": comments}, headers=headers
+    )
+
+
+async def _checkin(client, report: Report, headers, document_id: int, comments: str, content: bytes):
+    return await _send(
+        client, report, "POST", f"/api/v1/documents/{document_id}/checkin",
+        data={"comments": comments},
+        files={"new_version": ("stress.txt", content, "text/plain")},
+        headers=headers,
+    )
+
+
+async def warm_up(client, tokens) -> None:
+    # Load every client's principal into the auth cache one at a time, so
+    # the phases measure document writes rather than a cold login storm
+    for headers in tokens.values():
+        (await client.get("/api/v1/users/me", headers=headers)).raise_for_status()
+
+
+async def checkout_race(client, tokens, document_ids, report: Report) -> dict[int, int]:
+    """Everyone checks out every document at once; returns document -> winning user."""
+    phase = "checkout race"
+    winners: dict[int, list[int]] = {document_id: [] for document_id in document_ids}
+
+    async def attempt(user_id: int, document_id: int) -> None:
+        response = await _checkout(client, report, tokens[user_id], document_id, f"race {user_id}")
+        report.record(phase, response.status_code)
+        if response.status_code == 200:
+            winners[document_id].append(user_id)
+
+    await asyncio.gather(*(
+        attempt(user_id, document_id) for user_id in tokens for document_id in document_ids
+    ))
+    for document_id, users in winners.items():
+        report.check(len(users) == 1, f"{phase}: document {document_id} checked out by {len(users)} users")
+    report.check(not report.server_errors(phase), f"{phase}: {report.server_errors(phase)} server errors")
+
+    # Release them for the next phase
+    for document_id, users in winners.items():
+        for user_id in users:
+            await _checkin(
+                client, report, tokens[user_id], document_id, "race winner", f"race {user_id}\n".encode()
+            )
+    return {document_id: users[0] for document_id, users in winners.items() if users}
+
+
+async def checkin_rounds(client, tokens, document_ids, rounds: int, report: Report, rng) -> Counter:
+    """Clients check out random documents and check them in with a new file."""
+    phase = "check-in rounds"
+    checkins: Counter = Counter()
+
+    async def client_loop(user_id: int) -> None:
+        for round_number in range(rounds):
+            document_id = rng.choice(document_ids)
+            response = await _checkout(client, report, tokens[user_id], document_id, f"round {round_number}")
+            report.record(phase, response.status_code)
+            if response.status_code != 200:
+                continue
+            content = f"user {user_id} round {round_number}\n".encode()
+            response = await _checkin(
+                client, report, tokens[user_id], document_id, f"round {round_number}", content
+            )
+            report.record(phase, response.status_code)
+            report.check(response.status_code == 200, f"{phase}: check-in by the holder got {response.status_code}")
+            if response.status_code == 200:
+                checkins[document_id] += 1
+
+    await asyncio.gather(*(client_loop(user_id) for user_id in tokens))
+    report.check(not report.server_errors(phase), f"{phase}: {report.server_errors(phase)} server errors")
+    return checkins
+
+
+async def concurrent_uploads(client, tokens, document_id: int, report: Report) -> int:
+    """Every client uploads a new version of the same document at once."""
+    phase = "concurrent uploads"
+
+    async def upload(user_id: int) -> int:
+        response = await _send(
+            client, report, "PUT", f"/api/v1/documents/{document_id}",
+            files={"file": ("stress.txt", f"upload by {user_id}\n".encode(), "text/plain")},
+            headers=tokens[user_id],
+        )
+        report.record(phase, response.status_code)
+        return response.status_code
+
+    codes = await asyncio.gather(*(upload(user_id) for user_id in tokens))
+    report.check(
+        all(code in (200, 409) for code in codes),
+        f"{phase}: unexpected statuses {sorted(Counter(codes).items())}"
+    )
+    return codes.count(200)
+
+
+async def metadata_updates(client, tokens, document_id: int, report: Report) -> None:
+    """Every client renames the same document at once, then one retries with a stale If-Match."""
+    phase = "metadata updates"
+    any_headers = next(iter(tokens.values()))
+    before = (await client.get(f"/api/v1/documents/{document_id}", headers=any_headers)).json()
+
+    async def rename(user_id: int) -> int:
+        response = await _send(
+            client, report, "PUT", f"/api/v1/documents/{document_id}",
+            params={"title": f"Renamed by {user_id}"}, headers=tokens[user_id]
+        )
+        report.record(phase, response.status_code)
+        return response.status_code
+
+    codes = await asyncio.gather(*(rename(user_id) for user_id in tokens))
+    report.check(
+        all(code in (200, 409) for code in codes),
+        f"{phase}: unexpected statuses {sorted(Counter(codes).items())}"
+    )
+    report.check(200 in codes, f"{phase}: no rename succeeded")
+
+    response = await client.put(
+        f"/api/v1/documents/{document_id}",
+        params={"title": "Stale write"},
+        headers={**any_headers, "If-Match": f'"{before["row_version"]}"'},
+    )
+    report.record(phase, response.status_code)
+    report.check(response.status_code == 412, f"{phase}: stale If-Match got {response.status_code}")
+
+
+async def run_phases(client, tokens, document_ids, rounds: int, report: Report, rng) -> dict[int, int]:
+    """Run every phase in turn; returns how many versions each document should end with.
+
+    Each document must start with exactly one version.
+    """
+    race_winners = await checkout_race(client, tokens, document_ids, report)
+    checkins = await checkin_rounds(client, tokens, document_ids, rounds, report, rng)
+    uploads = await concurrent_uploads(client, tokens, document_ids[0], report)
+    await metadata_updates(client, tokens, document_ids[-1], report)
+
+    # One seeded version, one from the race winner's check-in, then one per
+    # successful check-in and upload
+    expected = {
+        document_id: 1 + (document_id in race_winners) + checkins[document_id]
+        for document_id in document_ids
+    }
+    expected[document_ids[0]] += uploads
+    return expected
+
+
+def verify_versions(db, document_ids, expected_versions: dict[int, int], report: Report) -> None:
+    from app.models.models import Document, DocumentVersion
+
+    for document_id in document_ids:
+        document = db.get(Document, document_id)
+        numbers = sorted(
+            number for (number,) in db.query(DocumentVersion.version_number).filter(
+                DocumentVersion.document_id == document_id
+            )
+        )
+        expected = expected_versions[document_id]
+        report.check(
+            numbers == list(range(1, expected + 1)),
+            f"document {document_id}: expected versions 1..{expected}, found {len(numbers)} "
+            f"({len(numbers) - len(set(numbers))} duplicated)"
+        )
+        report.check(
+            document.version == expected,
+            f"document {document_id}: current version {document.version}, expected {expected}"
+        )
+
+
+def verify_activities(db, document_ids, report: Report) -> None:
+    from app.models.models import DocumentActivity, DocumentCheckout
+
+    # Every checkout was followed by exactly one check-in, and nothing is left checked out
+    counts = Counter(
+        (document_id, activity_type)
+        for document_id, activity_type in db.query(
+            DocumentActivity.document_id, DocumentActivity.activity_type
+        ).filter(
+            DocumentActivity.document_id.in_(document_ids),
+            DocumentActivity.activity_type.in_(("checkout", "checkin")),
+        )
+    )
+    for document_id in document_ids:
+        checkouts, checkins = counts[(document_id, "checkout")], counts[(document_id, "checkin")]
+        report.check(
+            checkouts == checkins,
+            f"document {document_id}: {checkouts} checkout and {checkins} check-in activities"
+        )
+    left = db.query(DocumentCheckout).filter(DocumentCheckout.document_id.in_(document_ids)).count()
+    report.check(left == 0, f"{left} documents still checked out")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite database")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent clients, one user each")
+    parser.add_argument("--documents", type=int, default=5, help="documents the clients fight over")
+    parser.add_argument("--rounds", type=int, default=3, help="checkout attempts per client")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    # Configure the app before it is imported
+    tmp = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/stress.sqlite"
+    os.environ.setdefault("UPLOAD_DIR", f"{tmp}/uploads")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")  # Lock waits log slow-query warnings
+    os.environ["EXTRACTION_WORKER_ENABLED"] = "false"
+    # Every client may hold a connection at once
+    os.environ.setdefault("DB_POOL_SIZE", str(min(args.clients, 50)))
+    os.environ.setdefault("DB_MAX_OVERFLOW", str(args.clients))
+
+    import httpx
+
+    from app.core.database import SessionLocal, engine
+    from app.core.security import create_access_token
+    from app.main import app
+    from app.models.models import User
+    from app.services import activity_log
+    from seed import create_schema, seed
+
+    create_schema(engine)
+    db = SessionLocal()
+    try:
+        data = seed(
+            db, users=args.clients, documents=args.documents, versions=1, tags=5, activities=0,
+            file_size=256, random_seed=args.seed
+        )
+        # Checkouts need the owner or a superuser; every client may act on every document
+        db.query(User).filter(User.id.in_(data.user_ids)).update(
+            {"is_superuser": True}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    tokens = {
+        user_id: {"Authorization": f"Bearer {create_access_token(user_id)}"} for user_id in data.user_ids
+    }
+    document_ids = sorted(
+        document_id for document_ids in data.documents_by_owner.values() for document_id in document_ids
+    )
+    report = Report()
+    rng = random.Random(args.seed)
+
+    async def run() -> dict[int, int]:
+        # ASGITransport does not run the app's lifespan, which flushes activities
+        activity_log.start()
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=300) as client:
+                await warm_up(client, tokens)
+                return await run_phases(client, tokens, document_ids, args.rounds, report, rng)
+        finally:
+            await activity_log.stop()
+
+    start = time.perf_counter()
+    expected = asyncio.run(run())
+    seconds = time.perf_counter() - start
+
+    db = SessionLocal()
+    try:
+        verify_versions(db, document_ids, expected, report)
+        verify_activities(db, document_ids, report)
+    finally:
+        db.close()
+
+    print(f"{args.clients} clients, {args.documents} documents, {seconds:.1f}s")
+    for phase, statuses in report.statuses.items():
+        summary = ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items()))
+        print(f"  {phase:<20} {summary}")
+    print(f"  versions created: {sum(expected.values()) - len(document_ids)}")
+    print(f"  503 retries: {report.retries}")
+    if report.failures:
+        print("FAILED")
+        for failure in report.failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("OK: no lost updates")
+
+
+if __name__ == "__main__":
+    main()
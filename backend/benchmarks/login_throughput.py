@@ -0,0 +1,50 @@
+"""Password verification throughput at different bcrypt cost factors.
+
+For each cost, a batch of verifications is pushed through a thread pool
+of the given size (the same shape as the PASSWORD_HASH_WORKERS pool) and
+the sustained logins per second and per-login latency are reported. Use
+it to pick BCRYPT_ROUNDS and PASSWORD_HASH_WORKERS for the expected
+shift-start burst.
+
+    python benchmarks/login_throughput.py --rounds 10 11 12 13 --workers 1 2 4
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+
+def run(rounds: int, workers: int, logins: int) -> tuple[float, float, float]:
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hashed = context.hash("correct horse battery staple")
+
+    def verify(_: int) -> float:
+        start = time.perf_counter()
+        context.verify("correct horse battery staple", hashed)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = sorted(pool.map(verify, range(logins)))
+    elapsed = time.perf_counter() - start
+    return logins / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--logins", type=int, default=32, help="verifications per measurement")
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'workers':>7} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for rounds in args.rounds:
+        for workers in args.workers:
+            throughput, p50, p95 = run(rounds, workers, args.logins)
+            print(f"{rounds:>6} {workers:>7} {throughput:>9.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,12 @@ setup(
         "python-multipart>=0.0.6",
         "pydantic[email]>=2.5.1",
         "psycopg2-binary>=2.9.9",
+        "asyncpg>=0.29.0",
+        "aiosqlite>=0.19.0",
         "python-dotenv>=1.0.0",
     ],
+    extras_require={
+        "extraction": ["PyPDF2>=3.0.1", "python-docx>=1.0.0"],
+        "previews": ["Pillow>=10.1.0", "pypdfium2>=4.20.0"],
+    },
 )
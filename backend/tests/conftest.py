@@ -0,0 +1,117 @@
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+# Configure the app before it is imported
+_root = tempfile.mkdtemp(prefix="dcs-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_root}/test.sqlite"
+os.environ["UPLOAD_DIR"] = f"{_root}/uploads"
+os.environ["LOG_LEVEL"] = "WARNING"
+os.environ["SQL_SLOW_QUERY_MS"] = "0"
+os.environ["EXTRACTION_WORKER_ENABLED"] = "false"
+os.environ["CHECKOUT_SWEEPER_ENABLED"] = "false"
+os.environ["BLOB_GC_ENABLED"] = "false"
+os.environ["RENDITION_PREGENERATE"] = "false"
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.database import SessionLocal, engine
+from app.core.security import create_access_token
+from app.main import app
+from app.models.models import Base, Document, DocumentVersion, Tag, User
+from app.services import search
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_root, ignore_errors=True)
+
+
+@event.listens_for(engine, "connect")
+def _enforce_foreign_keys(connection, record):
+    # As Postgres does; SQLite leaves them off by default
+    connection.execute("PRAGMA foreign_keys=ON")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(bind=engine)
+    search.ensure_search_schema(engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    # Without the context manager the lifespan (background workers) does not run
+    return TestClient(app)
+
+
+@pytest.fixture
+def user(db) -> User:
+    user = User(
+        username=f"user-{os.urandom(4).hex()}",
+        email=f"{os.urandom(4).hex()}@example.com",
+        hashed_password="unused",
+        is_active=True,
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def auth_headers(user: User) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+def create_documents(db, owner: User, count: int, versions: int = 2, tags: int = 2) -> list[Document]:
+    """Documents with a few versions and tags each; their files are not stored."""
+    tag_rows = [Tag(name=f"tag-{os.urandom(4).hex()}") for _ in range(tags)]
+    documents = []
+    for number in range(count):
+        path = f"/nonexistent/{os.urandom(8).hex()}"
+        document = Document(
+            title=f"Document {number}",
+            file_path=path,
+            mime_type="text/plain",
+            owner_id=owner.id,
+            version=versions,
+            tags=tag_rows,
+        )
+        document.versions = [
+            DocumentVersion(version_number=version, file_path=path, filename="file.txt", file_size=1)
+            for version in range(1, versions + 1)
+        ]
+        documents.append(document)
+    db.add_all(documents)
+    db.commit()
+    return documents
+
+
+@contextmanager
+def count_statements():
+    """Count the statements run on the engine inside the block."""
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
@@ -0,0 +1,85 @@
+"""Activity log flushes: refused events must not block the rest, and journals sync per flush."""
+import json
+import os
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.models.models import DocumentActivity
+from app.services import activity_log
+
+from conftest import create_documents
+
+
+@pytest.fixture
+def log(tmp_path):
+    return activity_log.ActivityLog(directory=str(tmp_path))
+
+
+def _activities(db, document_id: int) -> list[str]:
+    db.expire_all()
+    return [
+        details for (details,) in db.query(DocumentActivity.details).filter(
+            DocumentActivity.document_id == document_id
+        ).order_by(DocumentActivity.id)
+    ]
+
+
+def _segments(log) -> list[str]:
+    return [name for name in os.listdir(log.directory) if name.endswith(activity_log.JOURNAL_SUFFIX)]
+
+
+def test_refused_event_is_dead_lettered(log, db, user):
+    document, deleted = create_documents(db, user, 2, versions=0, tags=0)
+    for number in range(7):
+        log.record(document.id, user.id, "view", f"event {number}")
+    # Fails its foreign key on every attempt once the document is gone
+    log.record(deleted.id, user.id, "view", "poison")
+    log.record(document.id, user.id, "view", "after the poison")
+    db.delete(deleted)
+    db.commit()
+
+    assert log.flush() == 8
+    assert _activities(db, document.id) == [f"event {number}" for number in range(7)] + ["after the poison"]
+    assert _segments(log) == []
+
+    with open(os.path.join(log.directory, activity_log.DEAD_LETTER_PATH)) as dead_letter:
+        entries = [json.loads(line) for line in dead_letter]
+    assert [entry["details"] for entry in entries] == ["poison"]
+    assert "FOREIGN KEY" in entries[0]["error"]
+
+    # Later events are not held up
+    log.record(document.id, user.id, "view", "next flush")
+    assert log.flush() == 1
+
+
+def test_transient_error_keeps_events_for_retry(log, db, user, monkeypatch):
+    document = create_documents(db, user, 1)[0]
+    log.record(document.id, user.id, "view", "retried")
+    insert = activity_log._insert
+
+    def unavailable(events):
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(activity_log, "_insert", unavailable)
+    assert log.flush() == 0
+    assert len(_segments(log)) == 1
+
+    monkeypatch.setattr(activity_log, "_insert", insert)
+    assert log.flush() == 1
+    assert _activities(db, document.id) == ["retried"]
+    assert not os.path.exists(os.path.join(log.directory, activity_log.DEAD_LETTER_PATH))
+
+
+def test_journal_is_synced_at_flush_not_per_event(log, db, user, monkeypatch):
+    document = create_documents(db, user, 1)[0]
+    synced = []
+    monkeypatch.setattr(activity_log.settings, "ACTIVITY_JOURNAL_FSYNC", True)
+    monkeypatch.setattr(activity_log.os, "fsync", synced.append)
+
+    for number in range(5):
+        log.record(document.id, user.id, "download", f"event {number}")
+    assert synced == []
+
+    assert log.flush() == 5
+    assert len(synced) == 1
@@ -0,0 +1,87 @@
+"""Releasing blobs must never delete one that an upload is about to reference."""
+import os
+import time
+
+import pytest
+
+from app.services import storage
+
+from conftest import create_documents
+
+PDF = "application/pdf"  # Stored uncompressed
+
+
+def _aged(path: str) -> str:
+    past = time.time() - 2 * storage.settings.BLOB_GC_GRACE_SECONDS
+    os.utime(path, (past, past))
+    return path
+
+
+def test_release_deletes_old_unreferenced_blob(db):
+    path = _aged(storage.store_bytes(b"unreferenced", PDF).path)
+    assert storage.release_blob(db, path)
+    assert not os.path.exists(path)
+
+
+def test_release_keeps_fresh_blob_until_collected(db):
+    path = storage.store_bytes(b"fresh", PDF).path
+    assert not storage.release_blob(db, path)
+    assert os.path.exists(path)
+
+    _aged(path)
+    assert storage.collect_garbage(db) >= 1
+    assert not os.path.exists(path)
+
+
+def test_release_keeps_referenced_blob(db, user):
+    document = create_documents(db, user, 1)[0]
+    path = _aged(storage.store_bytes(b"referenced", PDF).path)
+    document.versions[0].file_path = path
+    db.commit()
+    assert not storage.release_blob(db, path)
+    storage.collect_garbage(db)
+    assert os.path.exists(path)
+
+
+def test_dedup_hit_during_release_keeps_blob(db, monkeypatch):
+    path = _aged(storage.store_bytes(b"deduplicated", PDF).path)
+    rename = os.rename
+
+    def upload_then_rename(source, target):
+        # An upload of the same content finds the blob just before it is moved
+        assert storage.store_bytes(b"deduplicated", PDF).deduplicated
+        rename(source, target)
+
+    monkeypatch.setattr(storage.os, "rename", upload_then_rename)
+    assert not storage.release_blob(db, path)
+    assert os.path.exists(path)
+    assert not os.path.exists(path + storage.GC_SUFFIX)
+
+
+def test_upload_during_release_stores_its_own_copy(db, monkeypatch):
+    path = _aged(storage.store_bytes(b"reuploaded", PDF).path)
+    settle = storage._settle_aside
+
+    def upload_then_settle(aside, referenced):
+        # The blob is already moved aside, so the upload writes a new copy
+        assert not storage.store_bytes(b"reuploaded", PDF).deduplicated
+        return settle(aside, referenced)
+
+    monkeypatch.setattr(storage, "_settle_aside", upload_then_settle)
+    storage.release_blob(db, path)
+    assert os.path.exists(path)
+    assert not os.path.exists(path + storage.GC_SUFFIX)
+
+
+@pytest.mark.parametrize("referenced", [True, False])
+def test_collect_settles_blob_left_aside(db, user, referenced):
+    path = _aged(storage.store_bytes(f"aside {referenced}".encode(), PDF).path)
+    if referenced:
+        document = create_documents(db, user, 1)[0]
+        document.versions[0].file_path = path
+        db.commit()
+    os.rename(path, path + storage.GC_SUFFIX)  # A collector stopped half way
+
+    storage.collect_garbage(db)
+    assert os.path.exists(path) == referenced
+    assert not os.path.exists(path + storage.GC_SUFFIX)
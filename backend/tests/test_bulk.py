@@ -0,0 +1,54 @@
+"""Bulk archive ingest: manifest coverage and size limits."""
+import io
+import json
+import zipfile
+
+from app.services import bulk
+
+from conftest import auth_headers
+
+
+def _zip(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _upload(client, user, archive: bytes):
+    return client.post(
+        "/api/v1/documents/bulk",
+        files={"archive": ("batch.zip", archive, "application/zip")},
+        headers=auth_headers(user),
+    )
+
+
+def test_files_missing_from_manifest_are_reported(client, user):
+    archive = _zip({
+        "manifest.json": json.dumps([{"filename": "a/b.txt", "title": "Listed"}]).encode(),
+        "a/b.txt": b"listed",
+        "d/e.txt": b"not listed",
+    })
+    response = _upload(client, user, archive)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["created"], result["failed"], result["skipped"]) == (1, 0, 1)
+    statuses = {item["filename"]: item["status"] for item in result["items"]}
+    assert statuses == {"a/b.txt": "created", "d/e.txt": "skipped"}
+
+
+def test_oversized_member_fails_its_item(client, user, monkeypatch):
+    monkeypatch.setattr(bulk.settings, "BULK_ARCHIVE_MAX_FILE_SIZE", 1024)
+    archive = _zip({"small.txt": b"small", "bomb.txt": b"\0" * 1_000_000})
+    result = _upload(client, user, archive).json()
+    statuses = {item["filename"]: item["status"] for item in result["items"]}
+    assert statuses == {"small.txt": "created", "bomb.txt": "failed"}
+
+
+def test_oversized_archive_is_refused(client, user, monkeypatch):
+    monkeypatch.setattr(bulk.settings, "BULK_ARCHIVE_MAX_TOTAL_SIZE", 1_500_000)
+    archive = _zip({f"bomb{number}.txt": b"\0" * 1_000_000 for number in range(2)})
+    response = _upload(client, user, archive)
+    assert response.status_code == 400
+    assert "larger than" in response.json()["detail"]
@@ -0,0 +1,39 @@
+"""Checkout leases: renewing through the heartbeat."""
+import os
+
+from app.models.models import User
+
+from conftest import auth_headers, create_documents
+
+
+def _other_user(db) -> User:
+    other = User(
+        username=f"other-{os.urandom(4).hex()}",
+        email=f"{os.urandom(4).hex()}@example.com",
+        hashed_password="unused",
+        is_active=True,
+    )
+    db.add(other)
+    db.commit()
+    return other
+
+
+def test_heartbeat_renews_the_holders_lease(client, db, user):
+    document = create_documents(db, user, 1)[0]
+    headers = auth_headers(user)
+    response = client.post(f"/api/v1/documents/{document.id}/checkout", data={"comments": "editing"}, headers=headers)
+    assert response.status_code == 200
+
+    response = client.post(f"/api/v1/documents/{document.id}/checkout/heartbeat", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user.id
+
+
+def test_heartbeat_needs_permission_on_the_document(client, db, user):
+    document = create_documents(db, user, 1)[0]
+    client.post(f"/api/v1/documents/{document.id}/checkout", data={"comments": "editing"}, headers=auth_headers(user))
+
+    response = client.post(
+        f"/api/v1/documents/{document.id}/checkout/heartbeat", headers=auth_headers(_other_user(db))
+    )
+    assert response.status_code == 403
@@ -0,0 +1,70 @@
+"""Concurrent checkouts, check-ins and updates: a reduced run of benchmarks/checkout_stress.py."""
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+
+import httpx
+
+from app.main import app
+from app.models.models import User
+from app.services import activity_log
+
+from conftest import auth_headers, create_documents
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+import checkout_stress  # noqa: E402
+
+CLIENTS = 8
+DOCUMENTS = 2
+ROUNDS = 3
+
+
+def _superusers(db, count: int) -> list[User]:
+    # Checkouts need the owner or a superuser; every client acts on every document
+    users = [
+        User(
+            username=f"stress-{os.urandom(4).hex()}",
+            email=f"{os.urandom(4).hex()}@example.com",
+            hashed_password="unused",
+            is_active=True,
+            is_superuser=True,
+        )
+        for _ in range(count)
+    ]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def test_concurrent_writers_lose_no_versions(db):
+    users = _superusers(db, CLIENTS)
+    tokens = {user.id: auth_headers(user) for user in users}
+    document_ids = [document.id for document in create_documents(db, users[0], DOCUMENTS, versions=1, tags=0)]
+    report = checkout_stress.Report()
+
+    async def run() -> dict[int, int]:
+        activity_log.start()
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+                return await checkout_stress.run_phases(
+                    client, tokens, document_ids, ROUNDS, report, random.Random(0)
+                )
+        finally:
+            await activity_log.stop()
+
+    expected = asyncio.run(run())
+    db.expire_all()
+    checkout_stress.verify_versions(db, document_ids, expected, report)
+    checkout_stress.verify_activities(db, document_ids, report)
+
+    server_errors = {
+        phase: code for phase, statuses in report.statuses.items() for code in statuses if code >= 500
+    }
+    assert server_errors == {}
+    assert report.failures == []
+    # Every phase ran and something was written
+    assert set(report.statuses) == {"checkout race", "check-in rounds", "concurrent uploads", "metadata updates"}
+    assert sum(expected.values()) > DOCUMENTS
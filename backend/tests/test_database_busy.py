@@ -0,0 +1,50 @@
+"""Lock timeouts surface as a retryable 503, not a 500."""
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core import database
+from app.services import document as document_service
+
+from conftest import auth_headers, create_documents
+
+
+def test_lock_timeout_raises_database_busy(monkeypatch):
+    monkeypatch.setattr(database.settings, "SQLITE_BUSY_TIMEOUT", 0.1)
+    url = database.settings.sync_database_url
+    engine = create_engine(url, **database.engine_options(url))
+    database.translate_lock_errors(engine)
+
+    holder = sqlite3.connect(url.removeprefix("sqlite:///"))
+    holder.execute("BEGIN EXCLUSIVE")
+    try:
+        with pytest.raises(database.DatabaseBusy):
+            with engine.begin() as connection:
+                connection.execute(text("UPDATE users SET is_active = is_active"))
+    finally:
+        holder.rollback()
+        holder.close()
+        engine.dispose()
+
+
+def test_file_sqlite_uses_the_configured_pool():
+    options = database.engine_options("sqlite:////tmp/app.sqlite")
+    assert options["pool_size"] == database.settings.DB_POOL_SIZE
+    assert "pool_size" not in database.engine_options("sqlite://")
+    assert "pool_size" not in database.engine_options("sqlite+aiosqlite:////tmp/app.sqlite")
+
+
+@pytest.mark.parametrize("error", [database.DatabaseBusy(), database.PoolTimeout("pool exhausted")])
+def test_database_busy_is_answered_with_retry_after(client, db, user, monkeypatch, error):
+    document = create_documents(db, user, 1)[0]
+
+    async def busy(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(document_service, "checkout_document_async", busy)
+    response = client.post(
+        f"/api/v1/documents/{document.id}/checkout", data={"comments": "busy"}, headers=auth_headers(user)
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
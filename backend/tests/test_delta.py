@@ -0,0 +1,92 @@
+"""Delta-encoded versions: exact round trips and when a delta is kept."""
+import pytest
+
+from app.models.models import DocumentVersion
+from app.services import delta, storage
+
+DOCUMENT = b"".join(b"Clause %d: the parties agree to term number %d.\n" % (n, n) for n in range(200))
+
+
+@pytest.mark.parametrize("base, target", [
+    (b"one\ntwo\nthree\n", b"one\n2\nthree\nfour\n"),
+    (b"one\ntwo\nthree", b"one\ntwo\nthree and more"),  # No trailing newline
+    (b"one\ntwo\n", b"one\ntwo"),  # Trailing newline removed
+    (b"one\ntwo", b"one\ntwo\n"),  # Trailing newline added
+    (b"one\r\ntwo\r\nthree\r\n", b"one\r\n2\r\nthree\r\n"),  # CRLF
+    (b"one\r\ntwo\r\n", b"one\ntwo\n"),  # CRLF converted to LF
+    (b"old\rmac\r", b"old\rmac\rnew\r"),  # Bare CR
+    (b"", b"new file\n"),
+    (b"old file\n", b""),
+    (b"", b""),
+    (b"\x00\xffbinary\n\x80", b"\x00\xffbinary\n\x81"),
+])
+def test_round_trip(base, target):
+    assert delta.apply_delta(base, delta.encode_delta(base, target)) == target
+
+
+def test_apply_rejects_other_content():
+    with pytest.raises(ValueError):
+        delta.apply_delta(b"base", b"not a delta")
+
+
+@pytest.fixture
+def delta_storage(monkeypatch):
+    monkeypatch.setattr(delta.settings, "DELTA_STORAGE_ENABLED", True)
+    monkeypatch.setattr(delta.settings, "DELTA_KEYFRAME_INTERVAL", 3)
+
+
+def _store_version(content: bytes, chain: list[DocumentVersion], version_id: int) -> DocumentVersion:
+    """Store content as the next version after chain[0], the way uploads do."""
+    kept = delta.encode_version(storage.store_bytes(content, "text/plain"), chain or None, "text/plain")
+    return DocumentVersion(
+        id=version_id,
+        version_number=version_id,
+        file_path=kept.file_path,
+        delta_base_id=kept.delta_base_id,
+        delta_depth=kept.delta_depth,
+    )
+
+
+def test_versions_rebuild_across_keyframes(delta_storage):
+    versions: list[DocumentVersion] = []
+    contents = []
+    chains: dict[int, list[DocumentVersion]] = {}
+    for number in range(1, 8):
+        content = DOCUMENT + b"".join(b"Amendment %d\n" % n for n in range(number))
+        previous = versions[-1] if versions else None
+        chain = chains[previous.id] if previous else []
+        version = _store_version(content, chain, number)
+        chains[number] = [version] + (chain if version.delta_base_id else [])
+        versions.append(version)
+        contents.append(content)
+
+    # A keyframe every DELTA_KEYFRAME_INTERVAL versions, deltas in between
+    assert [version.delta_depth for version in versions] == [0, 1, 2, 0, 1, 2, 0]
+    for version, content in zip(versions, contents):
+        assert delta.read_chain_content(chains[version.id]) == content
+
+
+def test_small_edit_is_kept_as_delta(delta_storage):
+    base = _store_version(DOCUMENT, [], 1)
+    edited = DOCUMENT.replace(b"term number 100.", b"term number one hundred.")
+    version = _store_version(edited, [base], 2)
+
+    assert version.delta_base_id == 1
+    assert storage.read_blob(version.file_path).startswith(delta.DELTA_MAGIC)
+    assert len(storage.read_blob(version.file_path)) <= len(edited) * delta.MAX_DELTA_RATIO
+    assert delta.read_chain_content([version, base]) == edited
+
+
+def test_delta_over_half_the_size_is_stored_in_full(delta_storage):
+    base = _store_version(DOCUMENT, [], 1)
+    # Keeps a third of the lines, so the delta is about two thirds of the file
+    rewritten = b"".join(
+        line if n % 3 == 0 else b"Rewritten clause %d.\n" % n
+        for n, line in enumerate(DOCUMENT.splitlines(keepends=True))
+    )
+    assert len(delta.encode_delta(DOCUMENT, rewritten)) > len(rewritten) * delta.MAX_DELTA_RATIO
+
+    version = _store_version(rewritten, [base], 2)
+    assert version.delta_base_id is None
+    assert version.delta_depth == 0
+    assert storage.read_blob(version.file_path) == rewritten
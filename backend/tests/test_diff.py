@@ -0,0 +1,48 @@
+"""Version diffs: paging through cached results and the cache's size limit."""
+import os
+
+import pytest
+
+from app.core.cache import DiskLRUCache
+from app.services import diff
+
+
+@pytest.fixture
+def diff_cache(tmp_path, monkeypatch):
+    cache = DiskLRUCache("diff", str(tmp_path / "diffs"), max_bytes=16 * 1024)
+    monkeypatch.setattr(diff, "_cache", cache)
+    return cache
+
+
+def _loader(text: str, calls: list):
+    def load() -> str:
+        calls.append(text)
+        return text
+    return load
+
+
+def test_cached_diff_pages_skip_the_loaders(diff_cache):
+    old = "".join(f"line {n}\n" for n in range(40))
+    new = "".join(f"line {n}{' changed' if n % 10 == 0 else ''}\n" for n in range(40))
+    calls = []
+
+    summary, first = diff.get_diff("a" * 64, "b" * 64, _loader(old, calls), _loader(new, calls), context=0, limit=2)
+    summary_again, rest = diff.get_diff(
+        "a" * 64, "b" * 64, _loader(old, calls), _loader(new, calls), context=0, offset=2, limit=10
+    )
+
+    assert len(calls) == 2  # Only the miss loaded the texts
+    assert summary_again == summary
+    assert len(first) + len(rest) == 4
+    assert os.path.exists(diff._cache_path("a" * 64, "b" * 64, "line", 0, None))
+
+
+def test_diff_cache_stays_under_its_limit(diff_cache):
+    old = "".join(f"old line {n}\n" for n in range(50))
+    new = "".join(f"new line {n}\n" for n in range(50))
+    for n in range(20):
+        diff.get_diff(f"{n:064x}", "f" * 64, lambda: old, lambda: new)
+
+    entries = diff_cache._scan()
+    assert 0 < len(entries) < 20
+    assert sum(size for _, size, _ in entries) <= diff_cache.max_bytes
@@ -0,0 +1,107 @@
+"""Byte ranges: Range parsing and ranged downloads, including compressed blobs."""
+import pytest
+
+from app.core.http import MAX_RANGES, RangeNotSatisfiable, parse_range
+from app.models.models import Document, DocumentVersion
+from app.services import storage
+
+from conftest import auth_headers
+
+CONTENT = b"".join(b"line %04d of the ranged download test\n" % n for n in range(400))
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", [(0, 9)]),
+    ("bytes=-10", [(90, 99)]),  # Suffix: the last ten bytes
+    ("bytes=-500", [(0, 99)]),  # Longer than the content
+    ("bytes=90-", [(90, 99)]),  # Open-ended
+    ("bytes=95-200", [(95, 99)]),  # Clamped to the content
+    ("bytes=50-59,0-9", [(0, 9), (50, 59)]),
+    ("bytes=0-9,5-14", [(0, 14)]),  # Overlapping
+    ("bytes=0-9,10-19", [(0, 19)]),  # Adjacent
+    ("bytes=0-,0-,0-", [(0, 99)]),  # Repeated ranges are sent once
+    ("bytes=200-300,0-0", [(0, 0)]),  # Unsatisfiable parts are dropped
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None, "", "items=0-9", "bytes=", "bytes=9-0", "bytes=a-b", "bytes=5",
+    "bytes=" + ",".join(f"{n}-{n}" for n in range(0, 2 * (MAX_RANGES + 1), 2)),
+])
+def test_unusable_range_serves_everything(header):
+    assert parse_range(header, 100) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=150-200", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 100)
+
+
+@pytest.fixture
+def compressed_document(db, user) -> Document:
+    blob = storage.store_bytes(CONTENT, "text/plain")
+    assert storage.blob_encoding(blob.path) is not None  # Served by decompressing on the fly
+    document = Document(
+        title="Ranged", file_path=blob.path, mime_type="text/plain", owner_id=user.id, version=1
+    )
+    document.versions = [
+        DocumentVersion(
+            version_number=1, file_path=blob.path, filename="ranged.txt",
+            content_hash=blob.digest, file_size=len(CONTENT)
+        )
+    ]
+    db.add(document)
+    db.commit()
+    return document
+
+
+def _download(client, user, document, **headers):
+    return client.get(
+        f"/api/v1/documents/{document.id}/download",
+        headers={**auth_headers(user), "Accept-Encoding": "identity", **headers},
+    )
+
+
+def test_single_range_of_a_compressed_blob(client, user, compressed_document):
+    response = _download(client, user, compressed_document, Range="bytes=1000-1099")
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 1000-1099/{len(CONTENT)}"
+    assert response.content == CONTENT[1000:1100]
+
+
+def test_suffix_range_of_a_compressed_blob(client, user, compressed_document):
+    response = _download(client, user, compressed_document, Range="bytes=-38")
+    assert response.status_code == 206
+    assert response.content == CONTENT[-38:]
+
+
+def test_multiple_ranges(client, user, compressed_document):
+    response = _download(client, user, compressed_document, Range="bytes=0-9,5000-5009,5005-5019")
+    assert response.status_code == 206
+    assert response.headers["Content-Type"].startswith("multipart/byteranges; boundary=")
+    assert int(response.headers["Content-Length"]) == len(response.content)
+    assert f"Content-Range: bytes 0-9/{len(CONTENT)}".encode() in response.content
+    assert f"Content-Range: bytes 5000-5019/{len(CONTENT)}".encode() in response.content
+    assert CONTENT[5000:5020] in response.content
+
+
+def test_unsatisfiable_range_is_416(client, user, compressed_document):
+    response = _download(client, user, compressed_document, Range=f"bytes={len(CONTENT)}-")
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range(client, user, compressed_document):
+    etag = _download(client, user, compressed_document).headers["ETag"]
+
+    current = _download(client, user, compressed_document, Range="bytes=0-9", **{"If-Range": etag})
+    assert current.status_code == 206
+    assert current.content == CONTENT[:10]
+
+    # The client's copy changed since; it gets the whole file again
+    stale = _download(client, user, compressed_document, Range="bytes=0-9", **{"If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == CONTENT
@@ -0,0 +1,29 @@
+"""Statement timing: a failed statement must leave nothing behind on its connection."""
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core import instrumentation
+
+
+def test_failed_statement_leaves_no_timing_state(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/timing.sqlite")
+    instrumentation.instrument_engine(engine)
+    stats = instrumentation.RequestStats()
+    token = instrumentation._request_stats.set(stats)
+    try:
+        with engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+            time.sleep(0.2)
+            connection.execute(text("SELECT 1"))
+            leftover = connection.info.get("query_start_time")
+    finally:
+        instrumentation._request_stats.reset(token)
+        engine.dispose()
+
+    assert not leftover
+    assert stats.db_queries == 1
+    assert stats.db_time < 0.1
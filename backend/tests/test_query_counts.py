@@ -0,0 +1,41 @@
+"""Listings must load relationships in a fixed number of statements (no N+1)."""
+from app.models.models import DocumentActivity
+
+from conftest import auth_headers, count_statements, create_documents
+
+
+def _statements_for(client, url: str, headers: dict) -> int:
+    with count_statements() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_document_listing_statement_count_is_constant(client, db, user):
+    create_documents(db, user, 40)
+    headers = auth_headers(user)
+    client.get("/api/v1/documents", params={"limit": 1}, headers=headers)  # Warm the user cache
+
+    counts = {
+        limit: _statements_for(client, f"/api/v1/documents?limit={limit}", headers)
+        for limit in (1, 10, 40)
+    }
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_activity_listing_statement_count_is_constant(client, db, user):
+    document = create_documents(db, user, 1)[0]
+    db.add_all(
+        DocumentActivity(document_id=document.id, user_id=user.id, activity_type="view")
+        for _ in range(40)
+    )
+    db.commit()
+    headers = auth_headers(user)
+    url = f"/api/v1/documents/{document.id}/activities"
+    client.get(url, params={"limit": 1}, headers=headers)
+
+    counts = {
+        limit: _statements_for(client, f"{url}?limit={limit}", headers)
+        for limit in (1, 10, 40)
+    }
+    assert len(set(counts.values())) == 1, counts
@@ -0,0 +1,78 @@
+"""Page renditions: rendering from blob paths and shared in-flight renders."""
+import asyncio
+import io
+import threading
+from concurrent.futures import Future
+
+import pytest
+from PIL import Image
+
+from app.services import renditions, storage
+
+
+def _png(frames: int = 1) -> bytes:
+    out = io.BytesIO()
+    images = [Image.new("RGB", (64, 32), color) for color in ("red", "blue", "green")[:frames]]
+    images[0].save(out, "PNG", save_all=frames > 1, append_images=images[1:])
+    return out.getvalue()
+
+
+def _pdf(pages: int) -> bytes:
+    pdfium = pytest.importorskip("pypdfium2")
+    pdf = pdfium.PdfDocument.new()
+    for _ in range(pages):
+        pdf.new_page(200, 300)
+    out = io.BytesIO()
+    pdf.save(out)
+    pdf.close()
+    return out.getvalue()
+
+
+def _run(coroutine, timeout: float = 10):
+    # Run in a thread, so a deadlock fails the test instead of hanging it
+    result: dict = {}
+
+    def target():
+        try:
+            result["value"] = asyncio.run(coroutine)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "get_rendition deadlocked"
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+@pytest.mark.parametrize("mime_type, content", [("image/png", _png()), ("application/pdf", None)])
+def test_uncompressed_blob_is_rendered_from_its_path(mime_type, content, monkeypatch):
+    content = content or _pdf(2)
+    path = storage.store_bytes(content, mime_type).path
+
+    monkeypatch.setattr(renditions.delta, "read_chain_paths", lambda paths: pytest.fail("file loaded whole"))
+    assert renditions._source([path]) == path
+    data = renditions.render(renditions._source([path]), mime_type, renditions.THUMBNAIL, 1)
+    assert Image.open(io.BytesIO(data)).format == "JPEG"
+
+
+def test_finished_render_does_not_deadlock(monkeypatch):
+    path = storage.store_bytes(_png(), "image/png").path
+
+    def submit_inline(fn, *args):
+        # The render finishes before get_rendition attaches its callback
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    monkeypatch.setattr(renditions._executor, "submit", submit_inline)
+    with pytest.raises(renditions.PageOutOfRange):
+        _run(renditions.get_rendition("f" * 64, "image/png", renditions.PREVIEW, 5, [path]))
+    data = _run(renditions.get_rendition("e" * 64, "image/png", renditions.PREVIEW, 1, [path]))
+    assert data.startswith(b"\xff\xd8")
+    assert not renditions._in_flight
@@ -0,0 +1,41 @@
+"""Signing key rotation must be able to retire SECRET_KEY."""
+import pytest
+from jose import JWTError, jwt
+
+from app.core import security
+
+
+def _legacy_token(subject: str) -> str:
+    # Signed with SECRET_KEY and no key id, as before JWT_KEYS existed
+    return security.create_access_token(subject)
+
+
+@pytest.fixture
+def rotated(monkeypatch):
+    monkeypatch.setattr(security.settings, "JWT_KEYS", {"2026-10": "new-key"})
+    monkeypatch.setattr(security.settings, "JWT_ACTIVE_KID", "2026-10")
+
+
+def test_new_tokens_carry_the_active_key_id(rotated):
+    token = security.create_access_token("1")
+    assert jwt.get_unverified_header(token)["kid"] == "2026-10"
+    assert security.decode_access_token(token)["sub"] == "1"
+
+
+def test_legacy_tokens_accepted_while_enabled(monkeypatch):
+    token = _legacy_token("2")
+    monkeypatch.setattr(security.settings, "JWT_KEYS", {"2026-10": "new-key"})
+    assert security.decode_access_token(token)["sub"] == "2"
+
+
+def test_legacy_tokens_rejected_once_retired(monkeypatch, rotated):
+    monkeypatch.setattr(security.settings, "JWT_ACCEPT_LEGACY_TOKENS", False)
+    forged = jwt.encode({"sub": "3", "exp": 4102444800}, security.settings.SECRET_KEY, algorithm="HS256")
+    with pytest.raises(JWTError):
+        security.decode_access_token(forged)
+
+
+def test_unknown_key_id_rejected(rotated):
+    token = jwt.encode({"sub": "4", "exp": 4102444800}, "new-key", algorithm="HS256", headers={"kid": "old"})
+    with pytest.raises(JWTError):
+        security.decode_access_token(token)
@@ -65,6 +65,23 @@ export default function DocumentCheckout({ document, onClose, onCheckoutUpdate }
     }
   };
 
+  const handleRenew = async () => {
+    setError('');
+    setLoading(true);
+
+    try {
+      await documentService.renewCheckout(document.id);
+      if (onCheckoutUpdate) {
+        onCheckoutUpdate();
+      }
+    } catch (err: any) {
+      console.error('Error renewing checkout:', err);
+      setError(err.response?.data?.detail || 'Failed to renew checkout');
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const handleFileChange = (event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0] || null;
     setNewVersion(file);
@@ -99,6 +116,21 @@ export default function DocumentCheckout({ document, onClose, onCheckoutUpdate }
           />
         </div>
         
+        {document.current_checkout?.expires_at && (
+          <div className="mb-4 flex items-center justify-between text-sm text-gray-700">
+            <span>
+              Checkout expires {new Date(document.current_checkout.expires_at).toLocaleString()}
+            </span>
+            <button
+              onClick={handleRenew}
+              className="px-3 py-1 border rounded-md hover:bg-gray-50"
+              disabled={loading}
+            >
+              Renew
+            </button>
+          </div>
+        )}
+
         {document.current_checkout && (
           <div className="mb-4">
             <label className="block text-sm font-medium text-gray-700 mb-2">
@@ -69,8 +69,12 @@ export default function DocumentHistory({ document, onVersionView }: DocumentHis
         return '📤';
       case 'checkin':
         return '📥';
+      case 'checkout_expired':
+        return '⏰';
       case 'view':
         return '👁';
+      case 'download':
+        return '⬇️';
       default:
         return '📝';
     }
@@ -148,7 +152,9 @@ export default function DocumentHistory({ document, onVersionView }: DocumentHis
                         {' '}
                         {activity.activity_type === 'checkout' ? 'checked out' :
                          activity.activity_type === 'checkin' ? 'checked in' :
-                         activity.activity_type === 'view' ? 'viewed' : 'modified'} the document
+                         activity.activity_type === 'checkout_expired' ? 'lost the checkout of' :
+                         activity.activity_type === 'view' ? 'viewed' :
+                         activity.activity_type === 'download' ? 'downloaded' : 'modified'} the document
                       </p>
                       <span className="text-sm text-solarized-base01">
                         {formatDate(activity.activity_time)}
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback, useMemo } from 'react';
+import { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import api from '../services/api';
 import { Document, DocumentVersion } from '../types/api';
 import TaskManager from './TaskManager';
@@ -22,34 +22,80 @@ export default function DocumentViewer({ initialDocument, onClose, onUpdate }: D
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(true);
   const [iframeElement, setIframeElement] = useState<HTMLIFrameElement | null>(null);
+  const [page, setPage] = useState(1);
+  const [pageCount, setPageCount] = useState<number | null>(null);
+  const [isRendition, setIsRendition] = useState(false);
+  // Tracked outside state so replacing the URL does not re-trigger loading
+  const fileUrlRef = useRef<string | null>(null);
+
+  const isPdf = Boolean(document.mime_type?.includes('pdf'));
+  const isRenderable = isPdf || Boolean(document.mime_type?.startsWith('image/'));
 
   const loadDocumentContent = useCallback(async () => {
     if (!document?.id) return;
 
+    const versionNumber = selectedVersion?.version_number ?? document.version;
+    const showFile = (blob: Blob) => {
+      const newUrl = URL.createObjectURL(blob);
+      if (fileUrlRef.current) {
+        URL.revokeObjectURL(fileUrlRef.current);
+      }
+      fileUrlRef.current = newUrl;
+      setFileUrl(newUrl);
+      setContent(null);
+    };
+
     try {
       setLoading(true);
       setError('');
 
-      let url = `/documents/${document.id}`;
-      if (selectedVersion?.version_number) {
-        url += `/versions/${selectedVersion.version_number}`;
+      if (isRenderable) {
+        try {
+          // Server-rendered page images are small and cached, unlike the original file
+          const response = await api.get(
+            `/documents/${document.id}/versions/${versionNumber}/preview/${page}`,
+            { responseType: 'blob' }
+          );
+          const pages = Number(response.headers['x-page-count']);
+          setPageCount(pages > 0 ? pages : null);
+          setIsRendition(true);
+          showFile(response.data);
+          return;
+        } catch (err: any) {
+          // Unsupported or unreadable files fall back to the original
+          if (![415, 422].includes(err.response?.status)) throw err;
+        }
       }
-      url += '/download';
 
-      const response = await api.get(url, { responseType: 'blob' });
-      const blob = new Blob([response.data], { type: response.headers['content-type'] });
-
-      if (fileUrl) {
-        URL.revokeObjectURL(fileUrl);
+      if (isPdf) {
+        try {
+          // Without images, load just the current page rather than the whole PDF
+          const response = await api.get(
+            `/documents/${document.id}/versions/${versionNumber}/pages/pdf`,
+            { params: { start: page, end: page }, responseType: 'blob' }
+          );
+          const pages = Number(response.headers['x-page-count']);
+          setPageCount(pages > 0 ? pages : null);
+          setIsRendition(false);
+          showFile(new Blob([response.data], { type: 'application/pdf' }));
+          return;
+        } catch (err: any) {
+          if (![415, 422].includes(err.response?.status)) throw err;
+        }
       }
 
-      if (document.mime_type?.includes('pdf') || document.mime_type?.startsWith('image/')) {
-        const newUrl = URL.createObjectURL(blob);
-        setFileUrl(newUrl);
-        setContent(null);
+      const response = await api.get(`/documents/${document.id}/download`, {
+        params: selectedVersion ? { version: selectedVersion.version_number } : undefined,
+        responseType: 'blob',
+      });
+      const blob = new Blob([response.data], { type: response.headers['content-type'] });
+      setIsRendition(false);
+      setPageCount(null);
+
+      if (isRenderable) {
+        showFile(blob);
       } else {
-        const text = await blob.text();
-        setContent(text);
+        setContent(await blob.text());
         setFileUrl(null);
       }
     } catch (err) {
@@ -58,7 +104,7 @@ export default function DocumentViewer({ initialDocument, onClose, onUpdate }: D
     } finally {
       setLoading(false);
     }
-  }, [document?.id, selectedVersion?.version_number, fileUrl]);
+  }, [document?.id, document.version, selectedVersion, isPdf, isRenderable, page]);
 
   const handleIframeLoad = useCallback(() => {
     if (iframeElement && document.mime_type?.includes('pdf')) {
@@ -80,6 +126,16 @@ export default function DocumentViewer({ initialDocument, onClose, onUpdate }: D
     loadDocumentContent();
   }, [loadDocumentContent]);
 
+  useEffect(() => {
+    setPage(1);
+  }, [selectedVersion?.version_number]);
+
+  useEffect(() => () => {
+    if (fileUrlRef.current) {
+      URL.revokeObjectURL(fileUrlRef.current);
+    }
+  }, []);
+
   useEffect(() => {
     const timer = setTimeout(() => setIsVisible(true), 50);
     return () => clearTimeout(timer);
@@ -97,6 +153,28 @@ export default function DocumentViewer({ initialDocument, onClose, onUpdate }: D
     }
   }, [onUpdate]);
 
+  const pageControls = useMemo(() => (pageCount && pageCount > 1 ? (
+    <div className="flex items-center justify-center gap-4 p-2 border-t border-solarized-base01 text-solarized-base1">
+      <button
+        onClick={() => setPage((p) => Math.max(1, p - 1))}
+        disabled={page <= 1}
+        className="px-3 py-1 rounded-md hover:text-solarized-base0 disabled:opacity-50"
+      >
+        Previous
+      </button>
+      <span className="text-sm">
+        Page {page} of {pageCount}
+      </span>
+      <button
+        onClick={() => setPage((p) => Math.min(pageCount, p + 1))}
+        disabled={page >= pageCount}
+        className="px-3 py-1 rounded-md hover:text-solarized-base0 disabled:opacity-50"
+      >
+        Next
+      </button>
+    </div>
+  ) : null), [page, pageCount]);
+
   const renderContent = useMemo(() => {
     if (loading) {
       return (
@@ -114,15 +192,33 @@ export default function DocumentViewer({ initialDocument, onClose, onUpdate }: D
       );
     }
 
+    if (fileUrl && isRendition) {
+      return (
+        <div className="flex flex-col h-full">
+          <div className="flex-1 overflow-auto flex items-start justify-center p-4">
+            <img
+              src={fileUrl}
+              alt={`${document.title}, page ${page}`}
+              className="max-w-full shadow-lg"
+            />
+          </div>
+          {pageControls}
+        </div>
+      );
+    }
+
     if (fileUrl) {
       if (document.mime_type?.includes('pdf')) {
         return (
-          <iframe
-            ref={setIframeElement}
-            src={fileUrl}
-            className="w-full h-full border-0"
-            onLoad={handleIframeLoad}
-          />
+          <div className="flex flex-col h-full">
+            <iframe
+              ref={setIframeElement}
+              src={fileUrl}
+              className="w-full flex-1 border-0"
+              onLoad={handleIframeLoad}
+            />
+            {pageControls}
+          </div>
         );
       }
       if (document.mime_type?.startsWith('image/')) {
@@ -145,7 +241,7 @@ export default function DocumentViewer({ initialDocument, onClose, onUpdate }: D
     }
 
     return null;
-  }, [loading, error, fileUrl, content, document.mime_type, document.title, handleIframeLoad]);
+  }, [loading, error, fileUrl, isRendition, page, pageControls, content, document.mime_type, document.title, handleIframeLoad]);
 
   return (
     <div
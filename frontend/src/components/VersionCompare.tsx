@@ -1,7 +1,8 @@
 import React, { useState, useEffect } from 'react';
-import { Document, DocumentVersion } from '../types/api';
+import { Document, DocumentVersion, DiffHunk, DiffLine, DiffMode, DiffSegment, VersionDiff } from '../types/api';
 import api from '../services/api';
-import { diffLines, Change } from 'diff';
+
+const HUNKS_PER_PAGE = 50;
 
 interface VersionCompareProps {
   document: Document;
@@ -17,96 +18,119 @@ export default function VersionCompare({
   onClose
 }: VersionCompareProps) {
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
-  const [diff, setDiff] = useState<Change[]>([]);
-  const [content1, setContent1] = useState<string>('');
-  const [content2, setContent2] = useState<string>('');
+  const [diffMode, setDiffMode] = useState<DiffMode>('line');
+  const [hunks, setHunks] = useState<DiffHunk[]>([]);
+  const [summary, setSummary] = useState<VersionDiff | null>(null);
 
   useEffect(() => {
-    loadVersionContents();
-  }, [version1.id, version2.id]);
+    loadDiff(0);
+  }, [version1.id, version2.id, diffMode]);
 
-  const loadVersionContents = async () => {
+  // The diff is computed and cached on the server; fetch it a page of hunks at a time
+  const loadDiff = async (offset: number) => {
     try {
-      setLoading(true);
-      setError('');
-
-      const [response1, response2] = await Promise.all([
-        api.get(`/documents/${document.id}/versions/${version1.version_number}/download`, {
-          responseType: 'blob'
-        }),
-        api.get(`/documents/${document.id}/versions/${version2.version_number}/download`, {
-          responseType: 'blob'
-        })
-      ]);
-
-      const fileType1 = response1.headers['content-type'];
-      const fileType2 = response2.headers['content-type'];
-
-      // Only compare text-based files
-      if (!fileType1.startsWith('text/') || !fileType2.startsWith('text/')) {
-        setError('Version comparison is only available for text-based files');
-        return;
+      if (offset === 0) {
+        setLoading(true);
+      } else {
+        setLoadingMore(true);
       }
+      setError('');
 
-      const text1 = await response1.data.text();
-      const text2 = await response2.data.text();
-
-      setContent1(text1);
-      setContent2(text2);
+      const response = await api.get<VersionDiff>(
+        `/documents/${document.id}/versions/${version1.version_number}/diff/${version2.version_number}`,
+        { params: { mode: diffMode, offset, limit: HUNKS_PER_PAGE } }
+      );
 
-      const differences = diffLines(text1, text2);
-      setDiff(differences);
+      setSummary(response.data);
+      setHunks(previous => (offset === 0 ? response.data.hunks : [...previous, ...response.data.hunks]));
     } catch (err: any) {
-      setError('Failed to load version contents');
+      setError(err.response?.data?.detail || 'Failed to load version comparison');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  const segmentColor = (op: DiffSegment['op']) =>
+    op === 'insert'
+      ? 'bg-solarized-green bg-opacity-20'
+      : op === 'delete'
+      ? 'bg-solarized-red bg-opacity-20'
+      : '';
+
+  const renderSegments = (segments: DiffSegment[], hide?: DiffSegment['op']) =>
+    segments
+      .filter(segment => segment.op !== hide)
+      .map((segment, index) => (
+        <span key={index} className={segmentColor(segment.op)}>
+          {segment.text}
+        </span>
+      ));
+
+  const renderLine = (line: DiffLine, key: React.Key) => (
+    <div key={key} className={`font-mono text-sm whitespace-pre-wrap px-1 ${segmentColor(line.op)}`}>
+      <span className="select-none mr-2">
+        {line.op === 'insert' ? '+' : line.op === 'delete' ? '-' : ' '}
+      </span>
+      {line.segments
+        ? renderSegments(line.segments, line.op === 'delete' ? 'insert' : 'delete')
+        : line.text}
+    </div>
+  );
+
+  const renderHunkHeader = (hunk: DiffHunk) => (
+    <div className="font-mono text-xs text-solarized-base01 py-1">
+      @@ -{hunk.old_start},{hunk.old_lines} +{hunk.new_start},{hunk.new_lines} @@
+    </div>
+  );
+
   const renderDiff = () => {
-    return diff.map((part, index) => {
-      const color = part.added
-        ? 'bg-solarized-green bg-opacity-20'
-        : part.removed
-        ? 'bg-solarized-red bg-opacity-20'
-        : '';
-
-      return (
-        <div
-          key={index}
-          className={`font-mono text-sm whitespace-pre-wrap p-1 ${color}`}
-        >
-          <span className="select-none mr-2">
-            {part.added ? '+' : part.removed ? '-' : ' '}
-          </span>
-          {part.value}
-        </div>
-      );
-    });
+    return hunks.map((hunk, index) => (
+      <div key={index}>
+        {renderHunkHeader(hunk)}
+        {hunk.lines.length > 0 ? (
+          hunk.lines.map((line, lineIndex) => renderLine(line, lineIndex))
+        ) : (
+          <div className="font-mono text-sm whitespace-pre-wrap p-1">
+            {renderSegments(hunk.segments)}
+          </div>
+        )}
+      </div>
+    ));
   };
 
   const renderSideBySide = () => {
-    return (
-      <div className="grid grid-cols-2 gap-4">
-        <div className="overflow-auto">
-          <h3 className="text-lg font-medium text-solarized-base1 mb-2">
-            Version {version1.version_number}
-          </h3>
-          <pre className="font-mono text-sm whitespace-pre-wrap bg-solarized-base02 p-4 rounded">
-            {content1}
-          </pre>
-        </div>
-        <div className="overflow-auto">
-          <h3 className="text-lg font-medium text-solarized-base1 mb-2">
-            Version {version2.version_number}
-          </h3>
-          <pre className="font-mono text-sm whitespace-pre-wrap bg-solarized-base02 p-4 rounded">
-            {content2}
-          </pre>
+    return hunks.map((hunk, index) => (
+      <div key={index}>
+        {renderHunkHeader(hunk)}
+        <div className="grid grid-cols-2 gap-4">
+          <div className="overflow-auto bg-solarized-base02 rounded">
+            {hunk.lines.length > 0 ? (
+              hunk.lines
+                .filter(line => line.op !== 'insert')
+                .map((line, lineIndex) => renderLine(line, lineIndex))
+            ) : (
+              <div className="font-mono text-sm whitespace-pre-wrap p-1">
+                {renderSegments(hunk.segments, 'insert')}
+              </div>
+            )}
+          </div>
+          <div className="overflow-auto bg-solarized-base02 rounded">
+            {hunk.lines.length > 0 ? (
+              hunk.lines
+                .filter(line => line.op !== 'delete')
+                .map((line, lineIndex) => renderLine(line, lineIndex))
+            ) : (
+              <div className="font-mono text-sm whitespace-pre-wrap p-1">
+                {renderSegments(hunk.segments, 'delete')}
+              </div>
+            )}
+          </div>
         </div>
       </div>
-    );
+    ));
   };
 
   const [viewMode, setViewMode] = useState<'unified' | 'split'>('unified');
@@ -130,8 +154,23 @@ export default function VersionCompare({
           <div className="flex items-center space-x-4">
             <div className="text-solarized-base1">
               Comparing version {version1.version_number} with {version2.version_number}
+              {summary && (
+                <span className="ml-2 text-sm">
+                  <span className="text-solarized-green">+{summary.added}</span>{' '}
+                  <span className="text-solarized-red">-{summary.removed}</span>
+                </span>
+              )}
             </div>
             <div className="flex-1" />
+            <select
+              value={diffMode}
+              onChange={e => setDiffMode(e.target.value as DiffMode)}
+              className="input py-1"
+            >
+              <option value="line">Lines</option>
+              <option value="structured">Lines and words</option>
+              <option value="word">Words</option>
+            </select>
             <div className="flex space-x-2">
               <button
                 onClick={() => setViewMode('unified')}
@@ -168,7 +207,19 @@ export default function VersionCompare({
             </div>
           ) : (
             <div className="space-y-4">
+              {hunks.length === 0 && (
+                <p className="text-solarized-base1">The versions have the same content.</p>
+              )}
               {viewMode === 'unified' ? renderDiff() : renderSideBySide()}
+              {summary && hunks.length < summary.total_hunks && (
+                <button
+                  onClick={() => loadDiff(hunks.length)}
+                  disabled={loadingMore}
+                  className="btn btn-secondary"
+                >
+                  {loadingMore ? 'Loading...' : `Show more changes (${summary.total_hunks - hunks.length} remaining)`}
+                </button>
+              )}
             </div>
           )}
         </div>
@@ -13,6 +13,7 @@ interface Document {
   current_checkout?: {
     user_id: number;
     checkout_time: string;
+    expires_at: string | null;
     comments: string;
   };
 }
@@ -77,6 +78,12 @@ export const documentService = {
     return response.data;
   },
 
+  // Renew the current user's checkout lease
+  renewCheckout: async (id: number) => {
+    const response = await api.post<Document['current_checkout']>(`/documents/${id}/checkout/heartbeat`);
+    return response.data;
+  },
+
   // Check in a document
   checkinDocument: async (id: number, comments: string, newVersion?: File) => {
     const formData = new FormData();
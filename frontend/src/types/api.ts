@@ -22,7 +22,7 @@ export interface DocumentVersion {
 
 export interface DocumentActivity {
   id: number;
-  activity_type: 'checkout' | 'checkin' | 'view';
+  activity_type: 'checkout' | 'checkin' | 'checkout_expired' | 'view' | 'download';
   activity_time: string;
   details?: string;
   user: {
@@ -42,11 +42,12 @@ export interface Document {
   created_at: string;
   updated_at: string;
   version: number;
+  row_version: number;
   tags: Tag[];
   versions: DocumentVersion[];
   activities?: DocumentActivity[];
   created_by: User;
-  current_checkout?: CheckOutLog;
+  current_checkout?: DocumentCheckout | null;
   tasks?: Task[];
 }
 
@@ -100,6 +101,13 @@ export interface Task {
   document_id: number;
 }
 
+export interface DocumentCheckout {
+  user_id: number;
+  checkout_time: string;
+  expires_at: string | null;  // Renew with the checkout heartbeat before then
+  comments: string | null;
+}
+
 export interface CheckOutLog {
   id: number;
   document_id: number;
@@ -126,3 +134,36 @@ export interface CheckInRequest {
   comments: string;
   new_version?: File;
 }
+
+export type DiffMode = 'line' | 'word' | 'structured';
+
+export interface DiffSegment {
+  op: 'equal' | 'delete' | 'insert';
+  text: string;
+}
+
+export interface DiffLine extends DiffSegment {
+  old_line: number | null;
+  new_line: number | null;
+  segments?: DiffSegment[] | null;
+}
+
+export interface DiffHunk {
+  old_start: number;
+  old_lines: number;
+  new_start: number;
+  new_lines: number;
+  lines: DiffLine[];
+  segments: DiffSegment[];
+}
+
+export interface VersionDiff {
+  version_a: number;
+  version_b: number;
+  mode: DiffMode;
+  total_hunks: number;
+  added: number;
+  removed: number;
+  offset: number;
+  hunks: DiffHunk[];
+}